@@ -0,0 +1,156 @@
+from functools import cached_property
+import time
+
+from django.core.cache import caches
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import TeacherProfile, AssistantProfile, StudentProfile
+
+# Revocation markers, keyed by user id. The cache must be shared by every
+# worker process, or a revocation only reaches the worker that made it.
+REVOCATION_CACHE = 'tokens'
+REVOCATION_KEY = 'tokens-revoked:{}'
+# When the claims were read; finer grained than `iat`, which is in whole
+# seconds, so a token issued right after a revocation is accepted
+CLAIMS_TIME_CLAIM = 'claims_at'
+
+
+def profile_claims(user):
+    """Tenant claims added to tokens at login (see CustomTokenObtainPairSerializer)."""
+    claims = {
+        CLAIMS_TIME_CLAIM: time.time(),
+        # Shard holding the user's tenant data (accounts.sharding)
+        'shard': user.shard,
+        'teacher_profile_id': None,
+        'assistant_profile_id': None,
+        'student_profile_id': None,
+    }
+    # Lets the router find the profile on the user's shard
+    hints = {'instance': user}
+    if user.role == 'teacher':
+        claims['teacher_profile_id'] = (
+            TeacherProfile.objects.filter(user=user).values_list('id', flat=True).first()
+        )
+    elif user.role == 'assistant':
+        profile = AssistantProfile.objects.db_manager(hints=hints).filter(user=user).values('id', 'teacher_id').first()
+        if profile:
+            claims['assistant_profile_id'] = profile['id']
+            claims['teacher_profile_id'] = profile['teacher_id']
+    elif user.role == 'student':
+        profile = StudentProfile.objects.db_manager(hints=hints).filter(user=user).values('id', 'teacher_id').first()
+        if profile:
+            claims['student_profile_id'] = profile['id']
+            claims['teacher_profile_id'] = profile['teacher_id']
+    return claims
+
+
+def revoke_tokens(user_ids):
+    """
+    Reject the access tokens issued to these users so far.
+
+    Claims are only read at login and refresh: call this when a user's
+    profile, teacher, shard or active status changes. The users' refresh tokens
+    keep working and issue access tokens with current claims.
+    """
+    now = time.time()
+    caches[REVOCATION_CACHE].set_many(
+        {REVOCATION_KEY.format(user_id): now for user_id in user_ids},
+        # Older access tokens have expired by then anyway
+        timeout=api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    )
+
+
+def tokens_revoked(validated_token):
+    revoked_at = caches[REVOCATION_CACHE].get(REVOCATION_KEY.format(validated_token[api_settings.USER_ID_CLAIM]))
+    return revoked_at is not None and validated_token.get(CLAIMS_TIME_CLAIM, 0) <= revoked_at
+
+
+def deferred_instance(model, using=None, **values):
+    """
+    Build a model instance holding only the given fields, without a query.
+
+    The remaining fields are deferred, so they are loaded lazily if
+    something reads them, exactly like an instance from `.only()`.
+    """
+    db = using or router.db_for_read(model)
+    return model.from_db(db, list(values), list(values.values()))
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built entirely from token claims.
+
+    Mirrors the profile accessors of `accounts.User`
+    (`teacher_profile`, `assistant_profile.teacher`, `student_profile`)
+    and its `shard` with deferred instances, so resolving the owning
+    teacher and the shard to query costs no queries.
+    """
+
+    @cached_property
+    def shard(self):
+        return self.token.get('shard', '')
+
+    def _teacher(self):
+        return deferred_instance(TeacherProfile, id=self.teacher_profile_id)
+
+    @cached_property
+    def teacher_profile(self):
+        if self.role != 'teacher' or self.teacher_profile_id is None:
+            raise TeacherProfile.DoesNotExist("User has no teacher profile.")
+        return self._teacher()
+
+    @cached_property
+    def assistant_profile(self):
+        if self.role != 'assistant' or self.assistant_profile_id is None:
+            raise AssistantProfile.DoesNotExist("User has no assistant profile.")
+        assistant = deferred_instance(
+            AssistantProfile,
+            using=self.shard or None,
+            id=self.assistant_profile_id,
+            user_id=self.pk,
+            teacher_id=self.teacher_profile_id
+        )
+        AssistantProfile.teacher.field.set_cached_value(assistant, self._teacher())
+        return assistant
+
+    @cached_property
+    def student_profile(self):
+        if self.role != 'student' or self.student_profile_id is None:
+            raise StudentProfile.DoesNotExist("User has no student profile.")
+        student = deferred_instance(
+            StudentProfile,
+            using=self.shard or None,
+            id=self.student_profile_id,
+            user_id=self.pk,
+            teacher_id=self.teacher_profile_id
+        )
+        StudentProfile.teacher.field.set_cached_value(student, self._teacher())
+        return student
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the role/profile claims in the token
+    instead of loading the `User` row on every request.
+
+    The user row is not read, so a deactivated or deleted user, or one
+    whose role or profile changed, would keep access until the token
+    expires (ACCESS_TOKEN_LIFETIME). Those changes call `revoke_tokens`
+    (see accounts.signals), and one cache lookup per request rejects the
+    tokens issued before them.
+
+    Tokens issued before the profile or shard claims existed fall back to
+    the regular database lookup.
+    """
+    required_claims = ('role', 'teacher_profile_id', 'shard')
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in self.required_claims):
+            return super().get_user(validated_token)
+        if tokens_revoked(validated_token):
+            raise InvalidToken("Token has been revoked.")
+        return ClaimsUser(validated_token)
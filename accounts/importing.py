@@ -0,0 +1,178 @@
+"""
+Bulk student import.
+
+The whole roster is validated before anything is written. Passwords are
+then hashed across a process pool (PBKDF2 is CPU-bound, so threads would
+not help) and the users and profiles are inserted with two bulk_create
+calls in one transaction. Requests share one pool, started on the first
+large import of the worker process.
+"""
+import csv
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, router, transaction
+from rest_framework import serializers
+
+from .models import GENDER_CHOICES, User, StudentProfile, Center, Grade, DashboardStats, digits_only
+from .sharding import replicate, shard_of_teacher, use_shard
+
+# Below this many passwords the pool start-up costs more than it saves
+PARALLEL_HASH_THRESHOLD = 32
+# Size of the pool shared by requests; the command can ask for another
+SHARED_POOL_WORKERS = os.cpu_count() or 1
+
+class StudentImportRowSerializer(serializers.Serializer):
+    # Same rules as the users created one at a time
+    username = serializers.CharField(
+        max_length=User._meta.get_field('username').max_length, validators=[User.username_validator]
+    )
+    password = serializers.CharField()
+    email = serializers.EmailField(required=False, allow_blank=True, default='')
+    full_name = serializers.CharField(max_length=100)
+    phone_number = serializers.CharField(max_length=15)
+    parent_number = serializers.CharField(max_length=15)
+    gender = serializers.ChoiceField(choices=GENDER_CHOICES)
+    grade = serializers.IntegerField(required=False, allow_null=True, default=None)
+    center = serializers.IntegerField(required=False, allow_null=True, default=None)
+
+
+class StudentImportError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def read_csv(file):
+    """Rows of a CSV roster whose header names the StudentImportRowSerializer fields."""
+    if isinstance(file, bytes):
+        file = file.decode('utf-8-sig')
+    if isinstance(file, str):
+        file = io.StringIO(file)
+    return [
+        # Empty cells mean "not given" so optional columns can be left blank
+        {key: value for key, value in row.items() if key and value not in ('', None)}
+        for row in csv.DictReader(file)
+    ]
+
+
+def validate_rows(rows, teacher):
+    """Validate the whole roster; raises StudentImportError listing every bad row."""
+    errors = []
+    cleaned = []
+    for index, row in enumerate(rows, start=1):
+        serializer = StudentImportRowSerializer(data=row)
+        if serializer.is_valid():
+            cleaned.append(serializer.validated_data)
+        else:
+            errors.append({'row': index, 'errors': serializer.errors})
+    if errors:
+        raise StudentImportError(errors)
+
+    center_ids = set(Center.objects.filter(teacher=teacher).values_list('id', flat=True))
+    grade_ids = set(Grade.objects.values_list('id', flat=True))
+    usernames = [row['username'] for row in cleaned]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    seen = set()
+    for index, row in enumerate(cleaned, start=1):
+        row_errors = {}
+        if row['username'] in taken:
+            row_errors['username'] = ["A user with that username already exists."]
+        elif row['username'] in seen:
+            row_errors['username'] = ["Duplicate username in file."]
+        seen.add(row['username'])
+        if row['center'] is not None and row['center'] not in center_ids:
+            row_errors['center'] = ["Center does not belong to the specified teacher"]
+        if row['grade'] is not None and row['grade'] not in grade_ids:
+            row_errors['grade'] = ["Invalid grade ID"]
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+    if errors:
+        raise StudentImportError(errors)
+    return cleaned
+
+
+def _init_hash_worker():
+    # Spawned (rather than forked) workers start without Django set up
+    if not apps.ready:
+        django.setup()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ProcessPoolExecutor(max_workers=SHARED_POOL_WORKERS, initializer=_init_hash_worker)
+        return _shared_pool
+
+
+def _hash_on(pool, workers, passwords):
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash `passwords` on the shared pool, or on a pool of `workers` processes of their own."""
+    if len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [make_password(password) for password in passwords]
+
+    if workers is None:
+        return _hash_on(shared_pool(), SHARED_POOL_WORKERS, passwords)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        return _hash_on(pool, workers, passwords)
+
+
+def import_students(rows, teacher, workers=None):
+    """
+    Create a user and student profile for every row of ``rows``.
+
+    Nothing is written unless every row is valid. Returns the created
+    profiles (with ``user`` set).
+    """
+    shard = shard_of_teacher(teacher.pk)
+    with use_shard(shard):
+        cleaned = validate_rows(rows, teacher)
+        hashes = hash_passwords([row['password'] for row in cleaned], workers)
+
+        users = [
+            User(username=row['username'], email=row['email'], role='student', password=password, shard=shard or '')
+            for row, password in zip(cleaned, hashes)
+        ]
+        try:
+            with transaction.atomic(), transaction.atomic(using=router.db_for_write(StudentProfile)):
+                users = User.objects.bulk_create(users)
+                # bulk_create skips the signals that copy users to their shard
+                replicate(User, users, [shard])
+                profiles = StudentProfile.objects.bulk_create([
+                    StudentProfile(
+                        user=user,
+                        teacher=teacher,
+                        full_name=row['full_name'],
+                        phone_number=row['phone_number'],
+                        parent_number=row['parent_number'],
+                        phone_digits=digits_only(row['phone_number']),
+                        parent_digits=digits_only(row['parent_number']),
+                        gender=row['gender'],
+                        grade_id=row['grade'],
+                        center_id=row['center'],
+                    )
+                    for user, row in zip(users, cleaned)
+                ])
+                # bulk_create skips the post_save handlers that keep the counters current
+                DashboardStats.objects.bump(
+                    teacher.pk, students_count=len(profiles), pending_approvals=len(profiles)
+                )
+        except IntegrityError:
+            # A username was taken between validation and the insert
+            raise StudentImportError([{'row': None, 'errors': {'username': ["A username is already taken."]}}])
+    return profiles
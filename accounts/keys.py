@@ -0,0 +1,111 @@
+"""
+Process-wide store for the JWT key material.
+
+Keys are read from disk once and cached; every access does a cheap
+`stat()` and reloads the file when its mtime changes, so rotating
+`private.pem`/`public.pem` takes effect without restarting workers.
+Rotate by writing the new file next to the old one and `os.replace()`-ing
+it into place, so that no worker ever reads a half-written key.
+"""
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.settings import api_settings
+
+
+class KeyFile:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._text = None
+        self._digest = None
+        self._prepared = None
+
+    def _refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with self._lock:
+                while mtime != self._mtime:
+                    with open(self.path, 'r') as f:
+                        text = f.read()
+                    # Rewritten while being read: read it again
+                    if (written := os.stat(self.path).st_mtime_ns) != mtime:
+                        mtime = written
+                        continue
+                    self._text = text
+                    self._digest = hashlib.sha256(text.encode()).hexdigest()
+                    self._prepared = None
+                    self._mtime = mtime
+
+    def read(self):
+        self._refresh()
+        return self._text
+
+    @property
+    def digest(self):
+        """SHA-256 of the current contents, usable as a strong ETag."""
+        self._refresh()
+        return self._digest
+
+    def prepared(self, prepare):
+        """Return the key parsed by `prepare`, re-parsing only after a reload."""
+        self._refresh()
+        if (prepared := self._prepared) is not None:
+            return prepared
+        # Parsed under the lock, so that a key parsed from contents a
+        # concurrent reload replaced is never cached over the new ones
+        with self._lock:
+            if self._prepared is None:
+                self._prepared = prepare(self._text)
+            return self._prepared
+
+
+class KeyStore:
+    def __init__(self):
+        self._files = {}
+
+    def _get(self, path):
+        if path not in self._files:
+            self._files[path] = KeyFile(path)
+        return self._files[path]
+
+    @property
+    def signing_key(self):
+        return self._get(settings.JWT_SIGNING_KEY_PATH)
+
+    @property
+    def verifying_key(self):
+        return self._get(settings.JWT_VERIFYING_KEY_PATH)
+
+
+key_store = KeyStore()
+
+
+class RotatingTokenBackend(TokenBackend):
+    """TokenBackend that takes its keys from `key_store` on every use."""
+
+    @property
+    def prepared_signing_key(self):
+        return key_store.signing_key.prepared(self._prepare_key)
+
+    @property
+    def prepared_verifying_key(self):
+        return key_store.verifying_key.prepared(self._prepare_key)
+
+
+def install_token_backend():
+    """Replace simplejwt's module-level backend, which tokens look up at use time."""
+    from rest_framework_simplejwt import state
+
+    state.token_backend = RotatingTokenBackend(
+        api_settings.ALGORITHM,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        jwk_url=api_settings.JWK_URL,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Switch SQLite databases to write-ahead logging. The mode is stored in the database file, "
+        "so this only needs to run once per database (e.g. at deployment, after migrate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', help="Only this database alias (repeatable)")
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or list(connections)
+        if unknown := set(aliases) - set(connections):
+            raise CommandError(f"Unknown databases: {', '.join(sorted(unknown))}")
+
+        for alias in aliases:
+            connection = connections[alias]
+            if connection.vendor != 'sqlite':
+                continue
+            if connection.is_in_memory_db():
+                self.log(options, f"{alias}: in-memory database, skipped.")
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+                mode = cursor.fetchone()[0]
+            if mode != 'wal':
+                raise CommandError(f"{alias}: SQLite kept journal mode '{mode}'")
+            self.log(options, f"{alias}: journal mode is now WAL.")
+
+    def log(self, options, message):
+        if options['verbosity']:
+            self.stdout.write(message)
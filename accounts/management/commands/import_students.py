@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importing import StudentImportError, import_students, read_csv
+from accounts.models import TeacherProfile
+
+
+class Command(BaseCommand):
+    help = "Import a roster of students (CSV or JSON list) for one teacher."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row, or a .json file holding a list")
+        parser.add_argument('--teacher', type=int, required=True, help="TeacherProfile id")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: all cores)")
+
+    def handle(self, *args, **options):
+        try:
+            teacher = TeacherProfile.objects.get(pk=options['teacher'])
+        except TeacherProfile.DoesNotExist:
+            raise CommandError("Invalid teacher ID")
+
+        path = options['path']
+        with open(path, encoding='utf-8-sig') as f:
+            rows = json.load(f) if path.endswith('.json') else read_csv(f)
+
+        try:
+            profiles = import_students(rows, teacher, workers=options['workers'])
+        except StudentImportError as e:
+            for error in e.errors:
+                self.stderr.write(f"Row {error['row']}: {error['errors']}")
+            raise CommandError("Nothing was imported.")
+
+        self.stdout.write(f"Imported {len(profiles)} student(s).")
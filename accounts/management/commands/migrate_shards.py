@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.sharding import CATALOG, pin_database, seed_id_ranges, sync_catalog
+
+
+class Command(BaseCommand):
+    help = "Migrate the catalog and every shard database, then refresh the shards' catalog replicas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shard', action='append', help="Only this shard (repeatable)")
+
+    def handle(self, *args, **options):
+        shards = options['shard'] or settings.SHARDS
+        if unknown := set(shards) - set(settings.SHARDS):
+            raise CommandError(f"Not in settings.SHARDS: {', '.join(sorted(unknown))}")
+
+        for alias in [CATALOG, *shards]:
+            self.stdout.write(f"Migrating {alias}...")
+            # Data migrations query through ShardRouter, which would otherwise
+            # send sharded models to the current shard and the rest to the catalog
+            with pin_database(alias):
+                call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'] - 1)
+
+        for alias in shards:
+            seed_id_ranges(alias)
+            sync_catalog(alias)
+            self.stdout.write(f"Seeded id ranges and catalog replicas on {alias}.")
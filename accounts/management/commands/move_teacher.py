@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import TeacherProfile
+from accounts.sharding import CATALOG, move_teacher
+
+
+class Command(BaseCommand):
+    help = "Move a teacher's students, attendance, quizzes, tests and materials to another shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('teacher', type=int, help="TeacherProfile id")
+        parser.add_argument('shard', help=f"Target alias from settings.SHARDS, or '{CATALOG}'")
+
+    def handle(self, *args, **options):
+        target = options['shard']
+        if target != CATALOG and target not in settings.SHARDS:
+            raise CommandError(f"Unknown shard {target!r}")
+        try:
+            teacher = TeacherProfile.objects.select_related('user').get(pk=options['teacher'])
+        except TeacherProfile.DoesNotExist:
+            raise CommandError("Invalid teacher ID")
+        if (teacher.user.shard or CATALOG) == target:
+            raise CommandError(f"Teacher {teacher.pk} is already on {target}")
+
+        moved = move_teacher(teacher, target, log=self.stdout.write)
+        self.stdout.write(f"Moved {moved} row(s) to {target}.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import DashboardStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard counters from the student, assistant and center tables."
+
+    def handle(self, *args, **options):
+        DashboardStats.objects.rebuild()
+        self.stdout.write("Dashboard stats rebuilt.")
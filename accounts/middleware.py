@@ -0,0 +1,31 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .sharding import activate_request
+from .tenancy import TenantResolver
+
+
+class TenantMiddleware:
+    """
+    Attach a lazily evaluated `TenantResolver` as `request.tenant` and
+    make the request's user select the shard for tenant queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.tenant = TenantResolver(request)
+        with activate_request(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.tenant = TenantResolver(request)
+        with activate_request(request):
+            return await self.get_response(request)
@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-18 06:35
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def compute_dashboard_stats(apps, schema_editor):
+    TeacherProfile = apps.get_model('accounts', 'TeacherProfile')
+    StudentProfile = apps.get_model('accounts', 'StudentProfile')
+    AssistantProfile = apps.get_model('accounts', 'AssistantProfile')
+    Center = apps.get_model('accounts', 'Center')
+    DashboardStats = apps.get_model('accounts', 'DashboardStats')
+
+    def count_by_teacher(queryset):
+        return dict(queryset.values('teacher').order_by().annotate(n=models.Count('id')).values_list('teacher', 'n'))
+
+    students = count_by_teacher(StudentProfile.objects.all())
+    pending = count_by_teacher(StudentProfile.objects.filter(is_approved=False))
+    assistants = count_by_teacher(AssistantProfile.objects.all())
+    centers = count_by_teacher(Center.objects.all())
+    teacher_ids = list(TeacherProfile.objects.values_list('id', flat=True))
+
+    DashboardStats.objects.bulk_create([
+        DashboardStats(
+            teacher_id=teacher_id,
+            students_count=students.get(teacher_id, 0),
+            pending_approvals=pending.get(teacher_id, 0),
+            assistants_count=assistants.get(teacher_id, 0),
+            centers_count=centers.get(teacher_id, 0),
+        )
+        for teacher_id in teacher_ids
+    ] + [
+        DashboardStats(
+            teacher_id=None,
+            teachers_count=len(teacher_ids),
+            students_count=sum(students.values()),
+            pending_approvals=sum(pending.values()),
+            assistants_count=sum(assistants.values()),
+            centers_count=sum(centers.values()),
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_teacherprofile_grades'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('teachers_count', models.PositiveIntegerField(default=0)),
+                ('students_count', models.PositiveIntegerField(default=0)),
+                ('assistants_count', models.PositiveIntegerField(default=0)),
+                ('pending_approvals', models.PositiveIntegerField(default=0)),
+                ('centers_count', models.PositiveIntegerField(default=0)),
+                ('teacher', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='accounts.teacherprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('teacher', models.Value(0)), name='single_global_dashboard_stats')],
+            },
+        ),
+        migrations.RunPython(compute_dashboard_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+import re
+
+from django.db import migrations, models
+
+FTS_TABLE = 'accounts_studentprofile_fts'
+
+CREATE_FTS = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        full_name, username, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4'
+    )
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, full_name, username)
+    SELECT s.id, s.full_name, u.username
+    FROM accounts_studentprofile s JOIN accounts_user u ON u.id = s.user_id
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON accounts_studentprofile BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, full_name, username)
+        SELECT new.id, new.full_name, username FROM accounts_user WHERE id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF full_name, user_id ON accounts_studentprofile BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, full_name, username)
+        SELECT new.id, new.full_name, username FROM accounts_user WHERE id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON accounts_studentprofile BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_username AFTER UPDATE OF username ON accounts_user BEGIN
+        UPDATE {FTS_TABLE} SET username = new.username
+        WHERE rowid IN (SELECT id FROM accounts_studentprofile WHERE user_id = new.id);
+    END
+    """,
+]
+
+DROP_FTS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_username",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def fill_phone_digits(apps, schema_editor):
+    StudentProfile = apps.get_model('accounts', 'StudentProfile')
+    students = list(StudentProfile.objects.only('phone_number', 'parent_number'))
+    for student in students:
+        student.phone_digits = re.sub(r'\D', '', student.phone_number)
+        student.parent_digits = re.sub(r'\D', '', student.parent_number)
+    StudentProfile.objects.bulk_update(students, ['phone_digits', 'parent_digits'], batch_size=500)
+
+
+def run_on_sqlite(statements):
+    # FTS5 is SQLite-only; other backends search with the icontains fallback
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='phone_digits',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=15),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='parent_digits',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=15),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_phone_digits, migrations.RunPython.noop),
+        migrations.RunPython(run_on_sqlite(CREATE_FTS), run_on_sqlite(DROP_FTS)),
+    ]
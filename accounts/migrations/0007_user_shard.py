@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+FTS_TABLE = 'accounts_studentprofile_fts'
+
+
+def drop_search_triggers(apps, schema_editor):
+    # Dropped for the duration of the schema change and re-created by 0008:
+    # SQLite rebuilds tables to alter them, which fails on (accounts_user)
+    # or silently drops (accounts_studentprofile) triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for suffix in ('username', 'delete', 'update', 'insert'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_student_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='user',
+            name='shard',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-18 14:20
+
+from django.db import migrations
+
+FTS_TABLE = 'accounts_studentprofile_fts'
+
+# The triggers of 0006, dropped by 0007 so that SQLite could rebuild
+# accounts_user. Triggers also cover bulk_create, QuerySet.update() and
+# bulk deletes, which signal handlers miss.
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON accounts_studentprofile BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, full_name, username)
+        SELECT new.id, new.full_name, username FROM accounts_user WHERE id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF full_name, user_id ON accounts_studentprofile BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, full_name, username)
+        SELECT new.id, new.full_name, username FROM accounts_user WHERE id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON accounts_studentprofile BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_username AFTER UPDATE OF username ON accounts_user BEGIN
+        UPDATE {FTS_TABLE} SET username = new.username
+        WHERE rowid IN (SELECT id FROM accounts_studentprofile WHERE user_id = new.id);
+    END
+    """,
+    # Rows written while the triggers were gone
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, full_name, username)
+    SELECT s.id, s.full_name, u.username
+    FROM accounts_studentprofile s JOIN accounts_user u ON u.id = s.user_id
+    """,
+]
+
+DROP_TRIGGERS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_username",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_shard'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_TRIGGERS), run_on_sqlite(DROP_TRIGGERS)),
+    ]
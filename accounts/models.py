@@ -1,6 +1,23 @@
+import re
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
+from .tenancy import TenantQuerySet
+
+class AtomicSaveMixin:
+    """Run save() and its post_save handlers (counter updates) in one transaction."""
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+def digits_only(value):
+    """Phone number without its formatting, as stored in the indexed *_digits columns."""
+    return re.sub(r'\D', '', value or '')
 
 # Gender Choices
 GENDER_CHOICES = (
@@ -17,6 +34,8 @@ class User(AbstractUser):
         ('student', 'Student'),
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    # Database holding the user's tenant data when sharding is on (accounts.sharding)
+    shard = models.CharField(max_length=50, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -36,7 +55,7 @@ class Grade(models.Model):
         return self.name
 
 # Teacher profile
-class TeacherProfile(models.Model):
+class TeacherProfile(AtomicSaveMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='teacher_profile')
     full_name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=15)
@@ -48,10 +67,12 @@ class TeacherProfile(models.Model):
         return f"Teacher: {self.full_name} (Subject: {self.subject.name if self.subject else 'No subject'})"
 
 # Center model — now scoped to each teacher
-class Center(models.Model):
+class Center(AtomicSaveMixin, models.Model):
     name = models.CharField(max_length=100)
     teacher = models.ForeignKey('TeacherProfile', on_delete=models.CASCADE, related_name='centers')
 
+    objects = TenantQuerySet.as_manager()
+
     class Meta:
         unique_together = ('name', 'teacher')  # Ensures private center list per teacher
 
@@ -59,18 +80,20 @@ class Center(models.Model):
         return f"{self.name} ({self.teacher.full_name})"
 
 # Assistant profile
-class AssistantProfile(models.Model):
+class AssistantProfile(AtomicSaveMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='assistant_profile')
     teacher = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE, related_name='assistants')
     full_name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=15)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
 
+    objects = TenantQuerySet.as_manager()
+
     def __str__(self):
         return f"Assistant: {self.full_name} (Teacher: {self.teacher.full_name})"
 
 # Student profile
-class StudentProfile(models.Model):
+class StudentProfile(AtomicSaveMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
     teacher = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE, related_name='students')
     full_name = models.CharField(max_length=100)
@@ -80,10 +103,117 @@ class StudentProfile(models.Model):
     grade = models.ForeignKey(Grade, on_delete=models.SET_NULL, null=True)
     center = models.ForeignKey(Center, on_delete=models.SET_NULL, null=True)
     is_approved = models.BooleanField(default=False)
+    # Digit-only copies of the numbers for indexed prefix search (accounts.search)
+    phone_digits = models.CharField(max_length=15, editable=False, db_index=True)
+    parent_digits = models.CharField(max_length=15, editable=False, db_index=True)
+
+    objects = TenantQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_counted()
+        return instance
+
+    def remember_counted(self):
+        # What the dashboard counters currently include for this student
+        self._counted = (self.__dict__.get('teacher_id'), self.__dict__.get('is_approved'))
+
+    def save(self, *args, **kwargs):
+        self.phone_digits = digits_only(self.phone_number)
+        self.parent_digits = digits_only(self.parent_number)
+        if update_fields := kwargs.get('update_fields'):
+            kwargs['update_fields'] = {*update_fields, 'phone_digits', 'parent_digits'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Student: {self.full_name} (Teacher: {self.teacher.full_name})"
 
+class DashboardStatsQuerySet(models.QuerySet):
+    COUNTERS = ('teachers_count', 'students_count', 'assistants_count', 'pending_approvals', 'centers_count')
+
+    def bump(self, teacher_id=None, include_global=True, **deltas):
+        """
+        Apply counter deltas to the teacher's row and to the global row.
+
+        Counters are clamped at zero so that drift (fixed by
+        rebuild_dashboard_stats) never blocks a write.
+        """
+        changes = {
+            name: Greatest(F(name) + delta, 0)
+            for name, delta in deltas.items() if delta
+        }
+        scope = Q(teacher__isnull=True) if include_global else Q(pk__in=[])
+        if teacher_id is not None:
+            scope |= Q(teacher_id=teacher_id)
+        if changes:
+            self.filter(scope).update(**changes)
+
+    def current(self, teacher_id=None):
+        """The teacher's row, or the global one; rebuilds the table if it is missing."""
+        try:
+            return self.get(teacher_id=teacher_id)
+        except DashboardStats.DoesNotExist:
+            DashboardStats.objects.db_manager(self.db).rebuild()
+            return self.get(teacher_id=teacher_id)
+
+    def rebuild(self):
+        """Recompute every row from the source tables."""
+        def count_by_teacher(queryset):
+            return dict(
+                queryset.values('teacher').order_by().annotate(n=models.Count('id')).values_list('teacher', 'n')
+            )
+
+        # Counted on this queryset's database: a shard only holds its own teachers
+        students = count_by_teacher(StudentProfile.objects.using(self.db))
+        pending = count_by_teacher(StudentProfile.objects.using(self.db).filter(is_approved=False))
+        assistants = count_by_teacher(AssistantProfile.objects.using(self.db))
+        centers = count_by_teacher(Center.objects.using(self.db))
+        teacher_ids = list(TeacherProfile.objects.using(self.db).values_list('id', flat=True))
+
+        rows = [
+            DashboardStats(
+                teacher_id=teacher_id,
+                students_count=students.get(teacher_id, 0),
+                pending_approvals=pending.get(teacher_id, 0),
+                assistants_count=assistants.get(teacher_id, 0),
+                centers_count=centers.get(teacher_id, 0),
+            )
+            for teacher_id in teacher_ids
+        ]
+        rows.append(DashboardStats(
+            teacher_id=None,
+            teachers_count=len(teacher_ids),
+            students_count=sum(students.values()),
+            pending_approvals=sum(pending.values()),
+            assistants_count=sum(assistants.values()),
+            centers_count=sum(centers.values()),
+        ))
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self.bulk_create(rows)
+
+# Precomputed dashboard counters, one row per teacher plus a global row
+# (teacher=None). Kept current by accounts.signals.
+class DashboardStats(models.Model):
+    teacher = models.OneToOneField(TeacherProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='stats')
+    teachers_count = models.PositiveIntegerField(default=0)
+    students_count = models.PositiveIntegerField(default=0)
+    assistants_count = models.PositiveIntegerField(default=0)
+    pending_approvals = models.PositiveIntegerField(default=0)
+    centers_count = models.PositiveIntegerField(default=0)
+
+    objects = DashboardStatsQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Teacher ids start at 1, so this only allows one global row
+            models.UniqueConstraint(Coalesce('teacher', Value(0)), name='single_global_dashboard_stats'),
+        ]
+
+    def __str__(self):
+        return f"Stats: {self.teacher_id or 'global'}"
+
 # Payment model for teacher payment history
 class Payment(models.Model):
     teacher = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE, related_name='payments')
@@ -0,0 +1,81 @@
+"""
+Indexed student search.
+
+Names and usernames are matched through the SQLite FTS5 table
+`accounts_studentprofile_fts`, which triggers (migrations 0006 and
+0008) keep in step with the student and user tables, and results are
+ranked by bm25.
+Each word of the query matches as a prefix, so "ahm ali" finds
+"Ahmed Ali". Queries made only of digits and phone punctuation match the
+start of the student's or parent's number instead, through the indexed
+digit-only copies of those columns.
+
+On database backends without FTS5 names fall back to a substring match.
+
+SQLite alters most columns by rebuilding the table, which fails while a
+trigger on another table references it and drops the triggers of the
+rebuilt table: a migration altering accounts_user or
+accounts_studentprofile drops the triggers first and recreates them
+afterwards, as 0007 and 0008 do.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .models import digits_only
+
+FTS_TABLE = 'accounts_studentprofile_fts'
+# Cursor ordering for ranked results; bm25 scores are negative, best first
+RANK_ORDERING = ('search_rank', 'id')
+
+PHONE_QUERY_RE = re.compile(r'[\d\s()+-]+')
+WORD_RE = re.compile(r'\w+')
+
+
+def phone_prefix(field, prefix):
+    # A range rather than LIKE so SQLite can walk the index; ':' sorts right after '9'
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + ':'})
+
+
+def match_expression(term):
+    """FTS5 query matching every word of `term` as a prefix; '' if there are none."""
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(term))
+
+
+def search_students(queryset, term):
+    """Narrow a StudentProfile queryset to the students matching `term`."""
+    term = term.strip()
+    if PHONE_QUERY_RE.fullmatch(term) and (prefix := digits_only(term)):
+        return queryset.filter(phone_prefix('phone_digits', prefix) | phone_prefix('parent_digits', prefix))
+
+    if connections[queryset.db].vendor != 'sqlite':
+        return queryset.filter(Q(full_name__icontains=term) | Q(user__username__icontains=term))
+
+    query = match_expression(term)
+    if not query:
+        return queryset.none()
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (query,))
+    ).annotate(search_rank=RawSQL(
+        f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'AND rowid = "accounts_studentprofile"."id"',
+        (query,), output_field=FloatField()
+    ))
+
+
+def search_ordering(queryset, default='-id'):
+    """Rank order for searched querysets, `default` otherwise."""
+    return RANK_ORDERING if 'search_rank' in queryset.query.annotations else default
+
+
+class StudentSearchFilter(BaseFilterBackend):
+    """Filter backend applying `search_students` to the `?search=` parameter."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        if term := request.query_params.get(self.search_param, '').strip():
+            return search_students(queryset, term)
+        return queryset
@@ -1,6 +1,12 @@
+from django.apps import apps
 from rest_framework import serializers
-from .models import User, TeacherProfile, StudentProfile, Center
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import User, TeacherProfile, StudentProfile, AssistantProfile, Center
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.eager_loading import EagerLoadingMixin
+from backend.serializers import ValuesSerializer
+from .authentication import profile_claims
 
 # User serializer
 class UserSerializer(serializers.ModelSerializer):
@@ -10,11 +16,12 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 # Teacher profile serializer
-class TeacherProfileSerializer(serializers.ModelSerializer):
+class TeacherProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = TeacherProfile
         fields = '__all__'
         read_only_fields = ['user']  # Keep user read-only
+        prefetch_related = ['grades']
 
     def create(self, validated_data):
         # Handle many-to-many relationship for grades
@@ -24,6 +31,17 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
         return teacher
 
 
+# Assistant profile serializer (read-only listing)
+class AssistantProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    teacher = serializers.CharField(source='teacher.full_name', read_only=True)
+
+    class Meta:
+        model = AssistantProfile
+        fields = ['id', 'username', 'full_name', 'phone_number', 'gender', 'teacher']
+        select_related = ['user', 'teacher']
+
+
 # Center serializer (read-only teacher)
 class CenterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,7 +55,7 @@ class CenterSerializer(serializers.ModelSerializer):
 class StudentProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudentProfile
-        fields = '__all__'
+        exclude = ['phone_digits', 'parent_digits']
         read_only_fields = ['user', 'teacher', 'is_approved']
 
     def validate_center(self, value):
@@ -47,15 +65,51 @@ class StudentProfileSerializer(serializers.ModelSerializer):
         if value and value.teacher != teacher:
             raise serializers.ValidationError("Center does not belong to the specified teacher")
         return value
+
+
+# Student list rows, read with .values()
+class StudentProfileListSerializer(ValuesSerializer):
+    class Meta:
+        serializer = StudentProfileSerializer
+
+
+def set_user_claims(token, user):
+    token['role'] = user.role
+    # Profile ids let StatelessJWTAuthentication resolve the owning
+    # teacher without touching the database
+    for claim, value in profile_claims(user).items():
+        token[claim] = value
+
+
 # Custom token serializer with role in claims
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['role'] = user.role
+        set_user_claims(token, user)
         return token
 
     def validate(self, attrs):
         data = super().validate(attrs)
         data['role'] = self.user.role
         return data
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token issuing access tokens with the user's current claims, not the ones from login."""
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        set_user_claims(access, User.objects.get(**{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]}))
+        return access
+
+    def outstand(self):
+        # simplejwt 5.5.0 records rotated tokens in the blacklist app's
+        # table even when that app is not installed, failing every refresh
+        if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+            return super().outstand()
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
@@ -0,0 +1,328 @@
+"""
+Per-teacher database sharding.
+
+Off unless `settings.SHARDS` lists database aliases. When it does,
+`ShardRouter` keeps each teacher's data (students, assistants, centers,
+attendance, quizzes, tests and study materials) in one shard database so
+that a write burst from one teacher only takes that shard's SQLite write
+lock. Users, teacher profiles, grades, subjects and payments stay in the
+catalog (the `default` database).
+
+The shard map is `User.shard`: the teacher's user row names the shard
+holding the teacher's data and every assistant and student user carries
+the same value. New teachers are placed on the shard with the fewest
+teachers. Rows written before sharding was enabled have an empty `shard`
+and stay in the catalog until moved with `move_teacher`.
+
+Queries are routed by the instance they come from (a shard row, or a
+user through its `shard`) and otherwise by the current request's user,
+which `TenantMiddleware` records for the router while the view runs.
+Streamed response bodies, iterated after that, are pinned to their
+database when the response is built (backend.exports). Code running
+outside a request selects a shard with `use_shard()`.
+
+Every database gets the full schema through `migrate_shards`, which
+pins every query of each `migrate` run, data migrations included, to
+the database being migrated; plain `migrate` only suits the catalog.
+Shards hold replicas of the catalog rows their tables point at: all grades and
+subjects, and the shard's own users and teacher profiles. The replicas
+keep the foreign keys valid and let joins run inside the shard; they are
+refreshed by the signals in accounts.signals and by `migrate_shards`.
+Each shard allocates ids from its own range (`SHARD_ID_SPAN`), so a
+teacher's rows keep their ids when they move.
+
+Admin and staff requests have no shard. The admin dashboard adds up the
+global counter rows of every database; other queries they make on
+sharded models, without a row that names the shard, raise
+`ShardingUnsupported` (403) instead of answering from the catalog alone.
+
+Limitations:
+
+* While sharding is enabled, admin endpoints over students, assistants
+  and centers (approval, admin-wide lists, details) and the Django admin
+  pages of those models answer 403, by design: see
+  `ShardingUnsupported`. The admin dashboard and teacher management
+  keep working.
+* A transaction spans one database. `transaction.atomic()` call sites
+  pass the alias of the rows they write; catalog and shard writes in the
+  same request are committed separately.
+* Management commands other than `migrate_shards`, `move_teacher` and
+  `import_students` work on the catalog unless run inside `use_shard()`.
+* `move_teacher` does not stop the teacher's users from writing while
+  their rows are copied; run it while the tenant is idle. It revokes
+  the users' access tokens, which carry the shard as a claim, so their
+  next refresh picks up the new shard.
+* Catalog replicas are only updated through model save/delete;
+  `QuerySet.update()` on users, grades or subjects needs a
+  `migrate_shards` run to reach the shards.
+"""
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+
+from .authentication import revoke_tokens
+from .models import User, TeacherProfile, Grade, Subject
+
+CATALOG = DEFAULT_DB_ALIAS
+
+SHARDED_APPS = {'attendance', 'quizzes', 'studymaterials', 'test_scores'}
+SHARDED_MODELS = {
+    'accounts.center', 'accounts.assistantprofile', 'accounts.studentprofile', 'accounts.dashboardstats',
+}
+
+# Shard n (1-based position in settings.SHARDS) allocates ids from n * SHARD_ID_SPAN
+SHARD_ID_SPAN = 10 ** 12
+
+_active_shard = ContextVar('active_shard', default=None)
+_active_request = ContextVar('active_request', default=None)
+_pinned_database = ContextVar('pinned_database', default=None)
+
+
+class ShardingUnsupported(PermissionDenied):
+    """
+    An admin query on sharded data with no shard to route to.
+
+    Admins hold no shard, and the catalog alone would give silently
+    incomplete answers. A PermissionDenied, so that both DRF and the
+    Django admin answer 403.
+    """
+
+    def __init__(self, model):
+        super().__init__(
+            f"{model._meta.verbose_name_plural.capitalize()} are not available to admins "
+            f"while per-teacher sharding is enabled."
+        )
+
+
+def sharding_enabled():
+    return bool(settings.SHARDS)
+
+
+def all_databases():
+    """The catalog followed by every shard."""
+    return [CATALOG, *settings.SHARDS]
+
+
+def is_sharded(model):
+    opts = model._meta
+    return opts.app_label in SHARDED_APPS or opts.label_lower in SHARDED_MODELS
+
+
+def sharded_models():
+    return [model for model in apps.get_models(include_auto_created=True) if is_sharded(model)]
+
+
+def tenant_lookup(model):
+    """Lookup path from `model` to the owning teacher, as used by `TenantQuerySet`."""
+    if model._meta.auto_created:
+        # Many-to-many table: go through the model that declares the field
+        owner = model._meta.auto_created
+        return f'{owner._meta.model_name}__{tenant_lookup(owner)}'
+    return getattr(model, 'TENANT_FIELD', 'teacher')
+
+
+@contextmanager
+def use_shard(alias):
+    """Route tenant queries to `alias` (no-op for None) inside the block."""
+    token = _active_shard.set(alias)
+    try:
+        yield
+    finally:
+        _active_shard.reset(token)
+
+
+@contextmanager
+def pin_database(alias):
+    """Route every query, catalog models included, to `alias` inside the block."""
+    token = _pinned_database.set(alias)
+    try:
+        yield
+    finally:
+        _pinned_database.reset(token)
+
+
+@contextmanager
+def activate_request(request):
+    """Route tenant queries by `request.user` inside the block (see TenantMiddleware)."""
+    token = _active_request.set(request)
+    try:
+        yield
+    finally:
+        _active_request.reset(token)
+
+
+def current_shard():
+    if alias := _active_shard.get():
+        return alias
+    user = getattr(_active_request.get(), 'user', None)
+    return getattr(user, 'shard', None) or None
+
+
+def admin_request():
+    user = getattr(_active_request.get(), 'user', None)
+    return getattr(user, 'role', None) == 'admin' or getattr(user, 'is_staff', False)
+
+
+def shard_of_teacher(teacher_id):
+    if not sharding_enabled() or teacher_id is None:
+        return None
+    shard = User.objects.filter(teacher_profile__pk=teacher_id).values_list('shard', flat=True).first()
+    return shard or None
+
+
+def shard_of_instance(instance):
+    model = type(instance)
+    if isinstance(instance, User):
+        return instance.shard or None
+    if isinstance(instance, TeacherProfile):
+        if user := instance._state.fields_cache.get('user'):
+            return user.shard or None
+        return shard_of_teacher(instance.pk)
+    if is_sharded(model):
+        if instance._state.db in settings.SHARDS:
+            return instance._state.db
+        lookup = tenant_lookup(model)
+        if '__' not in lookup:
+            return shard_of_teacher(getattr(instance, f'{lookup}_id'))
+    return None
+
+
+def pick_shard():
+    """Shard for a new teacher: the one holding the fewest teachers."""
+    counts = dict(
+        User.objects.filter(role='teacher', shard__in=settings.SHARDS)
+        .values('shard').order_by().annotate(n=Count('id')).values_list('shard', 'n')
+    )
+    return min(settings.SHARDS, key=lambda alias: counts.get(alias, 0))
+
+
+class ShardRouter:
+    """Database router placing teacher-owned models on the teacher's shard."""
+
+    def db_for_read(self, model, **hints):
+        if alias := _pinned_database.get():
+            return alias
+        if not sharding_enabled():
+            return None
+        if not is_sharded(model):
+            return CATALOG
+        if (instance := hints.get('instance')) is not None:
+            if alias := shard_of_instance(instance):
+                return alias
+        if alias := current_shard():
+            return alias
+        if admin_request():
+            raise ShardingUnsupported(model)
+        return CATALOG
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not sharding_enabled():
+            return None
+        if obj1._state.db == obj2._state.db:
+            return True
+        # Shard rows may point at catalog rows, which every shard replicates
+        return not (is_sharded(type(obj1)) and is_sharded(type(obj2)))
+
+
+def replicate(model, objs, aliases):
+    """Insert or refresh copies of catalog rows in the given shards."""
+    fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    for alias in aliases:
+        if alias and alias != CATALOG:
+            model.objects.using(alias).bulk_create(
+                [copy.copy(obj) for obj in objs],
+                update_conflicts=True, unique_fields=['pk'], update_fields=fields
+            )
+
+
+def unreplicate(model, pk, aliases):
+    for alias in aliases:
+        if alias and alias != CATALOG:
+            model._base_manager.using(alias).filter(pk=pk).delete()
+
+
+def sync_catalog(alias):
+    """Refresh every catalog replica held by shard `alias`."""
+    replicate(Grade, Grade.objects.all(), [alias])
+    replicate(Subject, Subject.objects.all(), [alias])
+    replicate(User, User.objects.filter(shard=alias), [alias])
+    replicate(TeacherProfile, TeacherProfile.objects.filter(user__shard=alias), [alias])
+
+
+def seed_id_ranges(alias):
+    """Start the id sequences of a shard's tenant tables at the shard's range."""
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return
+    start = (settings.SHARDS.index(alias) + 1) * SHARD_ID_SPAN
+    with connection.cursor() as cursor:
+        for model in sharded_models():
+            table = model._meta.db_table
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT %s, 0 "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+                [table, table]
+            )
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s",
+                [start, table, start]
+            )
+
+
+def tenant_users(teacher, alias):
+    """Ids of the teacher's user and of every assistant and student user on `alias`."""
+    from .models import AssistantProfile, StudentProfile
+    ids = {teacher.user_id}
+    for model in (AssistantProfile, StudentProfile):
+        ids.update(model.objects.using(alias).filter(teacher=teacher).values_list('user_id', flat=True))
+    return ids
+
+
+def move_teacher(teacher, target, log=None):
+    """
+    Copy a teacher's rows to `target`, repoint the shard map, then delete
+    the rows from the old database. Returns the number of rows moved.
+    """
+    from .models import DashboardStats
+    log = log or (lambda message: None)
+    source = teacher.user.shard or CATALOG
+    user_ids = tenant_users(teacher, source)
+    users = User.objects.filter(pk__in=user_ids)
+
+    moved = 0
+    with transaction.atomic(using=target):
+        if target != CATALOG:
+            replicate(Grade, Grade.objects.all(), [target])
+            replicate(Subject, Subject.objects.all(), [target])
+            replicate(User, users, [target])
+            replicate(TeacherProfile, [teacher], [target])
+        for model in sharded_models():
+            rows = list(model._base_manager.using(source).filter(**{f'{tenant_lookup(model)}_id': teacher.pk}))
+            # bulk_create keeps the ids and skips the save signals
+            model._base_manager.using(target).bulk_create(rows, batch_size=500)
+            moved += len(rows)
+            log(f"{model._meta.label}: {len(rows)}")
+
+    User.objects.filter(pk__in=user_ids).update(shard='' if target == CATALOG else target)
+    # Their access tokens name the old shard
+    revoke_tokens(user_ids)
+
+    # Delete signals (counter updates) must land on the source as well
+    with use_shard(source), transaction.atomic(using=source):
+        for model in reversed(sharded_models()):
+            model._base_manager.using(source).filter(**{f'{tenant_lookup(model)}_id': teacher.pk}).delete()
+        if source != CATALOG:
+            TeacherProfile._base_manager.using(source).filter(pk=teacher.pk).delete()
+            User._base_manager.using(source).filter(pk__in=user_ids).delete()
+
+    for alias in (source, target):
+        DashboardStats.objects.db_manager(alias).rebuild()
+    return moved
@@ -0,0 +1,162 @@
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import revoke_tokens
+from .models import User, TeacherProfile, AssistantProfile, StudentProfile, Center, Grade, Subject, DashboardStats
+from .sharding import CATALOG, pick_shard, replicate, shard_of_teacher, sharding_enabled, unreplicate
+
+
+# Shard map and catalog replicas (accounts.sharding). These run before the
+# counter handlers below, which may write to a shard that needs the replicas.
+
+@receiver(pre_save, sender=User)
+def place_teacher(sender, instance, using, **kwargs):
+    # Only new teachers: existing ones keep their rows where they are until moved
+    if (sharding_enabled() and using == CATALOG and instance._state.adding
+            and instance.role == 'teacher' and not instance.shard):
+        instance.shard = pick_shard()
+
+
+@receiver(pre_save, sender=StudentProfile)
+@receiver(pre_save, sender=AssistantProfile)
+def place_member(sender, instance, **kwargs):
+    if sharding_enabled() and instance._state.adding:
+        shard = shard_of_teacher(instance.teacher_id) or ''
+        if instance.user.shard != shard:
+            instance.user.shard = shard
+            instance.user.save(update_fields=['shard'])
+
+
+@receiver(post_save, sender=User)
+def user_replicated(sender, instance, using, **kwargs):
+    if using == CATALOG and instance.shard:
+        replicate(User, [instance], [instance.shard])
+
+
+@receiver(post_save, sender=TeacherProfile)
+def teacher_replicated(sender, instance, using, **kwargs):
+    if sharding_enabled() and using == CATALOG:
+        replicate(TeacherProfile, [instance], [instance.user.shard])
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_save, sender=Subject)
+def reference_replicated(sender, instance, using, **kwargs):
+    if using == CATALOG:
+        replicate(sender, [instance], settings.SHARDS)
+
+
+@receiver(post_delete, sender=User)
+def user_unreplicated(sender, instance, using, **kwargs):
+    # Cascades to the user's profile and its data inside the shard
+    if using == CATALOG and instance.shard:
+        unreplicate(User, instance.pk, [instance.shard])
+
+
+@receiver(post_delete, sender=TeacherProfile)
+def teacher_unreplicated(sender, instance, using, **kwargs):
+    if sharding_enabled() and using == CATALOG:
+        unreplicate(TeacherProfile, instance.pk, settings.SHARDS)
+
+
+@receiver(post_delete, sender=Grade)
+@receiver(post_delete, sender=Subject)
+def reference_unreplicated(sender, instance, using, **kwargs):
+    if using == CATALOG:
+        unreplicate(sender, instance.pk, settings.SHARDS)
+
+
+# Access tokens carry the user's role, profile and teacher as claims
+# (accounts.authentication): reject those issued before they changed.
+# These run before the counter handlers below, which reset `_counted`.
+
+@receiver(post_save, sender=User)
+def user_deactivated(sender, instance, created, using, **kwargs):
+    if not created and using == CATALOG and not instance.is_active:
+        revoke_tokens([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_delete, sender=AssistantProfile)
+@receiver(post_delete, sender=StudentProfile)
+def profile_removed(sender, instance, **kwargs):
+    revoke_tokens([instance.pk if sender is User else instance.user_id])
+
+
+@receiver(post_save, sender=StudentProfile)
+def student_reassigned(sender, instance, created, **kwargs):
+    old_teacher_id, _ = getattr(instance, '_counted', (None, None))
+    if not created and old_teacher_id is not None and old_teacher_id != instance.teacher_id:
+        revoke_tokens([instance.user_id])
+
+
+# Dashboard counters, bumped on the database the row was written to: with
+# sharding, each database's global row counts the rows that database holds.
+
+@receiver(post_save, sender=TeacherProfile)
+def teacher_saved(sender, instance, created, using, **kwargs):
+    if created:
+        # save() rather than create() so the router places the row on the teacher's shard
+        DashboardStats(teacher=instance).save(force_insert=True)
+        DashboardStats.objects.db_manager(using).bump(teachers_count=1)
+
+
+@receiver(post_delete, sender=TeacherProfile)
+def teacher_deleted(sender, instance, using, **kwargs):
+    # The teacher's own row goes with the cascade
+    DashboardStats.objects.db_manager(using).bump(teachers_count=-1)
+
+
+@receiver(post_save, sender=StudentProfile)
+def student_saved(sender, instance, created, using, **kwargs):
+    pending = 0 if instance.is_approved else 1
+    if created:
+        DashboardStats.objects.db_manager(using).bump(instance.teacher_id, students_count=1, pending_approvals=pending)
+    else:
+        old_teacher_id, old_approved = getattr(instance, '_counted', (None, None))
+        if old_approved is not None:
+            old_pending = 0 if old_approved else 1
+            if old_teacher_id == instance.teacher_id:
+                DashboardStats.objects.db_manager(using).bump(instance.teacher_id, pending_approvals=pending - old_pending)
+            else:
+                # Moving between teachers leaves the global totals unchanged
+                DashboardStats.objects.db_manager(using).bump(
+                    old_teacher_id, include_global=False,
+                    students_count=-1, pending_approvals=-old_pending
+                )
+                DashboardStats.objects.db_manager(using).bump(
+                    instance.teacher_id, include_global=False,
+                    students_count=1, pending_approvals=pending
+                )
+                DashboardStats.objects.db_manager(using).bump(pending_approvals=pending - old_pending)
+    instance.remember_counted()
+
+
+@receiver(post_delete, sender=StudentProfile)
+def student_deleted(sender, instance, using, **kwargs):
+    pending = 0 if instance.is_approved else 1
+    DashboardStats.objects.db_manager(using).bump(instance.teacher_id, students_count=-1, pending_approvals=-pending)
+
+
+@receiver(post_save, sender=AssistantProfile)
+def assistant_saved(sender, instance, created, using, **kwargs):
+    if created:
+        DashboardStats.objects.db_manager(using).bump(instance.teacher_id, assistants_count=1)
+
+
+@receiver(post_delete, sender=AssistantProfile)
+def assistant_deleted(sender, instance, using, **kwargs):
+    DashboardStats.objects.db_manager(using).bump(instance.teacher_id, assistants_count=-1)
+
+
+@receiver(post_save, sender=Center)
+def center_saved(sender, instance, created, using, **kwargs):
+    if created:
+        DashboardStats.objects.db_manager(using).bump(instance.teacher_id, centers_count=1)
+
+
+@receiver(post_delete, sender=Center)
+def center_deleted(sender, instance, using, **kwargs):
+    DashboardStats.objects.db_manager(using).bump(instance.teacher_id, centers_count=-1)
@@ -0,0 +1,53 @@
+"""
+Request-scoped tenant resolution.
+
+Every teacher is a tenant: assistants work on their teacher's data and
+students belong to exactly one teacher. `TenantMiddleware` attaches a
+`TenantResolver` to each request as `request.tenant`; it resolves the
+owning teacher once, on first use, and views scope their querysets with
+`Model.objects.for_teacher(request)`.
+"""
+from functools import cached_property
+
+from django.db import models
+from rest_framework.exceptions import PermissionDenied
+
+
+class TenantResolver:
+    def __init__(self, request):
+        self._request = request
+
+    @property
+    def user(self):
+        # DRF stores the authenticated user back on the Django request
+        return self._request.user
+
+    @cached_property
+    def teacher(self):
+        """Teacher owning the data handled by a teacher or assistant."""
+        user = self.user
+        if user.role == 'teacher':
+            return user.teacher_profile
+        elif user.role == 'assistant':
+            return user.assistant_profile.teacher
+        raise PermissionDenied("Invalid user role")
+
+    @cached_property
+    def student(self):
+        user = self.user
+        if user.role == 'student':
+            return user.student_profile
+        raise PermissionDenied("Invalid user role")
+
+
+class TenantQuerySet(models.QuerySet):
+    """
+    QuerySet for models owned by a teacher.
+
+    Models name the lookup path to their teacher in `TENANT_FIELD`
+    (default `'teacher'`, e.g. `'student__teacher'` for attendance).
+    """
+
+    def for_teacher(self, request):
+        lookup = getattr(self.model, 'TENANT_FIELD', 'teacher')
+        return self.filter(**{f'{lookup}_id': request.tenant.teacher.pk})
@@ -0,0 +1,952 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+from base64 import b64encode
+from datetime import date, datetime
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from attendance.models import Attendance
+from backend.concurrency import BoundedPool, pools
+from backend.renderers import FastJSONRenderer
+from backend.testing import (
+    LOCAL_CACHES, SHARDS, APIClientMixin, QueryCountAssertionsMixin, ShardedTestCase, TenantTestCase,
+)
+from quizzes.models import Quiz, QuizSubmission
+from test_scores.models import Test, TestScore
+
+from . import importing, views
+from .authentication import ClaimsUser
+from .keys import KeyFile, key_store
+from .models import User, TeacherProfile, StudentProfile, AssistantProfile, Center, DashboardStats, Grade
+from .serializers import StudentProfileSerializer, StudentProfileListSerializer
+from .tenancy import TenantResolver
+from .sharding import (
+    CATALOG, SHARD_ID_SPAN, ShardRouter, current_shard, move_teacher, pin_database, sharded_models, sync_catalog,
+    tenant_lookup, use_shard,
+)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class StatelessAuthenticationTests(TenantTestCase):
+
+    def test_claims_identify_the_tenant(self):
+        client, tokens = self.login('a1')
+        claims = AccessToken(tokens['access'])
+        self.assertEqual(claims['role'], 'assistant')
+        self.assertEqual(claims['assistant_profile_id'], self.assistant.pk)
+        self.assertEqual(claims['teacher_profile_id'], self.teacher.pk)
+
+        response = client.get('/api/accounts/students/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.wsgi_request.user, ClaimsUser)
+        self.assertEqual({row['id'] for row in response.json()['results']}, {s.pk for s in self.students})
+
+    def test_deactivated_user_is_rejected(self):
+        client, _ = self.login('t1')
+        self.assertEqual(client.get('/api/accounts/students/').status_code, 200)
+
+        self.teacher.user.is_active = False
+        self.teacher.user.save()
+        response = client.get('/api/accounts/students/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+    def test_deleted_student_is_rejected(self):
+        client, _ = self.login('s0')
+        self.assertEqual(client.get('/api/accounts/dashboard/student/').status_code, 200)
+
+        self.students[0].delete()
+        self.assertEqual(client.get('/api/accounts/dashboard/student/').status_code, 401)
+
+    def test_refresh_issues_current_claims(self):
+        client, tokens = self.login('s1')
+        student = self.students[1]
+        student.teacher = self.teacher2
+        student.center = self.center2
+        student.save()
+        self.assertEqual(client.get('/api/accounts/dashboard/student/').status_code, 401)
+
+        response = client.post('/api/accounts/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['teacher_profile_id'], self.teacher2.pk)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(client.get('/api/accounts/dashboard/student/').status_code, 200)
+
+
+def write_key_pair(directory):
+    """A fresh RSA key pair as `private.pem`/`public.pem` in `directory`."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    for name, content in (('private.pem', private), ('public.pem', public)):
+        write_key_file(directory / name, content)
+    return public.decode()
+
+
+def write_key_file(path, content):
+    """Replace `path` with `content` the way keys are rotated: through a temporary file."""
+    previous = path.stat().st_mtime_ns if path.exists() else 0
+    temporary = path.with_name(f'.{path.name}.tmp')
+    temporary.write_bytes(content)
+    # Coarse filesystem clocks could otherwise hide the rewrite
+    os.utime(temporary, ns=(previous + 10 ** 9, previous + 10 ** 9))
+    os.replace(temporary, path)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class KeyStoreTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        workdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, workdir)
+        self.workdir = workdir
+        self.public_key = write_key_pair(workdir)
+        self.enterContext(override_settings(
+            JWT_SIGNING_KEY_PATH=str(workdir / 'private.pem'), JWT_VERIFYING_KEY_PATH=str(workdir / 'public.pem')
+        ))
+
+    def test_public_key_is_served_with_an_etag(self):
+        client = APIClient()
+        response = client.get('/api/accounts/public-key/')
+        self.assertEqual(response.json(), {'public_key': self.public_key})
+        self.assertIn('max-age', response['Cache-Control'])
+
+        cached = client.get('/api/accounts/public-key/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_rotated_keys_are_picked_up_without_a_restart(self):
+        old_client, _ = self.login('t1')
+        etag = APIClient().get('/api/accounts/public-key/')['ETag']
+        self.assertEqual(old_client.get('/api/accounts/dashboard/teacher/').status_code, 200)
+
+        public_key = write_key_pair(self.workdir)
+        self.assertEqual(key_store.verifying_key.read(), public_key)
+        response = APIClient().get('/api/accounts/public-key/', headers={'If-None-Match': etag})
+        self.assertEqual(response.json(), {'public_key': public_key})
+
+        # Tokens signed with the old key no longer verify; new ones do
+        self.assertEqual(old_client.get('/api/accounts/dashboard/teacher/').status_code, 401)
+        new_client, _ = self.login('t1')
+        self.assertEqual(new_client.get('/api/accounts/dashboard/teacher/').status_code, 200)
+
+    def test_a_key_parsed_during_a_reload_is_not_kept(self):
+        path = self.workdir / 'key.txt'
+        write_key_file(path, b'old')
+        key_file = KeyFile(str(path))
+        reload = threading.Thread(target=key_file.read)
+
+        def parse(text):
+            # The file is rotated and reloaded by another thread while
+            # this one is still parsing the old contents
+            if reload.ident is None:
+                write_key_file(path, b'new')
+                reload.start()
+                reload.join(timeout=0.2)
+            return f'parsed {text}'
+
+        self.assertEqual(key_file.prepared(parse), 'parsed old')
+        reload.join()
+        self.assertEqual(key_file.prepared(parse), 'parsed new')
+
+
+class TenantResolverTests(TenantTestCase):
+
+    def test_teacher_is_resolved_once_per_request(self):
+        request = SimpleNamespace(user=User.objects.get(pk=self.assistant.user.pk))
+        tenant = TenantResolver(request)
+        with self.assertNumQueries(2):
+            self.assertEqual(tenant.teacher, self.teacher)
+        with self.assertNumQueries(0):
+            self.assertEqual(tenant.teacher, self.teacher)
+        with self.assertRaises(PermissionDenied):
+            tenant.student
+
+    def test_views_are_scoped_to_the_tenant(self):
+        client, _ = self.login('t1')
+        self.assertEqual(client.get(f'/api/accounts/students/{self.students[0].pk}/').status_code, 200)
+        self.assertEqual(client.get(f'/api/accounts/students/{self.other_student.pk}/').status_code, 404)
+        self.assertEqual({row['name'] for row in client.get('/api/accounts/centers/').json()['results']}, {'C1'})
+
+        other, _ = self.login('t2')
+        response = other.patch(f'/api/accounts/assistants/{self.assistant.pk}/', {'full_name': 'Taken'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assistant.refresh_from_db()
+        self.assertEqual(self.assistant.full_name, 'Assistant One')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ListQueryCountTests(QueryCountAssertionsMixin, TenantTestCase):
+
+    def get(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['results'])
+
+    def test_students(self):
+        client, _ = self.login('t1')
+        self.assertConstantQueries(
+            lambda: self.get(client, '/api/accounts/students/'),
+            lambda: [self.create_student(f'n{i}', self.teacher, self.center, f'New {i}') for i in range(3)]
+        )
+
+    def test_teachers(self):
+        client, _ = self.login('adm')
+        self.assertConstantQueries(
+            lambda: self.get(client, '/api/accounts/teachers/'),
+            lambda: [self.create_teacher(f'n{i}') for i in range(3)]
+        )
+
+    def test_assistants(self):
+        client, _ = self.login('t1')
+        self.assertConstantQueries(
+            lambda: self.get(client, '/api/accounts/assistants/'),
+            lambda: [
+                AssistantProfile.objects.create(
+                    user=User.objects.create_user(f'n{i}', role='assistant'), teacher=self.teacher,
+                    full_name=f'Assistant {i}', phone_number='0100000004', gender='female'
+                )
+                for i in range(3)
+            ]
+        )
+
+    def test_centers(self):
+        client, _ = self.login('a1')
+        self.assertConstantQueries(
+            lambda: self.get(client, '/api/accounts/centers/'),
+            lambda: [Center.objects.create(name=f'New {i}', teacher=self.teacher) for i in range(3)]
+        )
+
+
+class StudentPaginationTests(TenantTestCase):
+
+    def test_function_views_are_cursor_paginated(self):
+        client, _ = self.login('t1')
+        page = client.get('/api/accounts/students/?page_size=2').json()
+        self.assertEqual(set(page), {'next', 'previous', 'results'})
+        self.assertEqual(len(page['results']), 2)
+
+        ids = [row['id'] for row in page['results']]
+        while page['next']:
+            page = client.get(page['next']).json()
+            ids += [row['id'] for row in page['results']]
+        self.assertEqual(ids, sorted((student.pk for student in self.students), reverse=True))
+
+    def test_malformed_cursors_are_not_found(self):
+        client, _ = self.login('t1')
+        for position in ('not-json', '[1,2]'):
+            cursor = b64encode(f'p={position}'.encode()).decode()
+            self.assertEqual(client.get(f'/api/accounts/students/?cursor={cursor}').status_code, 404)
+
+    def test_stream_matches_the_pages(self):
+        client = self.client_for(self.admin)
+        for query in ('', 'search=Student&'):
+            with self.subTest(query=query):
+                expected, url = [], f'/api/accounts/students/?{query}page_size=2'
+                while url:
+                    page = client.get(url).json()
+                    expected += page['results']
+                    url = page['next']
+                response = client.get(f'/api/accounts/students/?{query}stream=1')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+                self.assertEqual(len(expected), 6)
+
+
+class StudentTimelineTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        student = self.student = self.students[0]
+        test = Test.objects.create(name='Test', teacher=self.teacher, description='')
+        for day in range(1, 11):
+            Attendance.objects.create(student=student, date=date(2026, 1, day), attended=bool(day % 2))
+            # Several kinds on the same day, and several of a kind
+            TestScore.objects.create(test=test, student=student, score=day, date_taken=date(2026, 1, 1 + day % 4))
+        for i in range(6):
+            quiz = Quiz.objects.create(title=f'Quiz {i}', description='', created_by=self.teacher, grade=self.grade)
+            submission = QuizSubmission.objects.create(quiz=quiz, student=student, is_completed=True, score=i)
+            QuizSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=timezone.make_aware(datetime(2026, 1, 2 + i % 3, 9 + i))
+            )
+        # Not finished: not on the timeline
+        QuizSubmission.objects.create(quiz=quiz, student=self.students[1], is_completed=False)
+        self.url = f'/api/accounts/students/{student.pk}/timeline/'
+
+    def test_pages_cover_every_entry_newest_first(self):
+        client, _ = self.login('a1')
+        entries, counts = [], set()
+        url = f'{self.url}?page_size=7'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.add(len(queries))
+            entries += response.json()['results']
+            url = response.json()['next']
+
+        self.assertEqual(len(counts), 1)
+        keys = [(entry['kind'], entry['id']) for entry in entries]
+        self.assertEqual(len(set(keys)), 26)
+        self.assertEqual(
+            {kind: sum(1 for key in keys if key[0] == kind) for kind, _ in keys},
+            {'attendance': 10, 'test': 10, 'quiz': 6}
+        )
+        dates = [entry['date'] for entry in entries]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_access(self):
+        client, _ = self.login('t2')
+        self.assertEqual(client.get(self.url).status_code, 404)
+        client, _ = self.login('t1')
+        self.assertEqual(client.get(f'{self.url}?cursor=garbage').status_code, 404)
+        self.assertEqual(self.client_for(self.admin).get(self.url).status_code, 200)
+
+
+class StudentImportTests(TenantTestCase):
+
+    def roster(self, count, **fields):
+        return [
+            {'username': f'imp{i}', 'password': f'secret-{i}', 'full_name': f'Imported {i}', 'phone_number': '010 1234',
+             'parent_number': '0111', 'gender': 'female', 'center': self.center.pk, 'grade': self.grade.pk, **fields}
+            for i in range(count)
+        ]
+
+    def test_json_roster(self):
+        client, _ = self.login('t1')
+        response = client.post('/api/accounts/students/import/', {'students': self.roster(5)}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['created'], 5)
+
+        student = StudentProfile.objects.select_related('user').get(user__username='imp3')
+        self.assertEqual((student.teacher, student.center, student.user.role), (self.teacher, self.center, 'student'))
+        self.assertEqual(student.phone_digits, '0101234')
+        self.assertTrue(student.user.check_password('secret-3'))
+        stats = DashboardStats.objects.get(teacher=self.teacher)
+        self.assertEqual((stats.students_count, stats.pending_approvals), (10, 10))
+
+    def test_one_bad_row_imports_nothing(self):
+        client, _ = self.login('t1')
+        rows = self.roster(3)
+        rows[1]['center'] = self.center2.pk
+        rows[2]['username'] = 's0'
+        response = client.post('/api/accounts/students/import/', {'students': rows}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2, 3])
+        self.assertFalse(User.objects.filter(username__startswith='imp').exists())
+
+    def test_csv_upload_and_command(self):
+        client, _ = self.login('adm')
+        upload = SimpleUploadedFile('roster.csv', (
+            'username,password,full_name,phone_number,parent_number,gender,center,grade\n'
+            'csv1,secret-1,CSV One,0100,0111,male,,\n'
+        ).encode())
+        response = client.post('/api/accounts/students/import/', {'file': upload, 'teacher': self.teacher.pk})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIsNone(StudentProfile.objects.get(user__username='csv1').center)
+
+        path = Path(tempfile.mkdtemp()) / 'roster.json'
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_text(json.dumps(self.roster(2, center=self.center2.pk)))
+        out = StringIO()
+        call_command('import_students', str(path), teacher=self.teacher2.pk, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Imported 2 student(s).')
+        self.assertEqual(StudentProfile.objects.filter(teacher=self.teacher2, user__username__startswith='imp').count(), 2)
+
+    def test_passwords_are_hashed_in_parallel(self):
+        with mock.patch.object(importing, 'PARALLEL_HASH_THRESHOLD', 2):
+            hashes = importing.hash_passwords(['one', 'two', 'three', 'four'], workers=2)
+        self.assertEqual(len(set(hashes)), 4)
+        for password, encoded in zip(['one', 'two', 'three', 'four'], hashes):
+            self.assertTrue(check_password(password, encoded))
+
+    def test_requests_share_one_pool(self):
+        self.addCleanup(setattr, importing, '_shared_pool', None)
+        with mock.patch.object(importing, 'PARALLEL_HASH_THRESHOLD', 2):
+            first = importing.hash_passwords(['one', 'two'])
+            pool = importing.shared_pool()
+            self.addCleanup(pool.shutdown)
+            second = importing.hash_passwords(['three', 'four'])
+        self.assertIs(importing.shared_pool(), pool)
+        for password, encoded in zip(['one', 'two', 'three', 'four'], first + second):
+            self.assertTrue(check_password(password, encoded))
+
+    def test_usernames_follow_the_user_model(self):
+        client, _ = self.login('t1')
+        for username in ('has space', 'bad!chars', 'x' * 151):
+            with self.subTest(username=username):
+                rows = self.roster(1, username=username)
+                response = client.post('/api/accounts/students/import/', {'students': rows}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('username', response.json()['errors'][0]['errors'])
+        self.assertEqual(client.post(
+            '/api/accounts/students/import/', {'students': self.roster(1, username='ok.name+1@x')}, format='json'
+        ).status_code, 201)
+
+
+@override_settings(CACHES=LOCAL_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncLoginTests(APIClientMixin, TransactionTestCase):
+    # Passwords are checked on the login pool's own threads and connections,
+    # which only see committed rows
+
+    def setUp(self):
+        User.objects.create_user('stu', password=self.PASSWORD, role='student')
+        self.async_client = AsyncClient()
+
+    async def post(self, url, data):
+        return await self.async_client.post(url, data, content_type='application/json')
+
+    async def test_same_responses_as_the_sync_endpoints(self):
+        credentials = {'username': 'stu', 'password': self.PASSWORD}
+        threads = []
+        validate = views._validate_token_request
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return validate(*args)
+
+        with mock.patch.object(views, '_validate_token_request', record_thread):
+            response = await self.post('/api/accounts/login/async/', credentials)
+        self.assertEqual(response.status_code, 200)
+        tokens = json.loads(response.content)
+        self.assertEqual(set(tokens), {'access', 'refresh', 'role'})
+        self.assertTrue(threads[0].startswith('login'))
+
+        response = await self.post('/api/accounts/refresh/async/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', json.loads(response.content))
+
+        for data in ({'username': 'stu', 'password': 'wrong'}, {'username': 'stu'}, {'refresh': 'garbage'}):
+            url = '/api/accounts/refresh/' if 'refresh' in data else '/api/accounts/login/'
+            expected = await sync_to_async(self.client.post)(url, data, content_type='application/json')
+            response = await self.post(f'{url}async/', data)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+
+        response = await self.async_client.get('/api/accounts/login/async/')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_bursts_are_bounded(self):
+        credentials = {'username': 'stu', 'password': self.PASSWORD}
+        with mock.patch.object(views.login_pool, 'max_pending', 0):
+            response = await self.post('/api/accounts/login/async/', credentials)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        # Concurrent last_login writes would fail on the in-memory test
+        # database, which cannot wait for a lock
+        with mock.patch('rest_framework_simplejwt.serializers.update_last_login'):
+            responses = await asyncio.gather(*[
+                self.post('/api/accounts/login/async/', credentials) for _ in range(2 * views.login_pool.workers)
+            ])
+        self.assertEqual({response.status_code for response in responses}, {200})
+
+
+@override_settings(CACHES=LOCAL_CACHES, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncDashboardTests(APIClientMixin, TransactionTestCase):
+    # The dashboards' queries run on the dashboard pool's own threads and
+    # connections, which only see committed rows
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        grade = Grade.objects.create(name='Grade 1')
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user('tea', password=self.PASSWORD, role='teacher'),
+            full_name='Teacher', phone_number='0100000001', gender='male'
+        )
+        center = Center.objects.create(name='Main', teacher=teacher)
+        AssistantProfile.objects.create(
+            user=User.objects.create_user('ast', password=self.PASSWORD, role='assistant'),
+            teacher=teacher, full_name='Assistant', phone_number='0100000003', gender='male'
+        )
+        student = StudentProfile.objects.create(
+            user=User.objects.create_user('stu', password=self.PASSWORD, role='student'),
+            teacher=teacher, full_name='Student', phone_number='0100000002', parent_number='0110000002',
+            gender='male', grade=grade, center=center
+        )
+        Attendance.objects.create(student=student, date=date(2026, 1, 5), attended=True, homework=False)
+        User.objects.create_user('adm', password=self.PASSWORD, role='admin')
+        self.tokens = {
+            username: self.login(username)[1]['access'] for username in ('adm', 'tea', 'stu', 'ast')
+        }
+        self.async_client = AsyncClient()
+
+    async def get_both(self, role, token=None, **extra):
+        """The sync and async dashboard responses for `role`, each from a cold cache."""
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        responses = []
+        for url in (f'/api/accounts/dashboard/{role}/', f'/api/accounts/dashboard/{role}/async/'):
+            await sync_to_async(caches['default'].clear)()
+            responses.append(await self.async_client.get(url, headers=headers, **extra))
+        return responses
+
+    def assertSameResponse(self, expected, response):
+        self.assertEqual(
+            (response.status_code, json.loads(response.content)),
+            (expected.status_code, json.loads(expected.content))
+        )
+
+    async def test_same_responses_as_the_sync_endpoints(self):
+        for role, username in (('admin', 'adm'), ('teacher', 'tea'), ('student', 'stu'), ('assistant', 'ast')):
+            with self.subTest(role=role):
+                expected, response = await self.get_both(role, self.tokens[username])
+                self.assertEqual(expected.status_code, 200)
+                self.assertSameResponse(expected, response)
+
+    async def test_same_errors_as_the_sync_endpoints(self):
+        cases = [
+            ('teacher', None),
+            ('teacher', 'garbage'),
+            ('teacher', self.tokens['stu']),
+            ('student', self.tokens['tea']),
+            ('assistant', self.tokens['adm']),
+            ('admin', self.tokens['tea']),
+        ]
+        for role, token in cases:
+            with self.subTest(role=role, token=token):
+                expected, response = await self.get_both(role, token)
+                self.assertIn(expected.status_code, (401, 403))
+                self.assertSameResponse(expected, response)
+
+        response = await self.async_client.post(
+            '/api/accounts/dashboard/teacher/async/', headers={'Authorization': f"Bearer {self.tokens['tea']}"}
+        )
+        self.assertEqual(response.status_code, 405)
+
+    async def test_queries_run_on_the_dashboard_pool(self):
+        threads = []
+        teacher_centers = views._teacher_centers
+
+        def record_thread(request):
+            threads.append(threading.current_thread().name)
+            return teacher_centers(request)
+
+        with mock.patch.object(views, '_teacher_centers', record_thread):
+            response = await self.async_client.get(
+                '/api/accounts/dashboard/teacher/async/', headers={'Authorization': f"Bearer {self.tokens['tea']}"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(threads[0].startswith('dashboard'))
+
+        with mock.patch.object(views.dashboard_pool, 'max_pending', 0):
+            response = await self.async_client.get(
+                '/api/accounts/dashboard/teacher/async/', headers={'Authorization': f"Bearer {self.tokens['tea']}"}
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_concurrent_wsgi_requests_share_the_pool(self):
+        # Under WSGI every request runs the async view on an event loop of
+        # its own; a one-thread pool makes them queue behind each other
+        pool = BoundedPool('dashboard-test', workers=1, max_pending=50)
+        self.addCleanup(pools.pop, 'dashboard-test')
+        self.addCleanup(pool._executor.shutdown)
+        statuses = []
+
+        def get():
+            client = Client(headers={'Authorization': f"Bearer {self.tokens['tea']}"})
+            statuses.append(client.get('/api/accounts/dashboard/teacher/async/').status_code)
+            connections.close_all()
+
+        threads = [threading.Thread(target=get, daemon=True) for _ in range(6)]
+        with mock.patch.object(views, 'dashboard_pool', pool):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+                self.assertFalse(thread.is_alive(), "A request never got a pool slot")
+        self.assertEqual(statuses, [200] * 6)
+        self.assertEqual((pool.waiting, pool.in_flight), (0, 0))
+
+
+class DashboardStatsTests(TenantTestCase):
+
+    def counters(self):
+        return sorted(
+            (row.teacher_id or 0, row.teachers_count, row.students_count, row.assistants_count,
+             row.pending_approvals, row.centers_count)
+            for row in DashboardStats.objects.all()
+        )
+
+    def assertCountersMatchRebuild(self):
+        maintained = self.counters()
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+        self.assertEqual(maintained, self.counters())
+
+    def test_counters_follow_every_change(self):
+        self.assertCountersMatchRebuild()
+
+        self.client_for(self.admin).post(f'/api/accounts/students/approve/{self.students[0].pk}/')
+        moved = StudentProfile.objects.get(pk=self.students[1].pk)
+        moved.teacher = self.teacher2
+        moved.save()
+        StudentProfile.objects.get(pk=self.students[2].pk).delete()
+        AssistantProfile.objects.all().delete()
+        Center.objects.create(name='C3', teacher=self.teacher2)
+        self.assertCountersMatchRebuild()
+
+        TeacherProfile.objects.get(pk=self.teacher2.pk).delete()
+        self.assertCountersMatchRebuild()
+
+    def test_dashboards_read_the_counters(self):
+        client, _ = self.login('t1')
+        response = client.get('/api/accounts/dashboard/teacher/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.json()[key] for key in ('students_count', 'assistants_count', 'pending_approvals')},
+            {'students_count': 5, 'assistants_count': 1, 'pending_approvals': 5}
+        )
+
+        admin = self.client_for(self.admin)
+        response = admin.get('/api/accounts/dashboard/admin/')
+        self.assertEqual((response.json()['teachers_count'], response.json()['students_count']), (2, 6))
+        # Served from the cache until it expires
+        with self.assertNumQueries(0):
+            self.assertEqual(admin.get('/api/accounts/dashboard/admin/').json(), response.json())
+
+
+class StudentSearchTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ahmed = self.create_student('ahmed1', self.teacher, self.center, 'Ahmed Ali Ahmed', phone_number='010-2345')
+        self.mahmoud = self.create_student('ahmed2', self.teacher, self.center, 'Ahmed Mahmoud', phone_number='011 777')
+        self.client, _ = self.login('t1')
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_words_match_as_prefixes_ranked_by_relevance(self):
+        self.assertEqual(self.ids('/api/accounts/students/?search=ahm'), [self.ahmed.pk, self.mahmoud.pk])
+        self.assertEqual(self.ids('/api/accounts/students/?search=ahm mah'), [self.mahmoud.pk])
+        self.assertEqual(self.ids('/api/accounts/students/?search=!!!'), [])
+        # Other teachers' students stay out of reach
+        self.assertEqual(self.ids('/api/accounts/students/?search=other'), [])
+
+        response = self.client.get('/api/attendance/search/?search=ahmed&page_size=1')
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.ahmed.pk])
+        self.assertEqual(self.ids(response.json()['next']), [self.mahmoud.pk])
+        self.assertEqual(self.ids('/api/attendance/search/?search=ahmed&ordering=-id'), [self.mahmoud.pk, self.ahmed.pk])
+
+    def test_phone_numbers_match_by_digits(self):
+        self.assertEqual(self.ids('/api/accounts/students/?search=0102'), [self.ahmed.pk])
+        self.assertEqual(self.ids('/api/accounts/students/?search=(011) 77'), [self.mahmoud.pk])
+        # Parent numbers too
+        self.assertEqual(len(self.ids('/api/accounts/students/?search=0110')), 7)
+
+    def test_index_follows_changes(self):
+        user = self.students[3].user
+        user.username = 'zeyad99'
+        user.save()
+        self.assertEqual(self.ids('/api/accounts/students/?search=zey'), [self.students[3].pk])
+
+        self.ahmed.full_name = 'Omar'
+        self.ahmed.phone_number = '020 555'
+        self.ahmed.save()
+        self.assertEqual(self.ids('/api/accounts/students/?search=ali'), [])
+        self.assertEqual(self.ids('/api/accounts/students/?search=omar'), [self.ahmed.pk])
+        self.assertEqual(self.ids('/api/accounts/students/?search=020555'), [self.ahmed.pk])
+
+        self.mahmoud.delete()
+        self.assertEqual(self.ids('/api/accounts/students/?search=mahmoud'), [])
+
+
+class StudentProfileListSerializerTests(TenantTestCase):
+
+    def test_renders_the_same_bytes_as_the_model_serializer(self):
+        student = self.create_student('s5', self.teacher, None, 'Zoë\u2028Line', is_approved=True)
+        StudentProfile.objects.filter(pk=student.pk).update(grade=None)
+
+        queryset = StudentProfile.objects.order_by('pk')
+        rows = StudentProfileListSerializer.setup_eager_loading(queryset)
+        self.assertEqual(
+            FastJSONRenderer().render(StudentProfileListSerializer(rows, many=True).data),
+            JSONRenderer().render(StudentProfileSerializer(queryset, many=True).data)
+        )
+
+
+class EnableWalTests(SimpleTestCase):
+    alias = 'wal_test'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A scratch file database registered by setUp (see ShardedTestCase)
+        cls.databases = {*cls.databases, cls.alias}
+
+    def setUp(self):
+        workdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, workdir)
+        connections.settings[self.alias] = connections.configure_settings({
+            'default': connections.settings['default'],
+            self.alias: {'ENGINE': 'backend.sqlite', 'NAME': workdir / 'db.sqlite3', 'OPTIONS': settings.SQLITE_OPTIONS},
+        })[self.alias]
+        self.addCleanup(self.remove_alias)
+
+    def remove_alias(self):
+        connections[self.alias].close()
+        del connections[self.alias]
+        del connections.settings[self.alias]
+
+    def pragma(self, name):
+        with connections[self.alias].cursor() as cursor:
+            return cursor.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_connecting_leaves_the_journal_mode_alone(self):
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
+        self.assertEqual(self.pragma('synchronous'), 2)  # FULL
+
+    def test_enable_wal(self):
+        call_command('enable_wal', database=[self.alias], stdout=StringIO())
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # New connections see the persisted mode and relax synchronous
+        connections[self.alias].close()
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+
+
+class ShardedAuthenticationTests(ShardedTestCase):
+
+    def test_token_routes_to_the_users_shard(self):
+        teacher = self.create_teacher('t1')
+        student = self.create_student('s1', teacher)
+        self.assertEqual(teacher.user.shard, 'shard_1')
+
+        client, tokens = self.login('t1')
+        self.assertEqual(AccessToken(tokens['access'])['shard'], 'shard_1')
+        response = client.get('/api/accounts/students/')
+        self.assertEqual([row['id'] for row in response.json()['results']], [student.pk])
+
+    def test_move_teacher_revokes_tokens(self):
+        teacher = self.create_teacher('t1')
+        student = self.create_student('s1', teacher, is_approved=True)
+        teacher_client, teacher_tokens = self.login('t1')
+        student_client, _ = self.login('s1')
+
+        move_teacher(teacher, 'shard_2')
+        self.assertEqual(teacher_client.get('/api/accounts/students/').status_code, 401)
+        self.assertEqual(student_client.get('/api/accounts/dashboard/student/').status_code, 401)
+
+        response = teacher_client.post('/api/accounts/refresh/', {'refresh': teacher_tokens['refresh']}, format='json')
+        self.assertEqual(AccessToken(response.json()['access'])['shard'], 'shard_2')
+        teacher_client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        response = teacher_client.get('/api/accounts/students/')
+        self.assertEqual([row['id'] for row in response.json()['results']], [student.pk])
+
+        student_client, _ = self.login('s1')
+        self.assertEqual(student_client.get('/api/accounts/dashboard/student/').status_code, 200)
+
+
+class ShardedRequestTests(ShardedTestCase):
+
+    def test_routing_state_ends_with_the_request(self):
+        self.create_teacher('t1')
+        client, _ = self.login('t1')
+        self.assertEqual(client.get('/api/accounts/students/').status_code, 200)
+        self.assertIsNone(current_shard())
+
+    def test_streamed_body_reads_the_requests_shard(self):
+        teacher = self.create_teacher('t1')
+        student = self.create_student('s1', teacher, full_name='Streamed Student')
+        with use_shard(teacher.user.shard):
+            Attendance.objects.create(student=student, date='2026-01-01', attended=True)
+        client, _ = self.login('t1')
+
+        response = client.get('/api/attendance/export/')
+        # Consumed after the response has left the middleware
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('Streamed Student', body)
+        response = client.get('/api/attendance/list/?stream=1')
+        self.assertEqual([row['student'] for row in json.loads(b''.join(response.streaming_content))], [student.pk])
+
+
+class ShardedAdminTests(ShardedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_user('adm', password=self.PASSWORD, role='admin')
+        self.teachers = [self.create_teacher('t1'), self.create_teacher('t2')]
+        self.assertEqual({teacher.user.shard for teacher in self.teachers}, {'shard_1', 'shard_2'})
+        for i, teacher in enumerate(self.teachers):
+            for n in range(i + 1):
+                self.create_student(f's{i}{n}', teacher)
+
+    def test_dashboard_adds_up_every_database(self):
+        client, _ = self.login('adm')
+        for url in ('/api/accounts/dashboard/admin/', '/api/accounts/dashboard/admin/async/'):
+            caches['default'].delete('dashboard:admin')
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((response.json()['teachers_count'], response.json()['students_count']), (2, 3))
+
+    def test_queries_without_a_shard_are_refused(self):
+        # Intended: admins hold no shard, and the catalog alone would give
+        # incomplete answers
+        client, _ = self.login('adm')
+        student = StudentProfile.objects.using('shard_1').first()
+        for method, url in [
+            ('get', '/api/accounts/students/'),
+            ('get', f'/api/accounts/students/{student.pk}/'),
+            ('post', f'/api/accounts/students/approve/{student.pk}/'),
+            ('get', '/api/accounts/assistants/'),
+            ('get', '/api/accounts/centers/'),
+        ]:
+            with self.subTest(url=url):
+                response = getattr(client, method)(url)
+                self.assertEqual(response.status_code, 403)
+                self.assertIn('sharding', response.json()['detail'])
+        self.assertFalse(StudentProfile.objects.using('shard_1').get(pk=student.pk).is_approved)
+        # Teacher management stays on the catalog
+        self.assertEqual(client.get('/api/accounts/teachers/').status_code, 200)
+
+    def test_teacher_creation_still_works(self):
+        client, _ = self.login('adm')
+        response = client.post('/api/accounts/teachers/create/', {
+            'username': 't3', 'password': 'pw12345!xx', 'full_name': 'Teacher 3',
+            'phone_number': '0100000003', 'gender': 'male', 'grades': [self.grade.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        teacher = TeacherProfile.objects.select_related('user').get(pk=response.json()['profile']['id'])
+        self.assertIn(teacher.user.shard, SHARDS)
+        self.assertTrue(TeacherProfile.objects.using(teacher.user.shard).filter(pk=teacher.pk).exists())
+
+
+class ShardRouterTests(ShardedTestCase):
+
+    def test_routing(self):
+        router = ShardRouter()
+        teacher = self.create_teacher('t1')
+        student = self.create_student('s1', teacher)
+        shard = teacher.user.shard
+
+        self.assertEqual(router.db_for_read(Grade), CATALOG)
+        self.assertEqual(router.db_for_read(StudentProfile), CATALOG)
+        # By instance: a row read from a shard, or a new row through its teacher
+        self.assertEqual(router.db_for_write(StudentProfile, instance=student), shard)
+        self.assertEqual(router.db_for_write(Center, instance=Center(teacher=teacher)), shard)
+        self.assertEqual(router.db_for_read(StudentProfile, instance=teacher.user), shard)
+        with use_shard('shard_2'):
+            self.assertEqual(router.db_for_read(Attendance), 'shard_2')
+            self.assertEqual(router.db_for_read(User), CATALOG)
+        with pin_database('shard_2'):
+            self.assertEqual(router.db_for_read(User), 'shard_2')
+        with override_settings(SHARDS=[]):
+            self.assertIsNone(router.db_for_read(StudentProfile))
+
+    def test_new_teachers_fill_the_emptiest_shard(self):
+        shards = [self.create_teacher(f't{i}').user.shard for i in range(4)]
+        self.assertEqual(sorted(shards), ['shard_1', 'shard_1', 'shard_2', 'shard_2'])
+
+    def test_ids_come_from_the_shards_range(self):
+        teacher = self.create_teacher('t1')
+        student = self.create_student('s1', teacher)
+        start = (SHARDS.index(teacher.user.shard) + 1) * SHARD_ID_SPAN
+        self.assertTrue(start < student.pk < start + SHARD_ID_SPAN)
+
+
+class CatalogReplicaTests(ShardedTestCase):
+
+    def test_catalog_changes_reach_the_shards(self):
+        teacher = self.create_teacher('t1')
+        shard = teacher.user.shard
+        self.assertTrue(Grade.objects.using(shard).filter(pk=self.grade.pk).exists())
+        self.assertTrue(TeacherProfile.objects.using(shard).filter(pk=teacher.pk).exists())
+
+        self.grade.name = 'Renamed'
+        self.grade.save()
+        self.assertEqual(Grade.objects.using(shard).get(pk=self.grade.pk).name, 'Renamed')
+
+        teacher.user.email = 'new@example.com'
+        teacher.user.save()
+        self.assertEqual(User.objects.using(shard).get(pk=teacher.user_id).email, 'new@example.com')
+
+        other = Grade.objects.create(name='Grade 2')
+        other.delete()
+        self.assertFalse(Grade.objects.using(shard).filter(pk=other.pk).exists())
+
+    def test_sync_catalog_repairs_bulk_updates(self):
+        teacher = self.create_teacher('t1')
+        shard = teacher.user.shard
+        Grade.objects.filter(pk=self.grade.pk).update(name='Bulk')
+        self.assertEqual(Grade.objects.using(shard).get(pk=self.grade.pk).name, 'Grade 1')
+        sync_catalog(shard)
+        self.assertEqual(Grade.objects.using(shard).get(pk=self.grade.pk).name, 'Bulk')
+
+    def test_renamed_student_is_found_on_the_shard(self):
+        teacher = self.create_teacher('t1')
+        student = self.create_student('s1', teacher)
+        student.user.username = 'newname'
+        student.user.save()
+        client, _ = self.login('t1')
+        response = client.get('/api/accounts/students/?search=newname')
+        self.assertEqual([row['id'] for row in response.json()['results']], [student.pk])
+
+
+class MoveTeacherTests(ShardedTestCase):
+
+    def tenant_rows(self, teacher, alias):
+        # DashboardStats is left out: move_teacher rebuilds it on both databases
+        return {
+            model._meta.label: sorted(
+                model._base_manager.using(alias).filter(**{f'{tenant_lookup(model)}_id': teacher.pk})
+                .values_list('pk', flat=True)
+            )
+            for model in sharded_models() if model is not DashboardStats
+        }
+
+    def test_rows_and_ids_are_kept(self):
+        teacher = self.create_teacher('t1')
+        other = self.create_teacher('t2')
+        students = [self.create_student(f's{i}', teacher, full_name=f'Moved {i}') for i in range(3)]
+        self.create_student('x1', other)
+        with use_shard(teacher.user.shard):
+            for student in students:
+                Attendance.objects.create(student=student, date='2026-01-01', attended=True)
+        source, target = teacher.user.shard, other.user.shard
+        before = self.tenant_rows(teacher, source)
+
+        moved = move_teacher(teacher, target)
+
+        self.assertEqual(self.tenant_rows(teacher, target), before)
+        # Plus the teacher's DashboardStats row
+        self.assertEqual(moved, sum(len(ids) for ids in before.values()) + 1)
+        self.assertFalse(any(self.tenant_rows(teacher, source).values()))
+        user_ids = [student.user_id for student in students]
+        self.assertEqual(set(User.objects.filter(pk__in=user_ids).values_list('shard', flat=True)), {target})
+        self.assertFalse(User.objects.using(source).filter(pk__in=user_ids).exists())
+        # The other tenant on the target is untouched, and both dashboards are recounted
+        self.assertEqual(StudentProfile.objects.using(target).filter(teacher=other).count(), 1)
+        self.assertEqual(DashboardStats.objects.using(target).get(teacher=teacher).students_count, 3)
+        self.assertEqual(DashboardStats.objects.using(source).get(teacher=None).students_count, 0)
+
+        client, _ = self.login('t1')
+        response = client.get('/api/accounts/students/?search=moved')
+        self.assertEqual(sorted(row['id'] for row in response.json()['results']), [s.pk for s in students])
@@ -0,0 +1,135 @@
+"""
+A student's attendance, test scores and quiz submissions as one stream.
+
+The three tables are merged with a single `UNION ALL`, newest first,
+ordered by `(date, kind, id)`. DRF's CursorPagination can't filter a
+combined queryset, so the keyset predicate is pushed into each branch
+instead: every branch is filtered past the cursor, ordered and limited
+on its own `(student_id, date)` index before the union, and the merged
+rows (at most three pages) are sorted in Python.
+"""
+import base64
+import binascii
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import BooleanField, CharField, F, FloatField, Q, Value
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from attendance.models import Attendance
+from quizzes.models import QuizSubmission
+from test_scores.models import TestScore
+
+# Secondary sort key between entries of the same date
+KINDS = ('test', 'quiz', 'attendance')
+
+
+def encode_cursor(entry):
+    raw = f"{entry['date'].isoformat()}|{entry['kind']}|{entry['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        day, kind, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        cursor = (date.fromisoformat(day), kind, int(pk))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise NotFound("Invalid cursor")
+    if cursor[1] not in KINDS:
+        raise NotFound("Invalid cursor")
+    return cursor
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _after_cursor(kind, cursor, before, on_day):
+    """Keyset predicate for one branch: rows strictly after ``cursor`` in
+    ``(-date, kind, -id)`` order. ``before(d)`` and ``on_day(d)`` build
+    the ``date < d`` and ``date == d`` lookups, so datetime columns are
+    compared as ranges and keep using their index."""
+    if cursor is None:
+        return Q()
+    day, cursor_kind, pk = cursor
+    if KINDS.index(kind) < KINDS.index(cursor_kind):
+        # Same-day rows of this kind were already listed
+        return before(day)
+    if kind == cursor_kind:
+        return before(day) | (on_day(day) & Q(id__lt=pk))
+    return before(day) | on_day(day)
+
+
+def _branch(queryset, kind, cursor, limit, before, on_day, entry_date, **columns):
+    values = {
+        'title': Value(None, output_field=CharField()),
+        'score': Value(None, output_field=FloatField()),
+        'out_of': Value(None, output_field=FloatField()),
+        'attended': Value(None, output_field=BooleanField()),
+        'homework': Value(None, output_field=BooleanField()),
+    }
+    values.update(columns)
+    # Annotation order decides the column order, which must match
+    # across the branches of the union
+    # SQLite rejects LIMIT inside a compound statement, so the page of
+    # ids is selected in a subquery. Its ordering must match the keyset
+    # exactly, i.e. by day rather than by time
+    page = (
+        queryset.filter(_after_cursor(kind, cursor, before, on_day))
+        .annotate(entry_date=entry_date)
+        .order_by('-entry_date', '-id')
+        .values('id')[:limit]
+    )
+    return (
+        queryset.model.objects.filter(id__in=page)
+        .annotate(kind=Value(kind, output_field=CharField()), entry_date=entry_date)
+        .annotate(**{f'entry_{name}': value for name, value in values.items()})
+        .order_by()
+        .values('kind', 'id', 'entry_date', *(f'entry_{name}' for name in values))
+    )
+
+
+def timeline_page(student, cursor=None, page_size=50):
+    """One page of the timeline and the cursor of the next page (or None)."""
+    limit = page_size + 1
+
+    attendance = _branch(
+        Attendance.objects.filter(student=student), 'attendance', cursor, limit,
+        before=lambda day: Q(date__lt=day),
+        on_day=lambda day: Q(date=day),
+        entry_date=F('date'), attended=F('attended'), homework=F('homework'),
+    )
+    scores = _branch(
+        TestScore.objects.filter(student=student), 'test', cursor, limit,
+        before=lambda day: Q(date_taken__lt=day),
+        on_day=lambda day: Q(date_taken=day),
+        entry_date=F('date_taken'), title=F('test__name'), score=F('score'),
+    )
+    submissions = _branch(
+        QuizSubmission.objects.filter(student=student, is_completed=True), 'quiz', cursor, limit,
+        before=lambda day: Q(submitted_at__lt=_day_start(day)),
+        on_day=lambda day: Q(
+            submitted_at__gte=_day_start(day),
+            submitted_at__lt=_day_start(day + timedelta(days=1))
+        ),
+        entry_date=TruncDate('submitted_at'), title=F('quiz__title'), score=F('score'),
+        out_of=F('quiz__total_marks'),
+    )
+
+    rows = list(scores.union(submissions, attendance, all=True))
+    rows.sort(key=lambda row: (row['entry_date'], -KINDS.index(row['kind']), row['id']), reverse=True)
+
+    entries = []
+    for row in rows[:page_size]:
+        entry = {'kind': row['kind'], 'id': row['id'], 'date': row['entry_date']}
+        if row['kind'] == 'attendance':
+            entry.update(attended=row['entry_attended'], homework=row['entry_homework'])
+        else:
+            entry.update(title=row['entry_title'], score=row['entry_score'])
+            if row['kind'] == 'quiz':
+                entry['out_of'] = row['entry_out_of']
+        entries.append(entry)
+
+    next_cursor = encode_cursor(entries[-1]) if len(rows) > page_size else None
+    return entries, next_cursor
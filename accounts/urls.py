@@ -1,12 +1,14 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenObtainPairView
 from . import views
-from .views import CustomTokenObtainPairView , PublicKeyView
+from .views import CustomTokenObtainPairView , CustomTokenRefreshView, PublicKeyView
 
 urlpatterns = [
     # Authentication Endpoints
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('login/async/', views.async_login, name='token_obtain_pair_async'),
+    path('refresh/async/', views.async_refresh, name='token_refresh_async'),
     path('public-key/', PublicKeyView.as_view(), name='public-key'),
 
     # Dashboard Endpoints
@@ -14,11 +16,17 @@ urlpatterns = [
     path('dashboard/teacher/', views.teacher_dashboard, name='teacher_dashboard'),
     path('dashboard/student/', views.student_dashboard, name='student_dashboard'),
     path('dashboard/assistant/', views.assistant_dashboard, name='assistant_dashboard'),
+    path('dashboard/admin/async/', views.admin_dashboard_async, name='admin_dashboard_async'),
+    path('dashboard/teacher/async/', views.teacher_dashboard_async, name='teacher_dashboard_async'),
+    path('dashboard/student/async/', views.student_dashboard_async, name='student_dashboard_async'),
+    path('dashboard/assistant/async/', views.assistant_dashboard_async, name='assistant_dashboard_async'),
 
     # Student Management
     path('students/', views.list_students, name='list_students'),
     path('students/create/', views.create_student, name='create_student'),
+    path('students/import/', views.import_students_view, name='import_students'),
     path('students/<int:pk>/', views.student_detail, name='student_detail'),
+    path('students/<int:pk>/timeline/', views.student_timeline, name='student_timeline'),
     path('students/approve/<int:student_id>/', views.approve_student, name='approve_student'),
 
     # Teacher Management
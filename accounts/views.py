@@ -5,8 +5,10 @@ from rest_framework.permissions import IsAuthenticated, BasePermission
 from .serializers import (
     TeacherProfileSerializer,
     StudentProfileSerializer,
+    StudentProfileListSerializer,
     UserSerializer,
-    CenterSerializer
+    CenterSerializer,
+    AssistantProfileSerializer
 )
 from .models import (
     User,
@@ -16,21 +18,49 @@ from .models import (
     Subject,
     Grade,
     Center,
-    Payment
+    Payment,
+    DashboardStats
 )
-from django.db.models import Q
-from rest_framework_simplejwt.views import TokenObtainPairView
-from .serializers import CustomTokenObtainPairSerializer
+from django.core.cache import cache
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
 from .permissions import  IsTeacher , IsStudent , IsAssistant , IsAdmin
 from rest_framework.views import APIView
+from django.utils.http import parse_etags, quote_etag
+from .keys import key_store
+from backend.pagination import paginated_response
+from .timeline import decode_cursor, timeline_page
+from .importing import StudentImportError, import_students, read_csv
+from .search import search_ordering, search_students
+from .sharding import all_databases
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+import asyncio
+import json
+from functools import wraps
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+from backend.renderers import FastJSONRenderer
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from backend.concurrency import BoundedPool, PoolOverloaded
 
 class PublicKeyView(APIView):
     permission_classes = []
 
     def get(self, request):
-        with open('/home/apitest144/backend/public.pem', 'r') as f:
-            public_key = f.read()
-        return Response({'public_key': public_key})
+        key = key_store.verifying_key
+        etag = quote_etag(key.digest)
+        headers = {
+            'ETag': etag,
+            'Cache-Control': 'public, max-age=300, must-revalidate',
+        }
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({'public_key': key.read()}, headers=headers)
 
 # Composite Permission Classes
 class IsTeacherOrAdmin(BasePermission):
@@ -53,6 +83,63 @@ class IsAssistantOrAdmin(BasePermission):
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
+# Async login/refresh for ASGI deployments. Password hashing and token
+# signing run in login_pool, so a login burst can only tie up its
+# LOGIN_POOL_WORKERS threads and every other endpoint stays responsive.
+login_pool = BoundedPool('login', settings.LOGIN_POOL_WORKERS, settings.LOGIN_POOL_MAX_PENDING)
+
+def _validate_token_request(serializer_class, data):
+    serializer = serializer_class(data=data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except TokenError as e:
+        raise InvalidToken(e.args[0])
+    return serializer.validated_data
+
+def _json_response(data, status=200, headers=None):
+    # Rendered the same way as the DRF views it mirrors
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status,
+        content_type='application/json', headers=headers
+    )
+
+async def _token_response(request, serializer_class):
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' else request.POST.dict()
+    except ValueError:
+        return _json_response({'detail': 'JSON parse error'}, status=400)
+
+    try:
+        validated = await login_pool.run(_validate_token_request, serializer_class, data)
+    except PoolOverloaded:
+        return _json_response(
+            {'detail': 'Too many login attempts in progress, retry shortly.'},
+            status=503, headers={'Retry-After': '1'}
+        )
+    except APIException as e:
+        return _exception_response(e)
+    return _json_response(validated)
+
+def _exception_response(exc):
+    # Same payload shape as DRF's exception handler
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    headers = {'WWW-Authenticate': exc.auth_header} if getattr(exc, 'auth_header', None) else None
+    return _json_response(data, status=exc.status_code, headers=headers)
+
+@csrf_exempt
+@require_POST
+async def async_login(request):
+    return await _token_response(request, CustomTokenObtainPairSerializer)
+
+@csrf_exempt
+@require_POST
+async def async_refresh(request):
+    return await _token_response(request, CustomTokenRefreshSerializer)
+
 
 
 # accounts/views.py
@@ -61,53 +148,187 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 # Dashboard Views
+# Counters come from DashboardStats; the short cache absorbs bursts of
+# dashboard loads
+DASHBOARD_CACHE_TIMEOUT = 30
+
+def _recent_payments():
+    return list(Payment.objects.all().order_by('-date')[:5].values('teacher__full_name', 'amount', 'date'))
+
+def _admin_counters():
+    # Every database's global row counts what that database holds; the
+    # catalog holds every teacher (accounts.sharding)
+    rows = [DashboardStats.objects.using(alias).current() for alias in all_databases()]
+    return {
+        'teachers_count': rows[0].teachers_count,
+        'students_count': sum(row.students_count for row in rows),
+        'assistants_count': sum(row.assistants_count for row in rows),
+    }
+
+def _teacher_centers(request):
+    return list(Center.objects.for_teacher(request).values('id', 'name'))
+
+def _student_profile(request):
+    return StudentProfileSerializer(StudentProfile.objects.get(pk=request.tenant.student.pk)).data
+
+def _recent_attendance(request):
+    return list(request.tenant.student.attendance_records.order_by('-date')[:5].values('date', 'attended'))
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_dashboard(request):
     if request.user.role != 'admin':
         return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
 
-    stats = {
-        'teachers_count': TeacherProfile.objects.count(),
-        'students_count': StudentProfile.objects.count(),
-        'assistants_count': AssistantProfile.objects.count(),
-        'recent_payments': list(Payment.objects.all().order_by('-date')[:5].values('teacher__full_name', 'amount', 'date'))
-    }
+    stats = cache.get('dashboard:admin')
+    if stats is None:
+        stats = {**_admin_counters(), 'recent_payments': _recent_payments()}
+        cache.set('dashboard:admin', stats, DASHBOARD_CACHE_TIMEOUT)
     return Response(stats, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsTeacher])
 def teacher_dashboard(request):
-    teacher = request.user.teacher_profile
-    stats = {
-        'students_count': StudentProfile.objects.filter(teacher=teacher).count(),
-        'assistants_count': AssistantProfile.objects.filter(teacher=teacher).count(),
-        'centers': list(Center.objects.filter(teacher=teacher).values('id', 'name')),
-        'pending_approvals': StudentProfile.objects.filter(teacher=teacher, is_approved=False).count()
-    }
+    teacher_id = request.tenant.teacher.pk
+    cache_key = f'dashboard:teacher:{teacher_id}'
+    stats = cache.get(cache_key)
+    if stats is None:
+        counters = DashboardStats.objects.current(teacher_id)
+        stats = {
+            'students_count': counters.students_count,
+            'assistants_count': counters.assistants_count,
+            'centers': _teacher_centers(request),
+            'pending_approvals': counters.pending_approvals
+        }
+        cache.set(cache_key, stats, DASHBOARD_CACHE_TIMEOUT)
     return Response(stats, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsStudent])
 def student_dashboard(request):
-    student = request.user.student_profile
     data = {
-        'profile': StudentProfileSerializer(student).data,
-        'recent_attendance': list(student.attendance_records.order_by('-date')[:5].values('date', 'attended')),
+        'profile': _student_profile(request),
+        'recent_attendance': _recent_attendance(request),
     }
     return Response(data, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsAssistant])
 def assistant_dashboard(request):
-    assistant = request.user.assistant_profile
-    stats = {
-        'teacher': assistant.teacher.full_name,
-        'students_count': StudentProfile.objects.filter(teacher=assistant.teacher).count(),
-        'centers': list(Center.objects.filter(teacher=assistant.teacher).values('id', 'name'))
-    }
+    teacher_id = request.tenant.teacher.pk
+    cache_key = f'dashboard:assistant:{teacher_id}'
+    stats = cache.get(cache_key)
+    if stats is None:
+        counters = DashboardStats.objects.select_related('teacher').current(teacher_id)
+        stats = {
+            'teacher': counters.teacher.full_name,
+            'students_count': counters.students_count,
+            'centers': _teacher_centers(request)
+        }
+        cache.set(cache_key, stats, DASHBOARD_CACHE_TIMEOUT)
     return Response(stats, status=status.HTTP_200_OK)
 
+# Async dashboards for ASGI deployments. Their independent queries run
+# side by side on dashboard_pool threads, each with its own database
+# connection, so a dashboard takes about as long as its slowest query
+# instead of the sum of all of them. They share the sync views' cache.
+dashboard_pool = BoundedPool('dashboard', settings.DASHBOARD_POOL_WORKERS, settings.DASHBOARD_POOL_MAX_PENDING)
+
+def _authorize(request, permission_class):
+    """DRF authentication and permission check for a plain Django view."""
+    drf_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        # Authenticating stores the user on `request` as well
+        allowed = permission_class().has_permission(drf_request, None)
+        if not allowed and drf_request.successful_authenticator is None:
+            raise NotAuthenticated()
+    except (NotAuthenticated, AuthenticationFailed) as e:
+        e.auth_header = drf_request.authenticators[0].authenticate_header(drf_request)
+        raise
+    if not allowed:
+        raise PermissionDenied()
+
+async def _gather(*calls):
+    return await asyncio.gather(*(dashboard_pool.run(call) for call in calls))
+
+def async_dashboard(permission_class):
+    """Serve an async view as a GET endpoint behind `permission_class`."""
+    def decorator(view):
+        @require_GET
+        @wraps(view)
+        async def wrapper(request):
+            try:
+                await dashboard_pool.run(_authorize, request, permission_class)
+                return await view(request)
+            except PoolOverloaded:
+                return _json_response(
+                    {'detail': 'Too many dashboard requests in progress, retry shortly.'},
+                    status=503, headers={'Retry-After': '1'}
+                )
+            except APIException as e:
+                return _exception_response(e)
+        return wrapper
+    return decorator
+
+@async_dashboard(IsAuthenticated)
+async def admin_dashboard_async(request):
+    if request.user.role != 'admin':
+        return _json_response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+    stats = await cache.aget('dashboard:admin')
+    if stats is None:
+        counters, recent_payments = await _gather(_admin_counters, _recent_payments)
+        stats = {**counters, 'recent_payments': recent_payments}
+        await cache.aset('dashboard:admin', stats, DASHBOARD_CACHE_TIMEOUT)
+    return _json_response(stats)
+
+@async_dashboard(IsTeacher)
+async def teacher_dashboard_async(request):
+    teacher_id = await dashboard_pool.run(lambda: request.tenant.teacher.pk)
+    cache_key = f'dashboard:teacher:{teacher_id}'
+    stats = await cache.aget(cache_key)
+    if stats is None:
+        counters, centers = await _gather(
+            lambda: DashboardStats.objects.current(teacher_id),
+            lambda: _teacher_centers(request)
+        )
+        stats = {
+            'students_count': counters.students_count,
+            'assistants_count': counters.assistants_count,
+            'centers': centers,
+            'pending_approvals': counters.pending_approvals
+        }
+        await cache.aset(cache_key, stats, DASHBOARD_CACHE_TIMEOUT)
+    return _json_response(stats)
+
+@async_dashboard(IsStudent)
+async def student_dashboard_async(request):
+    profile, recent_attendance = await _gather(
+        lambda: _student_profile(request),
+        lambda: _recent_attendance(request)
+    )
+    return _json_response({'profile': profile, 'recent_attendance': recent_attendance})
+
+@async_dashboard(IsAssistant)
+async def assistant_dashboard_async(request):
+    teacher_id = await dashboard_pool.run(lambda: request.tenant.teacher.pk)
+    cache_key = f'dashboard:assistant:{teacher_id}'
+    stats = await cache.aget(cache_key)
+    if stats is None:
+        counters, centers = await _gather(
+            lambda: DashboardStats.objects.select_related('teacher').current(teacher_id),
+            lambda: _teacher_centers(request)
+        )
+        stats = {
+            'teacher': counters.teacher.full_name,
+            'students_count': counters.students_count,
+            'centers': centers
+        }
+        await cache.aset(cache_key, stats, DASHBOARD_CACHE_TIMEOUT)
+    return _json_response(stats)
+
 # Student Management
 @api_view(['POST'])
 @permission_classes([IsTeacherOrAdmin])
@@ -132,7 +353,7 @@ def create_student(request):
     # 2. Determine Teacher
     try:
         if request.user.role == 'teacher':
-            teacher = request.user.teacher_profile
+            teacher = request.tenant.teacher
         else:
             if 'teacher' not in request.data:
                 user.delete()
@@ -175,6 +396,40 @@ def create_student(request):
     return Response(serializer.errors, status=400)
 
 
+@api_view(['POST'])
+@permission_classes([IsTeacherOrAdmin])
+def import_students_view(request):
+    """
+    Create many students at once, from a CSV upload (`file`) or a JSON
+    `students` list. Either every row is imported or none is.
+    """
+    if request.user.role == 'teacher':
+        teacher = request.tenant.teacher
+    else:
+        if 'teacher' not in request.data:
+            return Response({'error': 'Teacher ID required for admin'}, status=400)
+        try:
+            teacher = TeacherProfile.objects.get(id=request.data['teacher'])
+        except (TeacherProfile.DoesNotExist, ValueError):
+            return Response({'error': 'Invalid teacher ID'}, status=400)
+
+    if upload := request.FILES.get('file'):
+        rows = read_csv(upload.read())
+    else:
+        rows = request.data.get('students')
+        if not isinstance(rows, list):
+            return Response({'error': 'Provide a CSV file or a students list'}, status=400)
+
+    try:
+        profiles = import_students(rows, teacher)
+    except StudentImportError as e:
+        return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'created': len(profiles),
+        'students': [{'id': profile.pk, 'username': profile.user.username} for profile in profiles]
+    }, status=status.HTTP_201_CREATED)
+
 @api_view(['POST'])
 @permission_classes([IsAdmin])
 def approve_student(request, student_id):
@@ -193,13 +448,8 @@ def list_students(request):
     if request.user.role == 'admin':
         queryset = StudentProfile.objects.all()
     else:
-        # For teachers and assistants, get their associated teacher
-        teacher = (
-            request.user.teacher_profile
-            if request.user.role == 'teacher'
-            else request.user.assistant_profile.teacher
-        )
-        queryset = StudentProfile.objects.filter(teacher=teacher)
+        # For teachers and assistants, scope to their associated teacher
+        queryset = StudentProfile.objects.for_teacher(request)
 
     # Apply filters for all roles
     search_query = request.GET.get('search')
@@ -207,11 +457,7 @@ def list_students(request):
     grade_id = request.GET.get('grade_id')
 
     if search_query:
-        queryset = queryset.filter(
-            Q(full_name__icontains=search_query) |
-            Q(phone_number__icontains=search_query) |
-            Q(parent_number__icontains=search_query)
-        )
+        queryset = search_students(queryset, search_query)
 
     if center_id:
         queryset = queryset.filter(center_id=center_id)
@@ -219,8 +465,7 @@ def list_students(request):
     if grade_id:
         queryset = queryset.filter(grade_id=grade_id)
 
-    serializer = StudentProfileSerializer(queryset, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginated_response(request, queryset, StudentProfileListSerializer, ordering=search_ordering(queryset))
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsTeacherAssistantOrAdmin])
@@ -229,10 +474,8 @@ def student_detail(request, pk):
     try:
         if request.user.role == 'admin':
             student = StudentProfile.objects.get(pk=pk)
-        elif request.user.role == 'teacher':
-            student = StudentProfile.objects.get(pk=pk, teacher=request.user.teacher_profile)
-        else:  # assistant
-            student = StudentProfile.objects.get(pk=pk, teacher=request.user.assistant_profile.teacher)
+        else:  # teacher or assistant
+            student = StudentProfile.objects.for_teacher(request).get(pk=pk)
     except StudentProfile.DoesNotExist:
         return Response({'detail': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -254,6 +497,33 @@ def student_detail(request, pk):
         user.delete()
         return Response({'detail': 'Student deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
+@api_view(['GET'])
+@permission_classes([IsTeacherAssistantOrAdmin])
+def student_timeline(request, pk):
+    """Attendance, test scores and quiz submissions of one student, newest first."""
+    try:
+        if request.user.role == 'admin':
+            student = StudentProfile.objects.only('id').get(pk=pk)
+        else:  # teacher or assistant
+            student = StudentProfile.objects.for_teacher(request).only('id').get(pk=pk)
+    except StudentProfile.DoesNotExist:
+        return Response({'detail': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        page_size = min(int(request.query_params['page_size']), settings.MAX_PAGE_SIZE)
+    except (KeyError, ValueError):
+        page_size = api_settings.PAGE_SIZE
+    page_size = max(page_size, 1)
+
+    cursor = request.query_params.get('cursor')
+    entries, next_cursor = timeline_page(
+        student, decode_cursor(cursor) if cursor else None, page_size
+    )
+    next_url = None
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+    return Response({'next': next_url, 'results': entries})
+
 # Teacher Management
 @api_view(['POST'])
 @permission_classes([IsAdmin])
@@ -310,7 +580,7 @@ def create_teacher_profile(request):
 @permission_classes([IsTeacherOrAdmin])
 def my_teacher_profile(request):
     try:
-        profile = request.user.teacher_profile
+        profile = TeacherProfile.objects.get(pk=request.user.teacher_profile.pk)
         serializer = TeacherProfileSerializer(profile)
         return Response(serializer.data)
     except TeacherProfile.DoesNotExist:
@@ -320,8 +590,7 @@ def my_teacher_profile(request):
 @permission_classes([IsAdmin])
 def list_teachers(request):
     teachers = TeacherProfile.objects.all()
-    serializer = TeacherProfileSerializer(teachers, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginated_response(request, teachers, TeacherProfileSerializer)
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAdmin])
@@ -353,7 +622,7 @@ def teacher_detail(request, pk):
 @api_view(['POST'])
 @permission_classes([IsTeacherOrAdmin])
 def create_assistant(request):
-    teacher = request.user.teacher_profile if request.user.role == 'teacher' else TeacherProfile.objects.get(pk=request.data.get('teacher_id'))
+    teacher = request.tenant.teacher if request.user.role == 'teacher' else TeacherProfile.objects.get(pk=request.data.get('teacher_id'))
 
     # Create User account first
     user_data = {
@@ -395,7 +664,7 @@ def create_assistant(request):
 @permission_classes([IsTeacherOrAdmin])
 def view_assistants(request):
     if request.user.role == 'teacher':
-        assistants = AssistantProfile.objects.filter(teacher=request.user.teacher_profile)
+        assistants = AssistantProfile.objects.for_teacher(request)
     else:  # admin
         teacher_id = request.query_params.get('teacher_id')
         if teacher_id:
@@ -403,23 +672,14 @@ def view_assistants(request):
         else:
             assistants = AssistantProfile.objects.all()
 
-    data = [{
-        'id': a.id,
-        'username': a.user.username,
-        'full_name': a.full_name,
-        'phone_number': a.phone_number,
-        'gender': a.gender,
-        'teacher': a.teacher.full_name
-    } for a in assistants]
-
-    return Response(data, status=status.HTTP_200_OK)
+    return paginated_response(request, assistants, AssistantProfileSerializer)
 
 @api_view(['PATCH'])
 @permission_classes([IsTeacherOrAdmin])
 def update_assistant(request, assistant_id):
     try:
         if request.user.role == 'teacher':
-            assistant = AssistantProfile.objects.get(id=assistant_id, teacher=request.user.teacher_profile)
+            assistant = AssistantProfile.objects.for_teacher(request).get(id=assistant_id)
         else:  # admin
             assistant = AssistantProfile.objects.get(id=assistant_id)
     except AssistantProfile.DoesNotExist:
@@ -440,7 +700,7 @@ def update_assistant(request, assistant_id):
 def delete_assistant(request, assistant_id):
     try:
         if request.user.role == 'teacher':
-            assistant = AssistantProfile.objects.get(id=assistant_id, teacher=request.user.teacher_profile)
+            assistant = AssistantProfile.objects.for_teacher(request).get(id=assistant_id)
         else:  # admin
             assistant = AssistantProfile.objects.get(id=assistant_id)
     except AssistantProfile.DoesNotExist:
@@ -456,7 +716,7 @@ def delete_assistant(request, assistant_id):
 @permission_classes([IsTeacherOrAdmin])
 def create_center(request):
     if request.user.role == 'teacher':
-        request.data['teacher'] = request.user.teacher_profile.id
+        request.data['teacher'] = request.tenant.teacher.pk
 
     serializer = CenterSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
@@ -469,13 +729,10 @@ def create_center(request):
 def list_centers(request):
     if request.user.role == 'admin':
         centers = Center.objects.all()
-    elif request.user.role == 'teacher':
-        centers = Center.objects.filter(teacher=request.user.teacher_profile)
-    elif request.user.role == 'assistant':
-        centers = Center.objects.filter(teacher=request.user.assistant_profile.teacher)
+    elif request.user.role in ['teacher', 'assistant']:
+        centers = Center.objects.for_teacher(request)
     else:  # student
-        centers = Center.objects.filter(id=request.user.student_profile.center_id)
+        centers = Center.objects.filter(id=request.tenant.student.center_id)
 
-    serializer = CenterSerializer(centers, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginated_response(request, centers, CenterSerializer)
 
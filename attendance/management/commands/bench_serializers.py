@@ -0,0 +1,97 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User, TeacherProfile, StudentProfile, Grade, Center
+from accounts.serializers import StudentProfileSerializer, StudentProfileListSerializer
+from attendance.models import Attendance
+from attendance.serializers import AttendanceSerializer, AttendanceListSerializer
+from backend import renderers
+from backend.renderers import FastJSONRenderer
+
+
+def values_row(instance, lookups):
+    """The dict `.values(*lookups)` would return for `instance`."""
+    row = {}
+    for lookup in lookups:
+        *path, name = lookup.split('__')
+        target = instance
+        for attr in path:
+            target = getattr(target, attr) if target is not None else None
+        row[lookup] = None if target is None else getattr(target, target._meta.get_field(name).attname)
+    return row
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure list serialization and JSON rendering throughput on in-memory rows: "
+        "model serializers against .values() serializers, DRF's JSONRenderer against FastJSONRenderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; the best is reported")
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: FastJSONRenderer uses the stdlib"))
+        students, attendance = self.build(options['rows'])
+        datasets = [
+            ('students', students, StudentProfileSerializer, StudentProfileListSerializer),
+            ('attendance', attendance, AttendanceSerializer, AttendanceListSerializer),
+        ]
+        self.stdout.write(f"{'rows':<11} {'step':<32} {'seconds':>8} {'rows/s':>10}")
+        for label, instances, model_serializer, values_serializer in datasets:
+            rows = [values_row(instance, values_serializer.lookups()) for instance in instances]
+            model_data = model_serializer(instances, many=True).data
+            values_data = values_serializer(rows, many=True).data
+
+            steps = [
+                ('serialize: model serializer', lambda: model_serializer(instances, many=True).data),
+                ('serialize: values serializer', lambda: values_serializer(rows, many=True).data),
+                ('render: JSONRenderer', lambda: JSONRenderer().render(model_data)),
+                ('render: FastJSONRenderer', lambda: FastJSONRenderer().render(model_data)),
+                ('total: model + JSONRenderer',
+                 lambda: JSONRenderer().render(model_serializer(instances, many=True).data)),
+                ('total: values + FastJSONRenderer',
+                 lambda: FastJSONRenderer().render(values_serializer(rows, many=True).data)),
+            ]
+            for step, run in steps:
+                elapsed = min(self.measure(run) for _ in range(options['repeat']))
+                self.stdout.write(f"{label:<11} {step:<32} {elapsed:>8.4f} {len(instances) / elapsed:>10.0f}")
+
+            identical = JSONRenderer().render(model_data) == FastJSONRenderer().render(values_data)
+            self.stdout.write(f"{label:<11} identical output: {'yes' if identical else 'NO'}")
+
+    @staticmethod
+    def measure(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
+
+    def build(self, count):
+        """Unsaved rows with their relations attached, as select_related would load them."""
+        grade = Grade(pk=1, name='Grade 1')
+        teacher_user = User(pk=1, username='bench-teacher', role='teacher')
+        teacher = TeacherProfile(pk=1, user=teacher_user, full_name='Bench Teacher', phone_number='0100000000')
+        center = Center(pk=1, name='Main center', teacher=teacher)
+        students = [
+            StudentProfile(
+                pk=i, user=User(pk=1000 + i, username=f'student-{i}', role='student'), teacher=teacher,
+                full_name=f'Student {i}', phone_number=f'010{i:08d}', parent_number=f'011{i:08d}',
+                gender='male' if i % 2 else 'female', grade=grade, center=center, is_approved=bool(i % 3)
+            )
+            for i in range(1, count + 1)
+        ]
+        attendance = [
+            Attendance(
+                pk=i, student=students[i % count], date=date(2026, 1, 1) + timedelta(days=i % 120),
+                attended=bool(i % 4), homework=bool(i % 3),
+                # Some records have no submitter, like rows whose user was deleted
+                submitted_by=teacher_user if i % 5 else None
+            )
+            for i in range(1, count + 1)
+        ]
+        return students, attendance
@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from accounts.models import User, TeacherProfile, StudentProfile
+from attendance.models import Attendance
+
+BENCH_ALIAS = 'bench_writes'
+
+MODES = {
+    # Django's stock SQLite configuration
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    # The production options without the in-process write queue
+    'options': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': settings.SQLITE_OPTIONS},
+    # The production configuration from settings
+    'tuned': {'ENGINE': 'backend.sqlite', 'OPTIONS': settings.SQLITE_OPTIONS},
+}
+# Modes whose scratch file is switched to WAL, as `enable_wal` does in production
+WAL_MODES = {'options', 'tuned'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent attendance write throughput on a scratch SQLite file, "
+        "with Django's default SQLite settings, with the production options alone and with "
+        "the full production backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--transactions', type=int, default=50, help="Per thread")
+        parser.add_argument('--students', type=int, default=30, help="Records written per transaction")
+        parser.add_argument('--mode', choices=sorted(MODES), action='append', help="Default: all modes")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':<8} {'committed':>9} {'locked':>7} {'seconds':>8} {'tx/s':>8}")
+        for mode in options['mode'] or list(MODES):
+            workdir = Path(tempfile.mkdtemp(prefix='bench-writes-'))
+            try:
+                committed, locked, elapsed = self.run_mode(mode, workdir / 'bench.sqlite3', options)
+            finally:
+                if BENCH_ALIAS in connections:
+                    connections[BENCH_ALIAS].close()
+                    del connections[BENCH_ALIAS]
+                    del connections.settings[BENCH_ALIAS]
+                shutil.rmtree(workdir)
+            self.stdout.write(
+                f"{mode:<8} {committed:>9} {locked:>7} {elapsed:>8.2f} {committed / elapsed:>8.1f}"
+            )
+
+    def run_mode(self, mode, path, options):
+        connections.settings[BENCH_ALIAS] = connections.configure_settings({
+            'default': connections.settings['default'],
+            BENCH_ALIAS: {**MODES[mode], 'NAME': path},
+        })[BENCH_ALIAS]
+        call_command('migrate', database=BENCH_ALIAS, verbosity=0)
+        if mode in WAL_MODES:
+            call_command('enable_wal', database=[BENCH_ALIAS], verbosity=0)
+            # Reconnect so the WAL-only PRAGMAs of backend.sqlite apply
+            connections[BENCH_ALIAS].close()
+        students = self.seed(options['students'])
+
+        counts = {'committed': 0, 'locked': 0}
+        counts_guard = threading.Lock()
+        start_line = threading.Barrier(options['threads'])
+
+        def worker(thread_index):
+            start_line.wait()
+            try:
+                for n in range(options['transactions']):
+                    day = date(2026, 1, 1) + timedelta(days=thread_index * options['transactions'] + n)
+                    try:
+                        self.record_session(students, day)
+                        outcome = 'committed'
+                    except OperationalError:
+                        outcome = 'locked'
+                    with counts_guard:
+                        counts[outcome] += 1
+            finally:
+                connections[BENCH_ALIAS].close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts['committed'], counts['locked'], time.perf_counter() - started
+
+    def seed(self, count):
+        # bulk_create keeps the dashboard signal handlers off the real database
+        users = User.objects.using(BENCH_ALIAS).bulk_create(
+            [User(username='bench-teacher', role='teacher')]
+            + [User(username=f'bench-student-{i}', role='student') for i in range(count)]
+        )
+        teacher = TeacherProfile.objects.using(BENCH_ALIAS).bulk_create([
+            TeacherProfile(user=users[0], full_name='Bench', phone_number='0', gender='male')
+        ])[0]
+        return StudentProfile.objects.using(BENCH_ALIAS).bulk_create([
+            StudentProfile(user=user, teacher=teacher, full_name=user.username,
+                           phone_number='0', parent_number='0', gender='male')
+            for user in users[1:]
+        ])
+
+    def record_session(self, students, day):
+        # Same shape as a bulk attendance submission: read, then upsert
+        with transaction.atomic(using=BENCH_ALIAS):
+            queryset = Attendance.objects.using(BENCH_ALIAS)
+            queryset.filter(student__in=students, date=day).count()
+            queryset.upsert([
+                Attendance(student_id=student.pk, date=day, attended=True, homework=True)
+                for student in students
+            ])
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 06:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # Keep the most recent submission for each (student, date) pair
+    Attendance = apps.get_model('attendance', 'Attendance')
+    duplicates = (
+        Attendance.objects.values('student', 'date')
+        .annotate(keep_id=Max('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Attendance.objects.filter(
+            student_id=row['student'], date=row['date']
+        ).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_teacherprofile_grades'),
+        ('attendance', '0002_rename_homework_done_attendance_homework'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'date'), name='unique_attendance_per_student_date'),
+        ),
+    ]
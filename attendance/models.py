@@ -1,6 +1,17 @@
 from django.db import models
 from django.utils import timezone
 from accounts.models import StudentProfile, User  # adjust if app name differs
+from accounts.tenancy import TenantQuerySet
+
+class AttendanceQuerySet(TenantQuerySet):
+    def upsert(self, objs):
+        """Insert the records, overwriting any existing row for the same (student, date)."""
+        return self.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['attended', 'homework', 'submitted_by']
+        )
 
 class Attendance(models.Model):
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_records')
@@ -9,5 +20,16 @@ class Attendance(models.Model):
     date = models.DateField(default=timezone.now)
     submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='submitted_attendance')
 
+    objects = AttendanceQuerySet.as_manager()
+    TENANT_FIELD = 'student__teacher'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'date'], name='unique_attendance_per_student_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='attendance_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.full_name} - {self.date} - {'Present' if self.attended else 'Absent'}"
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from backend.eager_loading import EagerLoadingMixin
+from backend.serializers import ValuesSerializer
 from .models import Attendance
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.full_name', read_only=True)
     phone_number = serializers.CharField(source='student.phone_number', read_only=True)
     parent_number = serializers.CharField(source='student.parent_number', read_only=True)
@@ -20,3 +22,35 @@ class AttendanceSerializer(serializers.ModelSerializer):
             'date',
             'submitted_by',
         ]
+        select_related = ['student', 'submitted_by']
+        # Creating an existing (student, date) pair overwrites it, so only
+        # updates are checked for uniqueness (see validate)
+        validators = []
+
+    def validate(self, attrs):
+        if self.instance is not None:
+            student = attrs.get('student', self.instance.student)
+            date = attrs.get('date', self.instance.date)
+            duplicate = Attendance.objects.filter(student=student, date=date).exclude(pk=self.instance.pk)
+            if duplicate.exists():
+                raise serializers.ValidationError("Attendance for this student and date already exists.")
+        return attrs
+
+
+class AttendanceListSerializer(ValuesSerializer):
+    """Attendance list rows, read with .values()."""
+
+    class Meta:
+        serializer = AttendanceSerializer
+
+
+class AttendanceBulkRecordSerializer(serializers.Serializer):
+    student = serializers.IntegerField()
+    attended = serializers.BooleanField(default=False)
+    homework = serializers.BooleanField(default=False)
+
+
+class AttendanceBulkSerializer(serializers.Serializer):
+    center = serializers.IntegerField()
+    date = serializers.DateField()
+    records = AttendanceBulkRecordSerializer(many=True, allow_empty=False)
@@ -1,3 +1,272 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import date
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import StudentProfile
+from backend.exports import stream_json
+from backend.renderers import FastJSONRenderer
+from backend.testing import QueryCountAssertionsMixin, TenantTestCase
+
+from .models import Attendance
+from .serializers import AttendanceSerializer, AttendanceListSerializer
+
+
+class AttendanceUpsertTests(TenantTestCase):
+
+    def test_resubmitting_a_day_overwrites_it(self):
+        client, _ = self.login('t1')
+        student = self.students[0]
+        for attended in (True, False):
+            response = client.post(
+                '/api/attendance/add/', {'student': student.pk, 'attended': attended, 'date': '2026-01-02'}, format='json'
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+
+        record = Attendance.objects.get(student=student)
+        self.assertEqual((record.date, record.attended), (date(2026, 1, 2), False))
+        self.assertEqual(response.json()['id'], record.pk)
+
+    def test_bulk_submission_overwrites_existing_rows(self):
+        client, _ = self.login('a1')
+        existing = Attendance.objects.create(student=self.students[0], date=date(2026, 1, 2), attended=False)
+        response = client.post('/api/attendance/bulk/', {
+            'center': self.center.pk, 'date': '2026-01-02',
+            'records': [{'student': student.pk, 'attended': True} for student in self.students],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        self.assertEqual(Attendance.objects.count(), 5)
+        existing.refresh_from_db()
+        self.assertEqual((existing.attended, existing.submitted_by), (True, self.assistant.user))
+
+    def test_editing_onto_a_taken_day_is_rejected(self):
+        client, _ = self.login('t1')
+        student = self.students[0]
+        Attendance.objects.create(student=student, date=date(2026, 1, 1))
+        record = Attendance.objects.create(student=student, date=date(2026, 1, 2))
+        response = client.patch(f'/api/attendance/edit/{record.pk}/', {'date': '2026-01-01'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AttendanceBulkCreateTests(TenantTestCase):
+
+    def post(self, client, center, records, day='2026-01-01'):
+        return client.post('/api/attendance/bulk/', {'center': center.pk, 'date': day, 'records': records}, format='json')
+
+    def test_whole_session_in_one_request(self):
+        client, _ = self.login('a1')
+        records = [{'student': student.pk, 'attended': bool(i % 2)} for i, student in enumerate(self.students)]
+        # Another teacher's student and a repeated one are reported, not saved
+        records += [{'student': self.other_student.pk}, {'student': self.students[0].pk}]
+
+        response = self.post(client, self.center, records)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['saved'], 5)
+        self.assertEqual(
+            [result['status'] for result in response.json()['results']], ['saved'] * 5 + ['error', 'error']
+        )
+        self.assertEqual(Attendance.objects.filter(date=date(2026, 1, 1), attended=True).count(), 2)
+        self.assertFalse(Attendance.objects.filter(student=self.other_student).exists())
+        self.assertTrue(Attendance.objects.filter(submitted_by=self.assistant.user).exists())
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        client, _ = self.login('t1')
+        counts = []
+        for day, students in (('2026-01-01', self.students[:1]), ('2026-01-02', self.students)):
+            with CaptureQueriesContext(connection) as queries:
+                self.post(client, self.center, [{'student': student.pk} for student in students], day)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_other_teachers_centers_are_rejected(self):
+        client, _ = self.login('t1')
+        response = self.post(client, self.center2, [{'student': self.other_student.pk}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class AttendanceExportTests(TenantTestCase):
+
+    def test_streams_the_filtered_list_as_csv(self):
+        for student in self.students:
+            for day in (1, 2, 3):
+                Attendance.objects.create(student=student, date=date(2026, 1, day), attended=day != 2)
+        client, _ = self.login('t1')
+
+        response = client.get(f'/api/attendance/export/?date_from=2026-01-02&student={self.students[0].pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="attendance.csv"')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], [
+            'Date', 'Student', 'Username', 'Center', 'Grade', 'Attended', 'Homework', 'Submitted by',
+        ])
+        self.assertEqual(rows[1:], [
+            ['2026-01-03', 'Student 0', 's0', 'C1', 'Grade 1', 'True', 'False', ''],
+            ['2026-01-02', 'Student 0', 's0', 'C1', 'Grade 1', 'False', 'False', ''],
+        ])
+
+    def test_students_cannot_export(self):
+        client, _ = self.login('s0')
+        self.assertEqual(client.get('/api/attendance/export/').status_code, 403)
+
+
+class AttendancePaginationTests(TenantTestCase):
+
+    def test_pages_walk_the_keyset_without_offsets(self):
+        for day in range(1, 4):
+            for student in self.students:
+                Attendance.objects.create(student=student, date=date(2026, 1, day))
+        client, _ = self.login('t1')
+
+        seen = []
+        url = '/api/attendance/list/?page_size=4'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = client.get(url).json()
+            self.assertFalse([query for query in queries.captured_queries if 'OFFSET' in query['sql']])
+            seen += [(row['date'], row['id']) for row in page['results']]
+            url = page['next']
+
+        self.assertEqual(len(seen), 15)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+        # And back again
+        back = []
+        url = page['previous']
+        while url:
+            page = client.get(url).json()
+            back = [(row['date'], row['id']) for row in page['results']] + back
+            url = page['previous']
+        self.assertEqual(back, seen[:len(back)])
+        self.assertEqual(len(back), 12)
+
+
+class StudentSearchPaginationTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Students without a center, and names shared between students
+        for i in range(3):
+            self.create_student(f'n{i}', self.teacher, None, 'Student 1')
+        self.client, _ = self.login('t1')
+
+    def walk(self, url):
+        """Ids of every page from `url` on, then of every page back from the last one."""
+        forward, back = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertFalse([query for query in queries.captured_queries if 'OFFSET' in query['sql']])
+            page = response.json()
+            forward += [row['id'] for row in page['results']]
+            url, previous = page['next'], page['previous']
+        while previous:
+            page = self.client.get(previous).json()
+            back = [row['id'] for row in page['results']] + back
+            previous = page['previous']
+        return forward, back
+
+    def test_null_values_in_the_cursor(self):
+        ids = sorted(student.pk for student in StudentProfile.objects.filter(teacher=self.teacher))
+        for ordering in ('center', '-center'):
+            with self.subTest(ordering=ordering):
+                forward, back = self.walk(f'/api/attendance/search/?ordering={ordering}&page_size=2')
+                self.assertEqual(sorted(forward), ids)
+                self.assertEqual(back, forward[:len(back)])
+                self.assertTrue(back)
+
+    def test_client_orderings_are_made_unique(self):
+        for ordering in ('full_name', '-full_name', 'center,-full_name'):
+            with self.subTest(ordering=ordering):
+                forward, back = self.walk(f'/api/attendance/search/?ordering={ordering}&page_size=2')
+                self.assertEqual(len(forward), 8)
+                self.assertEqual(len(set(forward)), 8)
+                self.assertEqual(back, forward[:len(back)])
+
+
+class AttendanceStreamTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 6):
+            for student in [*self.students, self.other_student]:
+                Attendance.objects.create(
+                    student=student, date=date(2026, 1, day), attended=bool(day % 2),
+                    submitted_by=self.teacher.user if day % 3 else None
+                )
+
+    def all_pages(self, client, url):
+        rows = []
+        while url:
+            page = client.get(url).json()
+            rows += page['results']
+            url = page['next']
+        return rows
+
+    def test_stream_matches_the_pages(self):
+        client, _ = self.login('t1')
+        for query in ('', 'date_from=2026-01-03&', 'date=2020-01-01&'):
+            with self.subTest(query=query):
+                expected = self.all_pages(client, f'/api/attendance/list/?{query}page_size=7')
+                response = client.get(f'/api/attendance/list/?{query}stream=1')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+
+    def test_chunks_join_into_one_array(self):
+        queryset = Attendance.objects.order_by('-date', '-id')
+        response = stream_json(queryset, AttendanceListSerializer, chunk_size=7)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(body, FastJSONRenderer().render(AttendanceListSerializer(
+            AttendanceListSerializer.setup_eager_loading(queryset), many=True
+        ).data))
+
+    def test_stream_keeps_the_permissions(self):
+        client, _ = self.login('s0')
+        response = client.get('/api/attendance/list/?stream=1')
+        self.assertEqual(response.status_code, 403)
+
+
+class AttendanceListSerializerTests(TenantTestCase):
+
+    def test_renders_the_same_bytes_as_the_model_serializer(self):
+        self.students[0].full_name = 'Zoë   Line'
+        self.students[0].save()
+        for i, student in enumerate(self.students):
+            Attendance.objects.create(
+                student=student, date=date(2026, 1, 1 + i), attended=bool(i % 2), homework=True,
+                # Rows whose submitter was deleted have no submitted_by
+                submitted_by=self.teacher.user if i % 3 else None
+            )
+
+        queryset = Attendance.objects.order_by('pk')
+        rows = AttendanceListSerializer.setup_eager_loading(queryset)
+        instances = AttendanceSerializer.setup_eager_loading(queryset)
+        self.assertEqual(
+            FastJSONRenderer().render(AttendanceListSerializer(rows, many=True).data),
+            JSONRenderer().render(AttendanceSerializer(instances, many=True).data)
+        )
+
+
+class AttendanceListQueryCountTests(QueryCountAssertionsMixin, TenantTestCase):
+
+    def test_list(self):
+        client, _ = self.login('a1')
+
+        def get():
+            response = client.get('/api/attendance/list/')
+            self.assertEqual(response.status_code, 200, response.content)
+
+        Attendance.objects.create(student=self.students[0], date=date(2026, 1, 1), submitted_by=self.teacher.user)
+        self.assertConstantQueries(get, lambda: [
+            Attendance.objects.create(student=student, date=date(2026, 1, 2), submitted_by=self.assistant.user)
+            for student in self.students
+        ])
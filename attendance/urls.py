@@ -1,16 +1,20 @@
 from django.urls import path
 from .views import (
     AttendanceCreateView,
+    AttendanceBulkCreateView,
     AttendanceUpdateView,
     AttendanceDeleteView,
     StudentSearchListView,
-    AttendanceListView  # New view for listing attendance
+    AttendanceListView,  # New view for listing attendance
+    AttendanceExportView
 )
 
 urlpatterns = [
     path('add/', AttendanceCreateView.as_view(), name='attendance-create'),  # Add attendance
+    path('bulk/', AttendanceBulkCreateView.as_view(), name='attendance-bulk-create'),  # Add a whole session
     path('edit/<int:pk>/', AttendanceUpdateView.as_view(), name='attendance-edit'),  # Edit attendance
     path('delete/<int:pk>/', AttendanceDeleteView.as_view(), name='attendance-delete'),  # Delete attendance
     path('search/', StudentSearchListView.as_view(), name='student-search'),  # Search students
     path('list/', AttendanceListView.as_view(), name='attendance-list'),  # View attendance list
+    path('export/', AttendanceExportView.as_view(), name='attendance-export'),  # Download attendance as CSV
 ]
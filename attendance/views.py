@@ -1,11 +1,16 @@
-from rest_framework import generics, filters
+from rest_framework import generics, filters, status
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from django.shortcuts import get_object_or_404
+from rest_framework.response import Response
+from django.db import router, transaction
+from django.utils import timezone
 from .models import Attendance
-from .serializers import AttendanceSerializer
+from .serializers import AttendanceSerializer, AttendanceBulkSerializer, AttendanceListSerializer
 from accounts.models import StudentProfile, Center
-from accounts.serializers import StudentProfileSerializer
+from accounts.serializers import StudentProfileListSerializer
 from accounts.permissions import IsTeacher, IsAssistant
+from accounts.search import StudentSearchFilter, search_ordering
+from backend.eager_loading import EagerLoadingFilter
+from backend.exports import StreamingListMixin, stream_csv
 
 class AttendanceCreateView(generics.CreateAPIView):
     serializer_class = AttendanceSerializer
@@ -13,67 +18,106 @@ class AttendanceCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         user = self.request.user
-        student_id = self.request.data.get('student')
-        
-        # Get student and verify ownership
-        student = get_object_or_404(StudentProfile, id=student_id)
-        teacher = self._get_teacher(user)
-        
-        if student.teacher != teacher:
+        student = serializer.validated_data['student']
+
+        # Verify ownership
+        if student.teacher_id != self.request.tenant.teacher.pk:
             raise PermissionDenied("You can only add attendance for your own students.")
-        
-        serializer.save(submitted_by=user)
 
-    def _get_teacher(self, user):
-        if user.role == 'teacher':
-            return user.teacher_profile
-        elif user.role == 'assistant':
-            return user.assistant_profile.teacher
-        raise PermissionDenied()
+        # Upsert so that retried submissions overwrite instead of duplicating
+        data = {'date': timezone.localdate(), **serializer.validated_data}
+        attendance = Attendance(**data, submitted_by_id=user.pk)
+        Attendance.objects.upsert([attendance])
+        serializer.instance = attendance
+
+class AttendanceBulkCreateView(generics.GenericAPIView):
+    """Submit a whole center session in one request."""
+    serializer_class = AttendanceBulkSerializer
+    permission_classes = [IsTeacher | IsAssistant]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        user = request.user
+
+        if not Center.objects.for_teacher(request).filter(id=data['center']).exists():
+            raise ValidationError("Invalid center ID")
+
+        # Verify ownership for the whole batch with a single query
+        records = data['records']
+        owned = set(
+            StudentProfile.objects.for_teacher(request).filter(
+                center_id=data['center'],
+                id__in=[record['student'] for record in records]
+            ).values_list('id', flat=True)
+        )
+
+        results = []
+        to_save = []
+        seen = set()
+        for record in records:
+            student_id = record['student']
+            if student_id not in owned:
+                results.append({'student': student_id, 'status': 'error',
+                                'error': "Student not found in this center."})
+            elif student_id in seen:
+                results.append({'student': student_id, 'status': 'error',
+                                'error': "Duplicate student in batch."})
+            else:
+                seen.add(student_id)
+                results.append({'student': student_id, 'status': 'saved'})
+                to_save.append(Attendance(
+                    student_id=student_id,
+                    attended=record['attended'],
+                    homework=record['homework'],
+                    date=data['date'],
+                    submitted_by_id=user.pk
+                ))
+
+        with transaction.atomic(using=router.db_for_write(Attendance)):
+            saved = Attendance.objects.upsert(to_save)
+
+        ids = {obj.student_id: obj.id for obj in saved}
+        for result in results:
+            if result['status'] == 'saved':
+                result['id'] = ids[result['student']]
+
+        return Response(
+            {'saved': len(saved), 'results': results},
+            status=status.HTTP_201_CREATED if saved else status.HTTP_400_BAD_REQUEST
+        )
 
 class AttendanceUpdateView(generics.UpdateAPIView):
     serializer_class = AttendanceSerializer
     permission_classes = [IsTeacher | IsAssistant]
 
     def get_queryset(self):
-        teacher = self._get_teacher(self.request.user)
-        return Attendance.objects.filter(student__teacher=teacher)
-
-    def _get_teacher(self, user):
-        if user.role == 'teacher':
-            return user.teacher_profile
-        elif user.role == 'assistant':
-            return user.assistant_profile.teacher
-        raise PermissionDenied()
+        return Attendance.objects.for_teacher(self.request)
 
 class AttendanceDeleteView(generics.DestroyAPIView):
     serializer_class = AttendanceSerializer
     permission_classes = [IsTeacher | IsAssistant]
 
     def get_queryset(self):
-        teacher = self._get_teacher(self.request.user)
-        return Attendance.objects.filter(student__teacher=teacher)
-
-    def _get_teacher(self, user):
-        if user.role == 'teacher':
-            return user.teacher_profile
-        elif user.role == 'assistant':
-            return user.assistant_profile.teacher
-        raise PermissionDenied()
+        return Attendance.objects.for_teacher(self.request)
 
 class StudentSearchListView(generics.ListAPIView):
-    serializer_class = StudentProfileSerializer
+    serializer_class = StudentProfileListSerializer
     permission_classes = [IsTeacher | IsAssistant]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['full_name', 'user__username']
+    filter_backends = [EagerLoadingFilter, StudentSearchFilter, filters.OrderingFilter]
+
+    def paginate_queryset(self, queryset):
+        # Searches page by relevance unless the client asks for ?ordering=
+        self.ordering = search_ordering(queryset)
+        return super().paginate_queryset(queryset)
 
     def get_queryset(self):
-        teacher = self._get_teacher(self.request.user)
-        queryset = StudentProfile.objects.filter(teacher=teacher)
+        queryset = StudentProfile.objects.for_teacher(self.request)
 
         # Validate center belongs to teacher
         if center_id := self.request.query_params.get('center'):
-            if not Center.objects.filter(id=center_id, teacher=teacher).exists():
+            if not Center.objects.for_teacher(self.request).filter(id=center_id).exists():
                 raise ValidationError("Invalid center ID")
             queryset = queryset.filter(center_id=center_id)
 
@@ -82,20 +126,13 @@ class StudentSearchListView(generics.ListAPIView):
 
         return queryset
 
-    def _get_teacher(self, user):
-        if user.role == 'teacher':
-            return user.teacher_profile
-        elif user.role == 'assistant':
-            return user.assistant_profile.teacher
-        raise PermissionDenied()
-
-class AttendanceListView(generics.ListAPIView):
-    serializer_class = AttendanceSerializer
+class AttendanceListView(StreamingListMixin, generics.ListAPIView):
+    serializer_class = AttendanceListSerializer
     permission_classes = [IsTeacher | IsAssistant]
+    ordering = ('-date', '-id')
 
     def get_queryset(self):
-        teacher = self._get_teacher(self.request.user)
-        queryset = Attendance.objects.filter(student__teacher=teacher)
+        queryset = Attendance.objects.for_teacher(self.request)
 
         if student_id := self.request.query_params.get('student'):
             queryset = queryset.filter(student_id=student_id)
@@ -103,11 +140,33 @@ class AttendanceListView(generics.ListAPIView):
         if date := self.request.query_params.get('date'):
             queryset = queryset.filter(date=date)
 
+        if date_from := self.request.query_params.get('date_from'):
+            queryset = queryset.filter(date__gte=date_from)
+
+        if date_to := self.request.query_params.get('date_to'):
+            queryset = queryset.filter(date__lte=date_to)
+
+        if center_id := self.request.query_params.get('center'):
+            queryset = queryset.filter(student__center_id=center_id)
+
+        if grade_id := self.request.query_params.get('grade'):
+            queryset = queryset.filter(student__grade_id=grade_id)
+
         return queryset
 
-    def _get_teacher(self, user):
-        if user.role == 'teacher':
-            return user.teacher_profile
-        elif user.role == 'assistant':
-            return user.assistant_profile.teacher
-        raise PermissionDenied()
\ No newline at end of file
+class AttendanceExportView(AttendanceListView):
+    """Attendance list as a streamed CSV file; same filters as the list."""
+    columns = [
+        ('Date', 'date'),
+        ('Student', 'student__full_name'),
+        ('Username', 'student__user__username'),
+        ('Center', 'student__center__name'),
+        ('Grade', 'student__grade__name'),
+        ('Attended', 'attended'),
+        ('Homework', 'homework'),
+        ('Submitted by', 'submitted_by__username'),
+    ]
+
+    def get(self, request):
+        queryset = self.get_queryset().order_by(*self.ordering)
+        return stream_csv(queryset, self.columns, 'attendance.csv')
\ No newline at end of file
@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve with an ASGI server (e.g. ``uvicorn backend.asgi:application``) to
+get the non-blocking ``/api/accounts/login/async/`` and
+``/api/accounts/refresh/async/`` endpoints, whose password checks and
+token signing run in a bounded pool (see ``backend.concurrency``), and
+the ``/api/accounts/dashboard/<role>/async/`` dashboards, which run
+their queries concurrently.
 """
 
 import os
@@ -0,0 +1,137 @@
+"""
+Bounded worker pools for CPU-heavy work called from async views.
+
+A `BoundedPool` owns a small thread pool and admits at most
+`max_pending` waiting callers; beyond that `run()` raises
+`PoolOverloaded` instead of queueing without limit. The pool's size caps
+how many threads the expensive work can take, so the default executor
+that serves every other sync view keeps free threads during a burst.
+A pool can be awaited from any event loop and thread. Stats are
+exposed through `MetricsView`.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from .metrics import Histogram, LATENCY_BUCKETS
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+class _QueuedCall:
+    """A call waiting in a pool's queue; `dequeue` is true only once."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.queued = time.perf_counter()
+        self.in_queue = True
+
+    def dequeue(self):
+        in_queue, self.in_queue = self.in_queue, False
+        return in_queue
+
+
+class BoundedPool:
+    def __init__(self, name, workers, max_pending):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        # The executor's queue is where callers wait for a thread. Unlike an
+        # asyncio primitive it is not bound to an event loop, and under WSGI
+        # every async_to_sync call runs on a loop of its own
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        # Guards the counters and histograms, updated from the callers'
+        # loops and from the pool's threads
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self.wait_time = Histogram(LATENCY_BUCKETS)
+        self.run_time = Histogram(LATENCY_BUCKETS)
+        pools[name] = self
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.waiting >= self.max_pending:
+                self.rejected += 1
+                raise PoolOverloaded(self.name)
+            self.waiting += 1
+
+        call = _QueuedCall(partial(fn, *args, **kwargs))
+        try:
+            return await sync_to_async(self._call, thread_sensitive=False, executor=self._executor)(call)
+        finally:
+            # A caller cancelled while queued leaves the queue without running
+            with self._lock:
+                if call.dequeue():
+                    self.waiting -= 1
+
+    def _call(self, call):
+        started = time.perf_counter()
+        with self._lock:
+            if not call.dequeue():
+                # Its caller already gave up on it
+                return None
+            self.waiting -= 1
+            self.in_flight += 1
+            self.wait_time.observe(started - call.queued)
+        # Pool threads live outside the request cycle, so they manage
+        # their own connections the way request_finished would
+        try:
+            return call.fn()
+        finally:
+            close_old_connections()
+            with self._lock:
+                self.in_flight -= 1
+                self.run_time.observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        return {
+            'pool': self.name,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'waiting': self.waiting,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+            'wait_seconds': self.wait_time.as_dict(),
+            'run_seconds': self.run_time.as_dict(),
+        }
+
+
+pools = {}
+
+
+def pools_snapshot():
+    return [pool.snapshot() for _, pool in sorted(pools.items())]
+
+
+def pools_prometheus_text(snapshot):
+    lines = [
+        '# HELP worker_pool_waiting Callers waiting for a pool slot.',
+        '# TYPE worker_pool_waiting gauge',
+        '# HELP worker_pool_in_flight Calls running in the pool.',
+        '# TYPE worker_pool_in_flight gauge',
+        '# HELP worker_pool_rejected_total Calls rejected because the queue was full.',
+        '# TYPE worker_pool_rejected_total counter',
+    ]
+    for entry in snapshot:
+        labels = f'pool="{entry["pool"]}"'
+        lines.append(f'worker_pool_waiting{{{labels}}} {entry["waiting"]}')
+        lines.append(f'worker_pool_in_flight{{{labels}}} {entry["in_flight"]}')
+        lines.append(f'worker_pool_rejected_total{{{labels}}} {entry["rejected"]}')
+    for key, name in (('wait_seconds', 'worker_pool_wait_seconds'), ('run_seconds', 'worker_pool_run_seconds')):
+        lines.append(f'# TYPE {name} histogram')
+        for entry in snapshot:
+            labels = f'pool="{entry["pool"]}"'
+            hist = entry[key]
+            for bound, total in hist['buckets'].items():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f'{name}_sum{{{labels}}} {hist["sum"]}')
+            lines.append(f'{name}_count{{{labels}}} {hist["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,36 @@
+from rest_framework.filters import BaseFilterBackend
+
+
+class EagerLoadingMixin:
+    """
+    Serializer mixin for declaring the relations a serializer reads.
+
+        class Meta:
+            select_related = ['student', 'submitted_by']
+            prefetch_related = ['grades']
+
+    Views never list relations themselves; querysets are optimised from
+    this declaration by `EagerLoadingFilter` and `paginated_response`.
+    """
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        meta = getattr(cls, 'Meta', None)
+        if select_related := getattr(meta, 'select_related', None):
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related := getattr(meta, 'prefetch_related', None):
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+def setup_eager_loading(queryset, serializer_class):
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        return serializer_class.setup_eager_loading(queryset)
+    return queryset
+
+
+class EagerLoadingFilter(BaseFilterBackend):
+    """Applies the serializer's declared relations to generic view querysets."""
+
+    def filter_queryset(self, request, queryset, view):
+        return setup_eager_loading(queryset, view.get_serializer_class())
@@ -0,0 +1,142 @@
+"""
+In-process request metrics.
+
+`RequestMetricsMiddleware` feeds one observation per request into the
+module-level `registry`; `MetricsView` exposes the aggregated
+histograms as JSON or Prometheus text. Stats are per worker process and
+reset on restart.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yield (upper bound, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'avg': self.sum / self.count if self.count else 0,
+            'buckets': {str(bound): total for bound, total in self.cumulative()},
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(RESPONSE_SIZE_BUCKETS)
+
+    def histograms(self):
+        return {
+            'latency_seconds': self.latency,
+            'db_queries': self.db_queries,
+            'db_time_seconds': self.db_time,
+            'response_bytes': self.response_size,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, endpoint, method, latency, queries, db_time, response_size):
+        with self._lock:
+            stats = self._stats.get((endpoint, method))
+            if stats is None:
+                stats = self._stats[(endpoint, method)] = EndpointStats()
+            stats.latency.observe(latency)
+            stats.db_queries.observe(queries)
+            stats.db_time.observe(db_time)
+            if response_size is not None:
+                stats.response_size.observe(response_size)
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    'endpoint': endpoint,
+                    'method': method,
+                    **{name: hist.as_dict() for name, hist in stats.histograms().items()},
+                }
+                for (endpoint, method), stats in sorted(self._stats.items())
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """`connection.execute_wrapper` hook counting queries and their DB time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+    def record(self):
+        """Install the hook on every configured database connection."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def prometheus_text(snapshot):
+    """Render a registry snapshot in the Prometheus text exposition format."""
+    metrics = {
+        'latency_seconds': ('http_request_duration_seconds', 'Wall time spent serving the request.'),
+        'db_queries': ('http_request_db_queries', 'SQL queries issued while serving the request.'),
+        'db_time_seconds': ('http_request_db_duration_seconds', 'Time spent in SQL queries.'),
+        'response_bytes': ('http_response_size_bytes', 'Size of the response body.'),
+    }
+    lines = []
+    for key, (name, help_text) in metrics.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for entry in snapshot:
+            labels = f'endpoint="{entry["endpoint"]}",method="{entry["method"]}"'
+            hist = entry[key]
+            for bound, total in hist['buckets'].items():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f'{name}_sum{{{labels}}} {hist["sum"]}')
+            lines.append(f'{name}_count{{{labels}}} {hist["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,52 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import QueryRecorder, registry
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL query count/time and response size per URL name.
+
+    Works without DEBUG: queries are counted through execute_wrapper
+    hooks rather than `connection.queries`. Under ASGI the async path
+    only sees queries made on the event loop thread, so async views that
+    hand their database work to a pool report their latency but not
+    their queries.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with recorder.record():
+            response = await self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, recorder, latency):
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else 'unresolved'
+        response_size = None if response.streaming else len(response.content)
+        registry.observe(
+            endpoint, request.method, latency,
+            recorder.count, recorder.duration, response_size
+        )
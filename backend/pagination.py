@@ -0,0 +1,158 @@
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from .eager_loading import setup_eager_loading
+from .exports import stream_json, wants_stream
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Project-wide cursor pagination.
+
+    Pages are fetched with a `WHERE (<ordering fields>) < cursor` predicate
+    instead of an OFFSET, so every page costs the same as the first one.
+    Views pick the keyset through their `ordering` attribute, e.g.
+    `('-date', '-id')`; the trailing `id` breaks ties between equal dates.
+
+    DRF's CursorPagination keeps only the first ordering field in the
+    cursor and skips the rows sharing its value with an OFFSET, which on
+    a day with thousands of attendance rows is a scan again. Here the
+    cursor position holds every ordering field and the offset stays 0;
+    orderings without `id`, such as a client's `?ordering=`, get it
+    appended as a tiebreaker, and NULL values are compared the way the
+    database sorts them.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        if ordering := getattr(view, 'ordering', None):
+            self.ordering = ordering
+        ordering = super().get_ordering(request, queryset, view)
+        # Client orderings (?ordering=) need not be unique: ties are broken
+        # by id, in the direction of the last field
+        if not any(order.lstrip('-') in ('id', 'pk') for order in ordering):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset with the position filter on
+        # every ordering field (see keyset_filter)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            nulls_largest = connections[queryset.db].features.nulls_order_largest
+            queryset = queryset.filter(self.keyset_filter(current_position, reverse, nulls_largest))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def keyset_filter(self, position, reverse, nulls_largest=False):
+        """
+        Rows past `position` in the (reversed if `reverse`) ordering, as a Q.
+
+        NULLs sort after every value when `nulls_largest`, as on PostgreSQL,
+        and before them otherwise, as on SQLite.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) past (x, y) is: a past x, or a = x and b past y
+        conditions = []
+        for i, (order, value) in enumerate(zip(self.ordering, values)):
+            field = order.lstrip('-')
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            if (past := self.past_value(field, lookup, value, nulls_largest)) is None:
+                continue
+            ties = [
+                Q(**{f'{tied_order.lstrip("-")}__isnull': True} if tied is None else {tied_order.lstrip('-'): tied})
+                for tied_order, tied in zip(self.ordering[:i], values)
+            ]
+            conditions.append(reduce(and_, ties, past))
+        return reduce(or_, conditions, Q(pk__in=[]))
+
+    @staticmethod
+    def past_value(field, lookup, value, nulls_largest):
+        """Rows whose `field` is past `value` in the `lookup` direction; None when none can be."""
+        # Whether NULLs come after every value in this direction
+        nulls_past = (lookup == 'gt') == nulls_largest
+        if value is None:
+            return None if nulls_past else Q(**{f'{field}__isnull': False})
+        past = Q(**{f'{field}__{lookup}': value})
+        return past | Q(**{f'{field}__isnull': True}) if nulls_past else past
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [order.lstrip('-') for order in ordering]
+        if isinstance(instance, dict):
+            values = [instance[field] for field in fields]
+        else:
+            values = [getattr(instance, field) for field in fields]
+        return json.dumps([None if value is None else str(value) for value in values], separators=(',', ':'))
+
+
+def paginated_response(request, queryset, serializer_class, ordering='-id', context=None):
+    """
+    Paginate a queryset from a function or plain APIView.
+
+    With `?stream=1` the whole queryset is streamed instead (see
+    backend.exports.stream_json).
+    """
+    if wants_stream(request):
+        ordering = (ordering,) if isinstance(ordering, str) else ordering
+        return stream_json(queryset.order_by(*ordering), serializer_class, context or {'request': request})
+    paginator = KeysetPagination()
+    paginator.ordering = ordering
+    queryset = setup_eager_loading(queryset, serializer_class)
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context=context or {'request': request})
+    return paginator.get_paginated_response(serializer.data)
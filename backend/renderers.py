@@ -0,0 +1,96 @@
+"""
+JSON rendering through orjson.
+
+`FastJSONRenderer` is a drop-in replacement for DRF's `JSONRenderer`
+that encodes with orjson when it is installed and produces the same
+bytes. orjson is optional: without it, and for the cases orjson
+formats differently, rendering goes through the stdlib as before.
+
+* Values orjson does not handle the way DRF's encoder does (dates and
+  datetimes, decimals, lazy strings...) are passed to the renderer's
+  `encoder_class`.
+* orjson writes floats below 1e-4 or from 1e16 up in a different
+  notation than `json.dumps`; output with such a number is re-rendered
+  with the stdlib (see `diverges_from_stdlib`).
+* Indented output (`; indent=` media type parameter, browsable API) and
+  non-default UNICODE_JSON, COMPACT_JSON or STRICT_JSON settings use the
+  stdlib.
+* orjson writes NaN and infinity as `null`; output containing `null` is
+  checked for them (see `contains_non_finite`) and re-rendered with the
+  stdlib, which raises ValueError as JSONRenderer does.
+"""
+import math
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Candidates for a float in exponent notation, and the digits before the
+# 'e'; both patterns start with a literal so scanning a page stays cheap
+EXPONENT_RE = re.compile(rb'e[-\d]')
+MANTISSA_RE = re.compile(rb'-?\d+(?:\.\d+)?$')
+
+
+def _value_starts_at(ret, i):
+    return i == 0 or ret[i - 1] in b':,['
+
+
+def diverges_from_stdlib(ret):
+    """Whether orjson output `ret` holds a float json.dumps writes differently."""
+    # Below 1e-4 orjson writes e.g. 0.00001 where json.dumps writes 1e-05
+    start = ret.find(b'0.0000')
+    while start != -1:
+        if _value_starts_at(ret, start - 1 if ret[start - 1:start] == b'-' else start):
+            return True
+        start = ret.find(b'0.0000', start + 1)
+    # Exponents: orjson writes 1e16 where json.dumps writes 1e+16
+    for match in EXPONENT_RE.finditer(ret):
+        mantissa = MANTISSA_RE.search(ret, max(0, match.start() - 32), match.start())
+        if mantissa and _value_starts_at(ret, mantissa.start()):
+            return True
+    return False
+
+
+def contains_non_finite(data):
+    """Whether `data` holds a NaN or infinite float at any depth."""
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None
+            or not self.compact or self.ensure_ascii or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            )
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, non-string keys, unsupported types:
+            # let the stdlib encode them or raise its usual error
+            return super().render(data, accepted_media_type, renderer_context)
+        if diverges_from_stdlib(ret) or (b'null' in ret and contains_non_finite(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same \u2028/\u2029 escaping as JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
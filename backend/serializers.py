@@ -0,0 +1,95 @@
+from functools import cached_property
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+# Builtins equivalent to these fields' to_representation
+FAST_CONVERTERS = [
+    (serializers.CharField, str),
+    (serializers.IntegerField, int),
+]
+
+_SKIP = object()
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only, `.values()`-backed twin of a ModelSerializer for list endpoints.
+
+        class AttendanceListSerializer(ValuesSerializer):
+            class Meta:
+                serializer = AttendanceSerializer
+
+    `setup_eager_loading` (see backend.eager_loading) turns the queryset
+    into a `.values()` query of the columns the serializer reads, so list
+    pages skip model instantiation and the per-field attribute lookups,
+    and the rows are rendered with the fields of `Meta.serializer`: the
+    output is the same as the model serializer's. Plain fields, primary
+    key relations and dotted sources (`student.full_name`) are supported.
+    """
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Annotations are kept so that they can be ordered and paginated on
+        return queryset.values(*cls.lookups(), *queryset.query.annotations)
+
+    @classmethod
+    def lookups(cls):
+        lookups = []
+        for _, lookup, relation, _, _ in cls.columns():
+            lookups += [lookup, relation] if relation else [lookup]
+        return list(dict.fromkeys(lookups))
+
+    @classmethod
+    def columns(cls):
+        """(name, lookup, relation, convert, missing) for each field, built once per class."""
+        if '_columns' not in cls.__dict__:
+            cls._columns = [cls.build_column(name, field) for name, field in cls.Meta.serializer().fields.items()
+                            if not field.write_only]
+        return cls._columns
+
+    @classmethod
+    def build_column(cls, name, field):
+        if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+            raise ImproperlyConfigured(f"{cls.__name__} cannot read field '{name}' from .values() rows")
+        if isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField):
+            raise ImproperlyConfigured(f"{cls.__name__} only supports primary key relations ('{name}')")
+
+        attrs = field.source_attrs
+        # The foreign key a dotted source is read through: when it is null
+        # the model serializer treats the attribute as missing
+        relation = '__'.join(attrs[:-1]) or None
+        if isinstance(field, serializers.ReadOnlyField) or (
+            isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None
+        ):
+            convert = None
+        else:
+            convert = next(
+                (builtin for field_class, builtin in FAST_CONVERTERS if isinstance(field, field_class)),
+                field.to_representation
+            )
+
+        if field.default is not empty:
+            missing = field.get_default()
+        elif field.allow_null:
+            missing = None
+        else:
+            missing = _SKIP
+        return name, '__'.join(attrs), relation, convert, missing
+
+    @cached_property
+    def fields(self):
+        # Lets OrderingFilter and schema generation treat this like the model serializer
+        return self.Meta.serializer(context=self._context).fields
+
+    def to_representation(self, row):
+        ret = {}
+        for name, lookup, relation, convert, missing in self.columns():
+            if relation is not None and row[relation] is None:
+                if missing is not _SKIP:
+                    ret[name] = missing
+                continue
+            value = row[lookup]
+            ret[name] = value if convert is None or value is None else convert(value)
+        return ret
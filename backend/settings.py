@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -32,13 +33,25 @@ ALLOWED_HOSTS = ['apitest144.pythonanywhere.com']
 # settings.py
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'backend.eager_loading.EagerLoadingFilter',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'backend.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Upper bound for the ?page_size= query parameter on list endpoints
+MAX_PAGE_SIZE = 500
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=2),  # Changed to 1 hour
@@ -48,10 +61,22 @@ SIMPLE_JWT = {
     'UPDATE_LAST_LOGIN': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'ALGORITHM': 'RS256',  # Changed from HS256
-    'SIGNING_KEY': open('/home/apitest144/backend/private.pem').read(),
-    'VERIFYING_KEY': open('/home/apitest144/backend/public.pem').read(),
+    # Keys are served by accounts.keys.key_store, which reloads them on change
 }
 
+JWT_SIGNING_KEY_PATH = '/home/apitest144/backend/private.pem'
+JWT_VERIFYING_KEY_PATH = '/home/apitest144/backend/public.pem'
+
+# Thread pool for password checks and token signing on the async login
+# path, and how many logins may queue for it before getting a 503
+LOGIN_POOL_WORKERS = 4
+LOGIN_POOL_MAX_PENDING = 200
+
+# Thread pool running the independent queries of the async dashboards
+# side by side; each worker keeps its own database connection
+DASHBOARD_POOL_WORKERS = 8
+DASHBOARD_POOL_MAX_PENDING = 200
+
 
 # Application definition
 
@@ -73,12 +98,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -106,13 +133,73 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite set up for concurrent requests: WAL lets reads run alongside the
+# single writer, IMMEDIATE transactions take the write lock up front and
+# backend.sqlite queues a process's write transactions instead of letting
+# them poll for the lock. `timeout` (seconds) bounds both waits.
+# WAL is a property of the database file, switched on once per database
+# with `manage.py enable_wal`; backend.sqlite relaxes `synchronous` on
+# WAL databases only.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA temp_store=MEMORY'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'backend.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        # Persistent connections: skips reconnecting and re-running the
+        # PRAGMAs on every request
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Per-teacher sharding (accounts/sharding.py), off while SHARDS is empty.
+# To enable it, add a database per shard and list the aliases, e.g.
+#     DATABASES['shard_1'] = {**DATABASES['default'], 'NAME': BASE_DIR / 'shard_1.sqlite3'}
+#     SHARDS = ['shard_1', 'shard_2']
+# then run `manage.py migrate_shards` (also for later migrations). Keep
+# the order of SHARDS stable: each shard's id range is derived from its
+# position. While sharding is enabled, admin endpoints over students,
+# assistants and centers answer 403 (see the module's limitations).
+SHARDS = []
+
+DATABASE_ROUTERS = ['accounts.sharding.ShardRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Quiz autosave buffer; must be shared by all worker processes
+    'autosave': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('AUTOSAVE_CACHE_DIR', BASE_DIR / 'cache' / 'autosave'),
+    },
+    # Access token revocation markers (accounts.authentication); must be
+    # shared by all worker processes
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TOKEN_CACHE_DIR', BASE_DIR / 'cache' / 'tokens'),
+    },
+    # Quiz analytics (quizzes.analytics); must be shared by all worker
+    # processes so that a new submission invalidates them everywhere
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('ANALYTICS_CACHE_DIR', BASE_DIR / 'cache' / 'analytics'),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
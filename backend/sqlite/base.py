@@ -0,0 +1,77 @@
+"""
+SQLite backend with in-process write serialization.
+
+SQLite admits one writer per database file. With `transaction_mode`
+IMMEDIATE every `atomic()` block takes the write lock at BEGIN, so a
+transaction can no longer fail half way through when it upgrades from
+reading to writing. Threads of one process would still compete for that
+lock through SQLite's busy handler, which sleeps and polls; this backend
+queues them on a per-file `threading.Lock` instead, held from BEGIN to
+COMMIT/ROLLBACK. Waiting longer than the connection's `timeout` raises
+the same "database is locked" error SQLite would.
+
+Single statements run in autocommit mode don't take the lock; the busy
+timeout covers them and writers in other processes.
+
+On databases in WAL mode (`manage.py enable_wal`) connections use
+`synchronous=NORMAL`: a commit no longer waits for an fsync, and a power
+loss can only drop the last transactions, not corrupt the file. Rollback
+journal databases keep SQLite's default, which they need for that.
+"""
+import threading
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def write_lock(name):
+    with _locks_guard:
+        return _locks.setdefault(str(name), threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _holds_write_lock = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        lock = write_lock(self.settings_dict['NAME'])
+        timeout = self.settings_dict['OPTIONS'].get('timeout', 5)
+        if not lock.acquire(timeout=timeout):
+            raise OperationalError("database is locked")
+        self._holds_write_lock = True
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            write_lock(self.settings_dict['NAME']).release()
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
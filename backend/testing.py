@@ -0,0 +1,189 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+class QueryCountAssertionsMixin:
+    """
+    TestCase mixin for catching N+1 regressions.
+
+        def test_list_queries(self):
+            self.assertConstantQueries(
+                lambda: self.client.get(reverse('attendance-list')),
+                lambda: AttendanceFactory.create_batch(20),
+            )
+    """
+
+    def assertConstantQueries(self, make_request, add_rows):
+        """
+        Call `make_request`, grow the data set with `add_rows` and call it
+        again, failing if the second call issued more SQL queries.
+        """
+        with CaptureQueriesContext(connection) as before:
+            make_request()
+        add_rows()
+        with CaptureQueriesContext(connection) as after:
+            make_request()
+
+        self.assertEqual(
+            len(before), len(after),
+            "Query count grew with the number of rows (%d -> %d):\n%s" % (
+                len(before), len(after),
+                '\n'.join(query['sql'] for query in after.captured_queries)
+            )
+        )
+
+
+class APIClientMixin:
+    """Clients for the test's users; every user's password is PASSWORD."""
+    PASSWORD = 'pw12345!x'
+
+    def client_for(self, user):
+        """A client authenticated as `user` without a token."""
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def login(self, username):
+        """A client carrying an access token from the login endpoint, and the token response."""
+        client = APIClient()
+        response = client.post('/api/accounts/login/', {'username': username, 'password': self.PASSWORD}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        return client, response.json()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TenantTestCase(APIClientMixin, TestCase):
+    """
+    TestCase with two teachers, an assistant, students and an admin.
+
+    Teacher `t1` owns center `C1`, assistant `a1` and students `s0`-`s4`;
+    teacher `t2` owns center `C2` and student `x0`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from accounts.models import User, AssistantProfile, Center, Grade
+
+        cls.grade = Grade.objects.create(name='Grade 1')
+        cls.teacher = cls.create_teacher('t1')
+        cls.teacher2 = cls.create_teacher('t2')
+        cls.center = Center.objects.create(name='C1', teacher=cls.teacher)
+        cls.center2 = Center.objects.create(name='C2', teacher=cls.teacher2)
+        cls.assistant = AssistantProfile.objects.create(
+            user=User.objects.create_user('a1', password=cls.PASSWORD, role='assistant'),
+            teacher=cls.teacher, full_name='Assistant One', phone_number='0100000003', gender='male'
+        )
+        cls.students = [cls.create_student(f's{i}', cls.teacher, cls.center, f'Student {i}') for i in range(5)]
+        cls.other_student = cls.create_student('x0', cls.teacher2, cls.center2, 'Other Student')
+        cls.admin = User.objects.create_user('adm', password=cls.PASSWORD, role='admin')
+
+    def setUp(self):
+        # Rolled back rows leave their ids free, so cached entries keyed on
+        # them would leak into the next test
+        for cache in caches.all():
+            cache.clear()
+
+    @classmethod
+    def create_teacher(cls, username):
+        from accounts.models import User, TeacherProfile
+
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(username, password=cls.PASSWORD, role='teacher'),
+            full_name=f'Teacher {username}', phone_number='0100000001', gender='male'
+        )
+        teacher.grades.add(cls.grade)
+        return teacher
+
+    @classmethod
+    def create_student(cls, username, teacher, center, full_name, **fields):
+        from accounts.models import User, StudentProfile
+
+        return StudentProfile.objects.create(
+            user=User.objects.create_user(username, password=cls.PASSWORD, role='student'),
+            teacher=teacher, full_name=full_name, phone_number=fields.pop('phone_number', '0100000002'),
+            parent_number='0110000002', gender='male', grade=cls.grade, center=center, **fields
+        )
+
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'autosave': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'autosave'},
+    'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens'},
+    'analytics': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'analytics'},
+}
+
+SHARDS = ['shard_1', 'shard_2']
+
+
+@override_settings(
+    SHARDS=SHARDS, CACHES=LOCAL_CACHES,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ShardedTestCase(APIClientMixin, TransactionTestCase):
+    """The catalog plus two shard databases, set up by migrate_shards."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Scratch files the test runner knows nothing about, so they are
+        # registered, and allowed, only from here on
+        cls.workdir = Path(tempfile.mkdtemp())
+        for alias in SHARDS:
+            connections.settings[alias] = connections.configure_settings({
+                'default': connections.settings['default'],
+                alias: {
+                    'ENGINE': 'backend.sqlite', 'NAME': cls.workdir / f'{alias}.sqlite3',
+                    'OPTIONS': settings.SQLITE_OPTIONS,
+                },
+            })[alias]
+        cls.databases = {*cls.databases, *SHARDS}
+        call_command('migrate_shards', verbosity=0, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        shutil.rmtree(cls.workdir)
+
+    def setUp(self):
+        from accounts.models import Grade
+
+        for cache in caches.all():
+            cache.clear()
+        self.grade = Grade.objects.create(name='Grade 1')
+
+    def create_teacher(self, username):
+        from accounts.models import User, TeacherProfile
+
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(username, password=self.PASSWORD, role='teacher'),
+            full_name=f'Teacher {username}', phone_number='0100000001', gender='male'
+        )
+        teacher.grades.add(self.grade)
+        return teacher
+
+    def create_student(self, username, teacher, full_name='Student', **fields):
+        from accounts.models import User, StudentProfile, Center
+        from accounts.sharding import use_shard
+
+        with use_shard(teacher.user.shard):
+            center = Center.objects.get_or_create(teacher=teacher, name='Main')[0]
+            return StudentProfile.objects.create(
+                user=User.objects.create_user(username, password=self.PASSWORD, role='student'),
+                teacher=teacher, full_name=full_name, phone_number='0100000002', parent_number='0110000002',
+                gender='male', grade=self.grade, center=center, **fields
+            )
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from .concurrency import BoundedPool, pools
+from .metrics import registry
+from .renderers import FastJSONRenderer
+from .testing import TenantTestCase
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_same_bytes_as_json_renderer(self):
+        for data in [
+            {'id': 1, 'name': 'Ünïcode   line', 'score': 12.5, 'missing': None},
+            [{'tiny': 0.00001, 'huge': 1e16, 'negative': -0.00002}, 1e-7],
+            {'when': datetime(2026, 1, 2, 3, 4, 5, 678000), 'price': Decimal('9.90'), 'big': 2 ** 70},
+        ]:
+            with self.subTest(data=data):
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_raise(self):
+        for value in [float('nan'), float('inf'), -float('inf')]:
+            data = {'results': [{'score': 1.0}, {'score': value, 'note': None}]}
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render(data)
+
+
+class BoundedPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = BoundedPool('test', workers=1, max_pending=10)
+        self.addCleanup(pools.pop, 'test')
+        self.addCleanup(self.pool._executor.shutdown)
+
+    def test_shared_across_event_loops(self):
+        # Like WSGI workers, each thread runs its async code on its own loop
+        running, most = [0], [0]
+        lock = threading.Lock()
+
+        def work(i):
+            with lock:
+                running[0] += 1
+                most[0] = max(most[0], running[0])
+            threading.Event().wait(0.01)
+            with lock:
+                running[0] -= 1
+            return i
+
+        async def calls():
+            return await asyncio.gather(*(self.pool.run(work, i) for i in range(4)))
+
+        results = {}
+        threads = [
+            threading.Thread(target=lambda name=name: results.setdefault(name, asyncio.run(calls())), daemon=True)
+            for name in ('first', 'second')
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive(), "A caller never got a pool slot")
+
+        self.assertEqual(results, {'first': [0, 1, 2, 3], 'second': [0, 1, 2, 3]})
+        self.assertEqual(most[0], 1)
+        snapshot = self.pool.snapshot()
+        self.assertEqual((snapshot['waiting'], snapshot['in_flight']), (0, 0))
+        self.assertEqual(snapshot['run_seconds']['count'], 8)
+
+    def test_cancelled_callers_leave_the_queue(self):
+        release = threading.Event()
+
+        async def cancel_queued():
+            busy = asyncio.ensure_future(self.pool.run(release.wait))
+            queued = asyncio.ensure_future(self.pool.run(lambda: 'queued'))
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.pool.waiting, 1)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            self.assertEqual(self.pool.waiting, 0)
+            release.set()
+            return await busy
+
+        self.assertTrue(asyncio.run(cancel_queued()))
+        self.assertEqual(self.pool.run_time.count, 1)
+
+
+class MetricsTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_requests_are_recorded_per_endpoint(self):
+        client, _ = self.login('t1')
+        for _ in range(2):
+            client.get('/api/attendance/list/')
+        client.get('/no-such-page/')
+
+        admin = self.client_for(self.admin)
+        stats = {(entry['endpoint'], entry['method']): entry for entry in admin.get('/api/metrics/').json()}
+        listing = stats['attendance-list', 'GET']
+        self.assertEqual(listing['latency_seconds']['count'], 2)
+        self.assertGreater(listing['db_queries']['sum'], 0)
+        self.assertEqual(listing['response_bytes']['count'], 2)
+        self.assertIn(('unresolved', 'GET'), stats)
+
+        response = admin.get('/api/metrics/?format=prometheus')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            'http_request_duration_seconds_count{endpoint="attendance-list",method="GET"} 2',
+            response.content.decode()
+        )
+
+    def test_admin_only_and_resettable(self):
+        client, _ = self.login('t1')
+        self.assertEqual(client.get('/api/metrics/').status_code, 403)
+
+        admin = self.client_for(self.admin)
+        self.assertEqual(admin.delete('/api/metrics/').status_code, 204)
+        self.assertEqual([entry['endpoint'] for entry in admin.get('/api/metrics/').json()], ['metrics'])
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path , include
+from .views import MetricsView, PoolMetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -24,6 +25,8 @@ urlpatterns = [
     path('api/test-scores/', include('test_scores.urls')),  # testscores app API
     path('api/studymaterials/', include('studymaterials.urls')), # studymaterials app API
     path('api/onlinequiz', include('quizzes.urls')),  # Include the quiz app URLs
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),  # Per-endpoint request stats (admin only)
+    path('api/metrics/pools/', PoolMetricsView.as_view(), name='metrics-pools'),  # Worker pool stats (admin only)
 
 
 ]
@@ -0,0 +1,45 @@
+from rest_framework import status
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdmin
+from .concurrency import pools_prometheus_text, pools_snapshot
+from .metrics import prometheus_text, registry
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        view = (renderer_context or {}).get('view')
+        if isinstance(data, list) and view is not None:
+            return view.prometheus_text(data)
+        # Error payloads (e.g. permission denied) are not metric snapshots
+        return str(data)
+
+
+class MetricsView(APIView):
+    """Per-endpoint request stats; `?format=prometheus` for the text export."""
+    permission_classes = [IsAdmin]
+    renderer_classes = [JSONRenderer, PrometheusRenderer]
+    prometheus_text = staticmethod(prometheus_text)
+
+    def get(self, request):
+        return Response(registry.snapshot())
+
+    def delete(self, request):
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class PoolMetricsView(APIView):
+    """Queue depth and timings of the bounded worker pools."""
+    permission_classes = [IsAdmin]
+    renderer_classes = [JSONRenderer, PrometheusRenderer]
+    prometheus_text = staticmethod(pools_prometheus_text)
+
+    def get(self, request):
+        return Response(pools_snapshot())
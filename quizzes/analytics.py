@@ -0,0 +1,123 @@
+"""Per-question item analysis for a quiz.
+
+Everything is derived from a handful of grouped aggregates; the
+point-biserial index is computed from per-question sums, so no
+per-submission data is ever loaded into Python.
+"""
+import math
+
+from django.core.cache import caches
+from django.db.models import Avg, Count, F, Prefetch, Q, Sum
+
+from .models import Question, Choice, QuizSubmission, Answer
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache():
+    # Shared by all worker processes, so that `invalidate` reaches them all
+    return caches['analytics']
+
+
+def _cache_key(quiz_id):
+    return f'quiz-analytics:{quiz_id}'
+
+
+def invalidate(quiz_id):
+    _cache().delete(_cache_key(quiz_id))
+
+
+def point_biserial(n, n_correct, correct_score_sum, total_score_sum, stddev):
+    """Point-biserial correlation between answering correctly and the total score.
+
+    Computed as ``(M1 - M0) / s * sqrt(p * q)`` where M1/M0 are the mean
+    scores of students who got the question right/wrong and ``s`` is the
+    population standard deviation of all scores.
+    """
+    n_wrong = n - n_correct
+    if not n_correct or not n_wrong or not stddev:
+        return None
+    mean_correct = correct_score_sum / n_correct
+    mean_wrong = (total_score_sum - correct_score_sum) / n_wrong
+    p = n_correct / n
+    return (mean_correct - mean_wrong) / stddev * math.sqrt(p * (1 - p))
+
+
+def quiz_analytics(quiz):
+    cached = _cache().get(_cache_key(quiz.pk))
+    if cached is not None and cached['version'] == quiz.version:
+        return cached['data']
+
+    data = _compute(quiz)
+    _cache().set(_cache_key(quiz.pk), {'version': quiz.version, 'data': data}, CACHE_TIMEOUT)
+    return data
+
+
+def _compute(quiz):
+    completed = QuizSubmission.objects.filter(quiz=quiz, is_completed=True)
+    totals = completed.aggregate(
+        n=Count('id'),
+        score_sum=Sum('score'),
+        mean=Avg('score'),
+        mean_sq=Avg(F('score') * F('score'))
+    )
+    n = totals['n']
+    score_sum = totals['score_sum'] or 0
+    mean = totals['mean'] or 0
+    # Population variance from the first two moments
+    stddev = math.sqrt(max((totals['mean_sq'] or 0) - mean * mean, 0))
+
+    per_question = {
+        row['question']: row
+        for row in Answer.objects.filter(
+            submission__quiz=quiz, submission__is_completed=True
+        ).values('question').annotate(
+            answered=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+            correct_score_sum=Sum('submission__score', filter=Q(is_correct=True))
+        ).order_by()
+    }
+
+    Through = Answer.selected_choices.through
+    selections = dict(
+        Through.objects.filter(
+            answer__submission__quiz=quiz, answer__submission__is_completed=True
+        ).values('choice').annotate(n=Count('id')).order_by().values_list('choice', 'n')
+    )
+
+    questions = []
+    for question in Question.objects.filter(quiz=quiz).order_by('order', 'id').prefetch_related(
+        Prefetch('choices', queryset=Choice.objects.order_by('order', 'id'))
+    ):
+        row = per_question.get(question.pk, {})
+        correct = row.get('correct', 0)
+        questions.append({
+            'id': question.pk,
+            'text': question.text,
+            'order': question.order,
+            'marks': question.marks,
+            'answered': row.get('answered', 0),
+            'correct': correct,
+            # Unanswered questions count as wrong
+            'correct_rate': correct / n if n else None,
+            'discrimination': point_biserial(
+                n, correct, row.get('correct_score_sum') or 0, score_sum, stddev
+            ),
+            'choices': [
+                {
+                    'id': choice.pk,
+                    'text': choice.text,
+                    'is_correct': choice.is_correct,
+                    'selected': selections.get(choice.pk, 0),
+                }
+                for choice in question.choices.all()
+            ],
+        })
+
+    return {
+        'quiz': quiz.pk,
+        'submissions': n,
+        'mean_score': mean if n else None,
+        'stddev': stddev if n else None,
+        'questions': questions,
+    }
@@ -0,0 +1,124 @@
+"""Write-behind buffer for in-progress quiz answers.
+
+Autosaves only touch the ``autosave`` cache. Every ``FLUSH_INTERVAL``
+seconds one request per database (or the ``flush_autosaves`` command)
+writes all of that database's changed buffers to ``Answer`` rows in a
+single transaction, so many students autosaving at once cost one SQLite
+write instead of one each.
+"""
+import uuid
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import QuizSubmission, Answer
+
+FLUSH_INTERVAL = 10
+# Upper bound on how long an attempt can stay open
+BUFFER_TIMEOUT = 24 * 60 * 60
+
+FLUSH_LOCK_KEY = 'quiz-autosave:flush-lock:{}'
+
+
+def _cache():
+    return caches['autosave']
+
+
+def _buffer_key(submission):
+    # Includes the start time so a recycled primary key never picks up
+    # another attempt's answers
+    return f'quiz-autosave:{submission.pk}:{submission.started_at.timestamp()}'
+
+
+def _flushed_key(submission):
+    return f'{_buffer_key(submission)}:flushed'
+
+
+def buffer_answers(submission, answers):
+    """Merge ``(question_id, choice_ids)`` pairs into the submission's buffer."""
+    cache = _cache()
+    key = _buffer_key(submission)
+    buffered = cache.get(key) or {'answers': {}}
+    buffered['answers'].update(
+        (question_id, sorted(choice_ids)) for question_id, choice_ids in answers
+    )
+    buffered['rev'] = uuid.uuid4().hex
+    cache.set(key, buffered, BUFFER_TIMEOUT)
+
+    # A flush only covers the submission's own database, so each database
+    # gets its own lock
+    using = submission._state.db or router.db_for_write(QuizSubmission)
+    if cache.add(FLUSH_LOCK_KEY.format(using), True, FLUSH_INTERVAL):
+        flush(using)
+
+
+def saved_answers(submission):
+    """Latest saved progress as a list of ``{'question', 'choices'}`` dicts."""
+    if submission.started_at is not None:
+        buffered = _cache().get(_buffer_key(submission))
+        if buffered is not None:
+            return [
+                {'question': question_id, 'choices': choice_ids}
+                for question_id, choice_ids in buffered['answers'].items()
+            ]
+
+    return [
+        {'question': answer.question_id,
+         'choices': [choice.pk for choice in answer.selected_choices.all()]}
+        for answer in submission.answers.prefetch_related('selected_choices')
+    ]
+
+
+def discard(submission):
+    if submission.started_at is not None:
+        _cache().delete_many([_buffer_key(submission), _flushed_key(submission)])
+
+
+def flush(using=None):
+    """
+    Write every changed buffer of the submissions on database ``using``
+    (the router's choice by default) to ``Answer`` rows. Returns the
+    number flushed.
+    """
+    cache = _cache()
+    using = using or router.db_for_write(QuizSubmission)
+    open_submissions = list(QuizSubmission.objects.using(using).filter(
+        is_completed=False,
+        started_at__gte=timezone.now() - timedelta(seconds=BUFFER_TIMEOUT)
+    ).only('id', 'started_at'))
+    if not open_submissions:
+        return 0
+
+    keys = {}
+    for submission in open_submissions:
+        keys[submission.pk] = (_buffer_key(submission), _flushed_key(submission))
+    cached = cache.get_many([key for pair in keys.values() for key in pair])
+
+    dirty = {}
+    for submission_id, (buffer_key, flushed_key) in keys.items():
+        buffered = cached.get(buffer_key)
+        if buffered is not None and buffered['rev'] != cached.get(flushed_key):
+            dirty[submission_id] = buffered
+    if not dirty:
+        return 0
+
+    with transaction.atomic(using=using):
+        # Skip anything submitted since the lookup above; the graded
+        # answers must not be overwritten
+        still_open = set(QuizSubmission.objects.using(using).filter(
+            pk__in=dirty, is_completed=False
+        ).values_list('pk', flat=True))
+        Answer.objects.using(using).filter(submission_id__in=still_open).delete()
+        Answer.objects.db_manager(using).create_with_choices([
+            (Answer(submission_id=submission_id, question_id=question_id), choice_ids)
+            for submission_id in still_open
+            for question_id, choice_ids in dirty[submission_id]['answers'].items()
+        ])
+
+    cache.set_many(
+        {keys[submission_id][1]: dirty[submission_id]['rev'] for submission_id in still_open},
+        BUFFER_TIMEOUT
+    )
+    return len(still_open)
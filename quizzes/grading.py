@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import analytics, autosave
+from .models import Choice, QuizSubmission, Answer
+
+ANSWER_KEY_TIMEOUT = 60 * 60
+
+
+@dataclass(frozen=True)
+class KeyEntry:
+    marks: int
+    correct: frozenset
+    choices: frozenset
+
+
+def answer_key(quiz):
+    """Map question id -> KeyEntry for ``quiz``.
+
+    Built from a single query and cached per quiz version, so edits to
+    questions or choices are picked up without explicit invalidation.
+    """
+    cache_key = f'quiz-answer-key:{quiz.pk}:{quiz.version}'
+    key = cache.get(cache_key)
+    if key is not None:
+        return key
+
+    rows = {}
+    for question_id, marks, choice_id, is_correct in Choice.objects.filter(
+        question__quiz=quiz
+    ).values_list('question_id', 'question__marks', 'id', 'is_correct'):
+        entry = rows.setdefault(question_id, (marks, set(), set()))
+        entry[2].add(choice_id)
+        if is_correct:
+            entry[1].add(choice_id)
+
+    key = {
+        question_id: KeyEntry(marks, frozenset(correct), frozenset(choices))
+        for question_id, (marks, correct, choices) in rows.items()
+    }
+    cache.set(cache_key, key, ANSWER_KEY_TIMEOUT)
+    return key
+
+
+def clean_answers(key, answers):
+    """Validate ``answers`` against the answer key.
+
+    ``answers`` is a list of ``{'question': id, 'choices': [ids]}``.
+    Returns ``(question_id, frozenset(choice_ids))`` pairs and raises
+    ValidationError for anything that does not belong to the quiz.
+    """
+    cleaned = []
+    seen = set()
+    for answer in answers:
+        question_id = answer['question']
+        selected = frozenset(answer['choices'])
+        entry = key.get(question_id)
+        if entry is None:
+            raise ValidationError(f"Question {question_id} is not part of this quiz.")
+        if question_id in seen:
+            raise ValidationError(f"Question {question_id} answered more than once.")
+        if not selected <= entry.choices:
+            raise ValidationError(f"Invalid choice for question {question_id}.")
+        seen.add(question_id)
+        cleaned.append((question_id, selected))
+    return cleaned
+
+
+def start_attempt(quiz, student):
+    """The student's submission for ``quiz``, with its time limit running.
+
+    The first call starts the clock; later calls return the running
+    attempt unchanged. Returns ``(submission, created)``.
+    """
+    submission, created = QuizSubmission.objects.get_or_create(
+        quiz=quiz, student=student, defaults={'started_at': timezone.now()}
+    )
+    if submission.started_at is None and not submission.is_completed:
+        # Conditional update so that concurrent starts share one clock
+        QuizSubmission.objects.filter(pk=submission.pk, started_at__isnull=True).update(started_at=timezone.now())
+        submission.refresh_from_db(fields=['started_at'])
+    submission.quiz = quiz
+    return submission, created
+
+
+def grade_submission(quiz, student, answers=None):
+    """Grade ``answers`` and record them as the student's final submission.
+
+    When ``answers`` is None the student's autosaved progress is graded.
+    A question scores its full marks only when the selected choices
+    match the correct ones exactly. Raises ValidationError for answers
+    that do not belong to the quiz, when the quiz was already submitted,
+    when the attempt was never started (see ``start_attempt``) or when
+    its time limit has passed.
+    """
+    key = answer_key(quiz)
+    now = timezone.now()
+
+    with transaction.atomic(using=router.db_for_write(QuizSubmission)):
+        submission, created = QuizSubmission.objects.get_or_create(quiz=quiz, student=student)
+        submission.quiz = quiz
+        if submission.is_completed:
+            raise ValidationError("Quiz already submitted.")
+        if submission.started_at is None:
+            raise ValidationError("Quiz not started.")
+        if submission.is_expired(now):
+            raise ValidationError("Time limit exceeded.")
+
+        if answers is None:
+            answers = [] if created else autosave.saved_answers(submission)
+
+        graded = []
+        for question_id, selected in clean_answers(key, answers):
+            entry = key[question_id]
+            is_correct = bool(selected) and selected == entry.correct
+            graded.append((
+                Answer(
+                    submission=submission,
+                    question_id=question_id,
+                    is_correct=is_correct,
+                    marks_obtained=entry.marks if is_correct else 0
+                ),
+                selected
+            ))
+        score = sum(answer.marks_obtained for answer, _ in graded)
+
+        # Conditional update so that two concurrent submits cannot both win
+        if not QuizSubmission.objects.filter(pk=submission.pk, is_completed=False).update(
+            is_completed=True, score=score, submitted_at=now
+        ):
+            raise ValidationError("Quiz already submitted.")
+
+        if not created:
+            submission.answers.all().delete()
+        Answer.objects.create_with_choices(graded)
+        transaction.on_commit(lambda: analytics.invalidate(quiz.pk))
+
+    autosave.discard(submission)
+    submission.is_completed = True
+    submission.score = score
+    submission.submitted_at = now
+    return submission
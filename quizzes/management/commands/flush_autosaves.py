@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.sharding import all_databases
+from quizzes import autosave
+
+
+class Command(BaseCommand):
+    help = "Write buffered quiz autosaves to the database."
+
+    def handle(self, *args, **options):
+        flushed = 0
+        for alias in all_databases():
+            flushed += autosave.flush(alias)
+        self.stdout.write(f"Flushed {flushed} submission(s).")
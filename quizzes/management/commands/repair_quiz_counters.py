@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Recompute Quiz.total_marks and Quiz.question_count where they have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report quizzes whose counters are out of sync."
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stale = Quiz.objects.out_of_sync().count()
+            self.stdout.write(f"{stale} quiz(zes) out of sync.")
+            return
+
+        fixed = Quiz.objects.repair_counters()
+        self.stdout.write(f"Repaired {fixed} quiz(zes).")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 06:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def compute_quiz_counters(apps, schema_editor):
+    Quiz = apps.get_model('quizzes', 'Quiz')
+    Question = apps.get_model('quizzes', 'Question')
+    questions = Question.objects.filter(quiz=OuterRef('pk')).order_by().values('quiz')
+    Quiz.objects.update(
+        question_count=Coalesce(Subquery(questions.annotate(n=Count('id')).values('n')), Value(0)),
+        total_marks=Coalesce(Subquery(questions.annotate(n=Sum('marks')).values('n')), Value(0)),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quizsubmission_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='quiz',
+            name='total_marks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_quiz_counters, migrations.RunPython.noop),
+    ]
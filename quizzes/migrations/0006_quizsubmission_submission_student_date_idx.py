@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_teacherprofile_grades'),
+        ('quizzes', '0005_quiz_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizsubmission',
+            index=models.Index(fields=['student', 'submitted_at'], name='submission_student_date_idx'),
+        ),
+    ]
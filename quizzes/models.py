@@ -1,7 +1,39 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 from accounts.models import TeacherProfile, StudentProfile , Grade
+from accounts.tenancy import TenantQuerySet
+
+class QuizQuerySet(TenantQuerySet):
+    def with_actual_counters(self):
+        """Annotate the counters as computed from the questions."""
+        questions = Question.objects.filter(quiz=OuterRef('pk')).order_by().values('quiz')
+        return self.annotate(
+            actual_question_count=Coalesce(
+                Subquery(questions.annotate(n=Count('id')).values('n')), Value(0)
+            ),
+            actual_total_marks=Coalesce(
+                Subquery(questions.annotate(n=Sum('marks')).values('n')), Value(0)
+            ),
+        )
+
+    def out_of_sync(self):
+        return self.with_actual_counters().exclude(
+            question_count=F('actual_question_count'),
+            total_marks=F('actual_total_marks')
+        )
+
+    def repair_counters(self):
+        """Recompute the counters of every quiz out of sync. Returns the number fixed."""
+        fixed = list(self.out_of_sync())
+        for quiz in fixed:
+            quiz.question_count = quiz.actual_question_count
+            quiz.total_marks = quiz.actual_total_marks
+        Quiz.objects.bulk_update(fixed, ['question_count', 'total_marks'], batch_size=500)
+        return len(fixed)
 
 # Quiz Model
 class Quiz(models.Model):
@@ -11,12 +43,32 @@ class Quiz(models.Model):
     created_by = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     is_published = models.BooleanField(default=False)
-    total_marks = models.PositiveIntegerField(default=0)
+    # Denormalized from the questions (see quizzes.signals)
+    total_marks = models.PositiveIntegerField(default=0, editable=False)
+    question_count = models.PositiveIntegerField(default=0, editable=False)
     grade = models.ForeignKey(Grade, on_delete=models.CASCADE)  # Add this line
+    # Bumped whenever the quiz, its questions or its choices change; keys
+    # the cached student payload (see quizzes.signals)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = QuizQuerySet.as_manager()
+    TENANT_FIELD = 'created_by'
+
+    # Only ever changed through F() updates, so a save() of a stale
+    # instance must not write them back
+    COUNTER_FIELDS = ('version', 'total_marks', 'question_count')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_user_submission(self, student):
         try:
             return self.submissions.get(student=student)
@@ -32,12 +84,31 @@ class Question(models.Model):
     marks = models.PositiveIntegerField(default=1)
     order = models.PositiveIntegerField(default=0)
 
+    objects = TenantQuerySet.as_manager()
+    TENANT_FIELD = 'quiz__created_by'
+
     class Meta:
         ordering = ['order']
 
     def __str__(self):
         return f"{self.quiz.title} - Q{self.order}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_counted()
+        return instance
+
+    def remember_counted(self):
+        # What the quiz counters currently include for this question
+        self._counted = (self.__dict__.get('quiz_id'), self.__dict__.get('marks'))
+
+    def save(self, *args, **kwargs):
+        # Keeps the row and the quiz counters (updated by signals) in step
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
 # Choice Model
 class Choice(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='choices')
@@ -45,6 +116,9 @@ class Choice(models.Model):
     is_correct = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
 
+    objects = TenantQuerySet.as_manager()
+    TENANT_FIELD = 'question__quiz__created_by'
+
     class Meta:
         ordering = ['order']
 
@@ -56,15 +130,52 @@ class QuizSubmission(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Set when the student starts the attempt or is first served the quiz;
+    # only older submissions made without one are null
+    started_at = models.DateTimeField(null=True, blank=True)
     score = models.FloatField(default=0)
     is_completed = models.BooleanField(default=False)
 
+    objects = TenantQuerySet.as_manager()
+    TENANT_FIELD = 'quiz__created_by'
+
+    # Allowance for network latency on the final submit
+    SUBMIT_GRACE = timedelta(seconds=30)
+
     class Meta:
         unique_together = ('quiz', 'student')
+        indexes = [
+            models.Index(fields=['student', 'submitted_at'], name='submission_student_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.user.username} - {self.quiz.title}"
 
+    @property
+    def deadline(self):
+        if self.started_at is None:
+            return None
+        return self.started_at + timedelta(minutes=self.quiz.time_limit_minutes)
+
+    def is_expired(self, now=None):
+        deadline = self.deadline
+        if deadline is None:
+            return False
+        return (now or timezone.now()) > deadline + self.SUBMIT_GRACE
+
+class AnswerQuerySet(models.QuerySet):
+    def create_with_choices(self, rows):
+        """Bulk insert ``(answer, choice_ids)`` pairs along with their selected choices."""
+        answers = self.bulk_create([answer for answer, _ in rows])
+        Through = Answer.selected_choices.through
+        # Same database as the answers (bulk_create made this a write queryset)
+        Through.objects.using(self.db).bulk_create([
+            Through(answer_id=answer.pk, choice_id=choice_id)
+            for answer, (_, choice_ids) in zip(answers, rows)
+            for choice_id in choice_ids
+        ])
+        return answers
+
 # Answer Model
 class Answer(models.Model):
     submission = models.ForeignKey(QuizSubmission, on_delete=models.CASCADE, related_name='answers')
@@ -73,5 +184,8 @@ class Answer(models.Model):
     is_correct = models.BooleanField(default=False)
     marks_obtained = models.FloatField(default=0)
 
+    objects = AnswerQuerySet.as_manager()
+    TENANT_FIELD = 'submission__quiz__created_by'
+
     def __str__(self):
         return f"Answer to {self.question.text[:50]}"
@@ -1,4 +1,6 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from backend.eager_loading import EagerLoadingMixin
 from .models import Quiz, Question, Choice, QuizSubmission, Answer
 from accounts.models import StudentProfile, TeacherProfile
 
@@ -6,18 +8,22 @@ from accounts.models import StudentProfile, TeacherProfile
 class QuizSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'description', 'time_limit_minutes', 'created_by', 'grade', 'created_at', 'is_published', 'total_marks']
+        fields = ['id', 'title', 'description', 'time_limit_minutes', 'created_by', 'grade', 'created_at', 'is_published', 'total_marks', 'question_count']
 # Question Serializer
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = ['id', 'quiz', 'question_type', 'text', 'image', 'marks', 'order']
+        # Set from the URL on create
+        read_only_fields = ['quiz']
 
 # Choice Serializer
 class ChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Choice
         fields = ['id', 'question', 'text', 'is_correct', 'order']
+        # Set from the URL on create
+        read_only_fields = ['question']
 
 # Quiz Submission Serializer
 class QuizSubmissionSerializer(serializers.ModelSerializer):
@@ -35,12 +41,21 @@ class AnswerSerializer(serializers.ModelSerializer):
         model = Answer
         fields = ['id', 'submission', 'question', 'selected_choices', 'is_correct', 'marks_obtained']
 
+# Payload of a student's quiz submission
+class SubmittedAnswerSerializer(serializers.Serializer):
+    question = serializers.IntegerField()
+    choices = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
+class QuizAnswersSerializer(serializers.Serializer):
+    answers = SubmittedAnswerSerializer(many=True, required=False)
+
 # Serializer to handle the specific data return for a student's submission
-class StudentSubmissionSerializer(serializers.ModelSerializer):
+class StudentSubmissionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     answers = AnswerSerializer(many=True, read_only=True)
     class Meta:
         model = QuizSubmission
         fields = ['id', 'quiz', 'student', 'submitted_at', 'score', 'is_completed', 'answers']
+        prefetch_related = ['answers__selected_choices']
 
 # quizzes/serializers.py
 class TeacherChoiceSerializer(serializers.ModelSerializer):
@@ -53,16 +68,30 @@ class StudentChoiceSerializer(serializers.ModelSerializer):
         model = Choice
         fields = ['id', 'text']
 
-class StudentQuestionSerializer(serializers.ModelSerializer):
+class StudentQuestionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     choices = StudentChoiceSerializer(many=True)
     
     class Meta:
         model = Question
         fields = ['id', 'text', 'image', 'choices']
+        prefetch_related = ['choices']
 
-class TeacherQuestionSerializer(serializers.ModelSerializer):
+# Full quiz as served to a student taking it (no correct answers)
+class StudentQuizSerializer(serializers.ModelSerializer):
+    questions = StudentQuestionSerializer(many=True)
+
+    class Meta:
+        model = Quiz
+        fields = ['id', 'title', 'description', 'time_limit_minutes', 'total_marks', 'question_count', 'questions']
+        prefetch_related = [
+            Prefetch('questions', queryset=Question.objects.order_by('order', 'id')),
+            Prefetch('questions__choices', queryset=Choice.objects.order_by('order', 'id')),
+        ]
+
+class TeacherQuestionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     choices = TeacherChoiceSerializer(many=True)
     
     class Meta:
         model = Question
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        prefetch_related = ['choices']
\ No newline at end of file
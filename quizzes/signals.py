@@ -0,0 +1,58 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Quiz, Question, Choice
+
+
+def bump_quiz_version(**filters):
+    Quiz.objects.filter(**filters).update(version=F('version') + 1)
+
+
+def adjust_quiz_counters(quiz_id, questions=0, marks=0):
+    # Clamped so that counters which have drifted (e.g. after a bulk
+    # insert) never block a write; repair_quiz_counters fixes them
+    Quiz.objects.filter(pk=quiz_id).update(
+        question_count=Greatest(F('question_count') + questions, 0),
+        total_marks=Greatest(F('total_marks') + marks, 0),
+        version=F('version') + 1
+    )
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, **kwargs):
+    if not created:
+        bump_quiz_version(pk=instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    old_quiz_id, old_marks = (None, 0) if created else getattr(instance, '_counted', (None, None))
+
+    if old_marks is None:
+        # Saved from a partially loaded instance; counters can't be
+        # adjusted reliably, leave them to repair_quiz_counters
+        bump_quiz_version(pk=instance.quiz_id)
+    elif old_quiz_id == instance.quiz_id:
+        adjust_quiz_counters(instance.quiz_id, marks=instance.marks - old_marks)
+    else:
+        if old_quiz_id is not None:
+            adjust_quiz_counters(old_quiz_id, questions=-1, marks=-old_marks)
+        adjust_quiz_counters(instance.quiz_id, questions=1, marks=instance.marks)
+    instance.remember_counted()
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting the whole quiz needs no bookkeeping
+    if isinstance(origin, Quiz):
+        return
+    adjust_quiz_counters(instance.quiz_id, questions=-1, marks=-instance.marks)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (Quiz, Question)):
+        return
+    bump_quiz_version(questions__id=instance.question_id)
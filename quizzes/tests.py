@@ -1,3 +1,400 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.sharding import use_shard
+from backend import settings as project_settings
+from backend.testing import LOCAL_CACHES, QueryCountAssertionsMixin, ShardedTestCase, TenantTestCase
+
+from . import autosave
+from .models import Quiz, Question, Choice, QuizSubmission, Answer
+
+
+def create_quiz(teacher, grade, questions=2):
+    """A published quiz whose questions each have a correct and a wrong choice."""
+    quiz = Quiz.objects.create(title='Quiz', description='', created_by=teacher, grade=grade, is_published=True)
+    for i in range(questions):
+        question = Question.objects.create(quiz=quiz, text=f'Question {i}', marks=2, order=i)
+        Choice.objects.create(question=question, text='Right', is_correct=True, order=0)
+        Choice.objects.create(question=question, text='Wrong', order=1)
+    return quiz
+
+
+def answer_sheet(quiz, correct=True):
+    return [
+        {'question': question.pk, 'choices': [question.choices.get(is_correct=correct).pk]}
+        for question in quiz.questions.order_by('order')
+    ]
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class GradingTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.teacher, self.grade, questions=3)
+        self.client, _ = self.login('s0')
+        self.start()
+
+    def start(self, client=None):
+        response = (client or self.client).post(reverse('quiz-start', args=[self.quiz.pk]))
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def submit(self, answers, client=None):
+        return (client or self.client).post(reverse('quiz-submit', args=[self.quiz.pk]), {'answers': answers}, format='json')
+
+    def test_full_marks_only_for_the_exact_correct_choices(self):
+        right, wrong = answer_sheet(self.quiz), answer_sheet(self.quiz, correct=False)
+        # Right, wrong, and right plus wrong
+        both = {**right[2], 'choices': right[2]['choices'] + wrong[2]['choices']}
+        response = self.submit([right[0], wrong[1], both])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['score'], 2)
+
+        submission = QuizSubmission.objects.get(pk=response.json()['submission'])
+        self.assertTrue(submission.is_completed)
+        self.assertEqual(
+            sorted(submission.answers.values_list('question__order', 'is_correct', 'marks_obtained')),
+            [(0, True, 2), (1, False, 0), (2, False, 0)]
+        )
+        self.assertEqual(Answer.selected_choices.through.objects.count(), 4)
+
+    def test_quizzes_are_submitted_once(self):
+        self.assertEqual(self.submit(answer_sheet(self.quiz)).status_code, 200)
+        response = self.submit(answer_sheet(self.quiz))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(QuizSubmission.objects.get().score, 6)
+
+    def test_answers_must_belong_to_the_quiz(self):
+        other_quiz = create_quiz(self.teacher, self.grade, questions=1)
+        question = self.quiz.questions.first()
+        for answers in (
+            answer_sheet(other_quiz),
+            [{'question': question.pk, 'choices': [other_quiz.questions.get().choices.first().pk]}],
+        ):
+            with self.subTest(answers=answers):
+                self.assertEqual(self.submit(answers).status_code, 400)
+        self.assertFalse(QuizSubmission.objects.filter(is_completed=True).exists())
+
+    def test_attempts_must_be_started(self):
+        client, _ = self.login('s1')
+        response = self.submit(answer_sheet(self.quiz), client)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(QuizSubmission.objects.filter(student=self.students[1]).exists())
+
+    def test_taking_the_quiz_starts_the_time_limit(self):
+        client, _ = self.login('s1')
+        self.assertEqual(client.get(reverse('quiz-take', args=[self.quiz.pk])).status_code, 200)
+        submission = QuizSubmission.objects.get(student=self.students[1])
+        self.assertIsNotNone(submission.started_at)
+
+        # Fetching the quiz again does not restart the clock
+        started_at = submission.started_at - timedelta(minutes=self.quiz.time_limit_minutes + 1)
+        QuizSubmission.objects.filter(pk=submission.pk).update(started_at=started_at)
+        client.get(reverse('quiz-take', args=[self.quiz.pk]))
+        response = self.submit(answer_sheet(self.quiz), client)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Time limit exceeded.', str(response.json()))
+
+    def test_queries_do_not_grow_with_the_quiz(self):
+        counts = []
+        for username, questions in (('s1', 1), ('s2', 10)):
+            self.quiz = create_quiz(self.teacher, self.grade, questions)
+            client, _ = self.login(username)
+            self.start(client)
+            answers = answer_sheet(self.quiz)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.submit(answers, client).status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class QuizAnalyticsTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(
+            title='Quiz', description='', created_by=self.teacher, grade=self.grade, is_published=True
+        )
+        self.choices = []
+        for i in range(3):
+            question = Question.objects.create(quiz=self.quiz, text=f'Question {i}', order=i)
+            self.choices.append([
+                Choice.objects.create(question=question, text=f'Choice {j}', is_correct=j == 0, order=j)
+                for j in range(3)
+            ])
+        # Choice picked per question: scores 3, 2, 1 and 0
+        for student, picks in zip(self.students, [(0, 0, 0), (0, 0, 1), (0, 1, 1), (1, 1, 1)]):
+            self.submit(student, picks)
+        self.url = reverse('quiz-analytics', args=[self.quiz.pk])
+
+    def submit(self, student, picks):
+        client, _ = self.login(student.user.username)
+        answers = [
+            {'question': choices[0].question_id, 'choices': [choices[pick].pk]}
+            for choices, pick in zip(self.choices, picks)
+        ]
+        client.post(reverse('quiz-start', args=[self.quiz.pk]))
+        response = client.post(reverse('quiz-submit', args=[self.quiz.pk]), {'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_item_analysis(self):
+        client, _ = self.login('t1')
+        stats = client.get(self.url).json()
+        self.assertEqual((stats['submissions'], stats['mean_score']), (4, 1.5))
+        self.assertAlmostEqual(stats['stddev'], 1.25 ** 0.5)
+
+        questions = stats['questions']
+        self.assertEqual([question['correct'] for question in questions], [3, 2, 1])
+        self.assertEqual([question['correct_rate'] for question in questions], [0.75, 0.5, 0.25])
+        # (mean score when right - mean score when wrong) / stddev * sqrt(p * q)
+        for question, expected in zip(questions, [0.7746, 0.8944, 0.7746]):
+            self.assertAlmostEqual(question['discrimination'], expected, places=4)
+        self.assertEqual([choice['selected'] for choice in questions[0]['choices']], [3, 1, 0])
+
+    def test_cached_until_a_new_submission(self):
+        client, _ = self.login('a1')
+        client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(self.url)
+        self.assertLessEqual(len(queries), 2)
+
+        # The cache is dropped once the submission commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(self.students[4], (0, 0, 0))
+        self.assertEqual(client.get(self.url).json()['submissions'], 5)
+
+    def test_cached_where_every_worker_sees_the_invalidation(self):
+        # A process-local cache would keep serving stale results in the
+        # workers that did not handle the submission
+        self.assertNotIn('locmem', project_settings.CACHES['analytics']['BACKEND'])
+
+        client, _ = self.login('t1')
+        client.get(self.url)
+        key = f'quiz-analytics:{self.quiz.pk}'
+        self.assertIsNotNone(caches['analytics'].get(key))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(self.students[4], (0, 0, 0))
+        self.assertIsNone(caches['analytics'].get(key))
+
+    def test_other_teachers_quizzes_are_not_found(self):
+        client, _ = self.login('t2')
+        self.assertEqual(client.get(self.url).status_code, 404)
+
+
+class QuizCounterTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(title='Quiz', description='', created_by=self.teacher, grade=self.grade)
+
+    def assertCounters(self, quiz, question_count, total_marks):
+        quiz.refresh_from_db()
+        self.assertEqual((quiz.question_count, quiz.total_marks), (question_count, total_marks))
+
+    def test_counters_follow_question_changes(self):
+        client, _ = self.login('t1')
+        ids = []
+        for marks in (2, 3, 5):
+            response = client.post(
+                reverse('question-create', args=[self.quiz.pk]), {'text': 'Question', 'marks': marks}, format='json'
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+            ids.append(response.json()['id'])
+        self.assertCounters(self.quiz, 3, 10)
+
+        client.put(reverse('question-update', args=[ids[1]]), {'text': 'Question', 'marks': 10}, format='json')
+        self.assertCounters(self.quiz, 3, 17)
+        client.delete(reverse('question-delete', args=[ids[2]]))
+        self.assertCounters(self.quiz, 2, 12)
+
+        other = Quiz.objects.create(title='Other', description='', created_by=self.teacher, grade=self.grade)
+        question = Question.objects.get(pk=ids[0])
+        question.quiz = other
+        question.save()
+        self.assertCounters(self.quiz, 1, 10)
+        self.assertCounters(other, 1, 2)
+
+    def test_saving_a_stale_quiz_keeps_the_counters(self):
+        stale = Quiz.objects.get(pk=self.quiz.pk)
+        Question.objects.create(quiz=self.quiz, text='Question', marks=4)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertCounters(self.quiz, 1, 4)
+        self.assertEqual(self.quiz.title, 'Renamed')
+
+    def test_repair_command(self):
+        Question.objects.bulk_create([Question(quiz=self.quiz, text='Question', marks=4)])
+        out = StringIO()
+        call_command('repair_quiz_counters', '--check', stdout=out)
+        self.assertEqual(out.getvalue().strip(), '1 quiz(zes) out of sync.')
+        self.assertCounters(self.quiz, 0, 0)
+
+        call_command('repair_quiz_counters', stdout=StringIO())
+        self.assertCounters(self.quiz, 1, 4)
+        self.assertFalse(Quiz.objects.out_of_sync().exists())
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AutosaveTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.teacher, self.grade)
+        self.client, _ = self.login('s0')
+
+    def autosave(self, answers):
+        response = self.client.post(reverse('quiz-autosave', args=[self.quiz.pk]), {'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_autosaves_are_buffered_and_flushed_in_batches(self):
+        response = self.client.post(reverse('quiz-start', args=[self.quiz.pk]))
+        self.assertEqual(response.status_code, 201)
+        submission = QuizSubmission.objects.get(pk=response.json()['submission'])
+        sheet = answer_sheet(self.quiz)
+
+        # The first autosave takes the flush lock and writes straight away
+        self.autosave(sheet[:1])
+        self.assertEqual(Answer.objects.filter(submission=submission).count(), 1)
+
+        # Within the flush interval progress only lands in the buffer
+        self.autosave(sheet[1:])
+        self.assertEqual(Answer.objects.filter(submission=submission).count(), 1)
+        self.assertEqual(autosave.saved_answers(submission), sheet)
+
+        self.assertEqual(autosave.flush(), 1)
+        self.assertEqual(Answer.objects.filter(submission=submission).count(), 2)
+        # Nothing changed since: nothing to write
+        self.assertEqual(autosave.flush(), 0)
+
+    def test_submit_without_answers_grades_the_autosaved_progress(self):
+        self.client.post(reverse('quiz-start', args=[self.quiz.pk]))
+        sheet = answer_sheet(self.quiz)
+        self.autosave(sheet[:1] + answer_sheet(self.quiz, correct=False)[1:])
+
+        response = self.client.post(reverse('quiz-submit', args=[self.quiz.pk]), {}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['score'], 2)
+
+    def test_expired_attempts_are_not_saved(self):
+        QuizSubmission.objects.create(
+            quiz=self.quiz, student=self.students[0],
+            started_at=timezone.now() - timedelta(minutes=self.quiz.time_limit_minutes + 1)
+        )
+        response = self.client.post(
+            reverse('quiz-autosave', args=[self.quiz.pk]), {'answers': answer_sheet(self.quiz)}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class QuizTakeTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.teacher, self.grade, questions=3)
+        self.client, _ = self.login('s0')
+        self.url = reverse('quiz-take', args=[self.quiz.pk])
+
+    def test_whole_quiz_without_the_answers(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        questions = response.json()['questions']
+        self.assertEqual([question['text'] for question in questions], ['Question 0', 'Question 1', 'Question 2'])
+        self.assertEqual([len(question['choices']) for question in questions], [2, 2, 2])
+        self.assertNotIn('is_correct', str(response.json()))
+
+    def test_served_from_the_cache_until_the_quiz_changes(self):
+        self.client.get(self.url)
+        # Only the student's grade, the quiz's version and the running
+        # attempt are looked up
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+        choice = Choice.objects.filter(question__quiz=self.quiz).first()
+        teacher, _ = self.login('t1')
+        response = teacher.put(reverse('choice-update', args=[choice.pk]), {
+            'question': choice.question_id, 'text': 'Edited', 'is_correct': True, 'order': 0,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn('Edited', str(self.client.get(self.url).json()))
+
+    def test_other_students_and_drafts_are_not_found(self):
+        other, _ = self.login('x0')
+        self.assertEqual(other.get(self.url).status_code, 404)
+        Quiz.objects.filter(pk=self.quiz.pk).update(is_published=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class QuizQueryCountTests(QueryCountAssertionsMixin, TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.teacher, self.grade)
+
+    def get(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_quiz_list(self):
+        client, _ = self.login('s0')
+        self.assertConstantQueries(
+            lambda: self.get(client, reverse('quiz-list')),
+            lambda: [create_quiz(self.teacher, self.grade) for _ in range(3)]
+        )
+
+    def test_take_loads_questions_and_choices_up_front(self):
+        client, _ = self.login('s0')
+        # Started up front, so that neither fetch creates the attempt
+        client.post(reverse('quiz-start', args=[self.quiz.pk]))
+        # Each added question is a new quiz version, so the payload is rebuilt
+        self.assertConstantQueries(
+            lambda: self.get(client, reverse('quiz-take', args=[self.quiz.pk])),
+            lambda: [
+                Choice.objects.create(
+                    question=Question.objects.create(quiz=self.quiz, text=f'Extra {i}', order=10 + i), text='Right',
+                    is_correct=True
+                )
+                for i in range(3)
+            ]
+        )
+
+    def test_quiz_submissions(self):
+        client, _ = self.login('a1')
+        QuizSubmission.objects.create(quiz=self.quiz, student=self.students[0], is_completed=True)
+        self.assertConstantQueries(
+            lambda: self.get(client, reverse('quiz-submissions', args=[self.quiz.pk])),
+            lambda: [
+                QuizSubmission.objects.create(quiz=self.quiz, student=student, is_completed=True)
+                for student in self.students[1:]
+            ]
+        )
+
+
+class ShardedAutosaveTests(ShardedTestCase):
+
+    def test_each_database_is_flushed_under_its_own_lock(self):
+        submissions = []
+        for i in range(2):
+            teacher = self.create_teacher(f't{i}')
+            student = self.create_student(f's{i}', teacher)
+            with use_shard(teacher.user.shard):
+                quiz = create_quiz(teacher, self.grade, questions=1)
+                submission = QuizSubmission.objects.create(quiz=quiz, student=student, started_at=timezone.now())
+            submissions.append((submission, answer_sheet(quiz)))
+        self.assertEqual({submission._state.db for submission, _ in submissions}, {'shard_1', 'shard_2'})
+
+        for submission, sheet in submissions:
+            autosave.buffer_answers(submission, [(row['question'], row['choices']) for row in sheet])
+            # Flushed at once: the other shard's flush does not hold this one back
+            self.assertTrue(Answer.objects.using(submission._state.db).filter(submission=submission).exists())
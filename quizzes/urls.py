@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     QuizListView,
     QuizDetailView,
+    QuizTakeView,
     QuizCreateView,
     QuizUpdateView,
     QuizDeleteView,
@@ -11,9 +12,12 @@ from .views import (
     ChoiceCreateView,
     ChoiceUpdateView,
     ChoiceDeleteView,
+    StartQuizView,
+    AutosaveQuizView,
     SubmitQuizView,
     SubmissionListView,
     TeacherAssistantSubmissionListView,
+    QuizAnalyticsView,
     GradeSubmissionView
 )
 
@@ -22,6 +26,7 @@ urlpatterns = [
     path('quizzes/', QuizListView.as_view(), name='quiz-list'),
     path('quizzes/create/', QuizCreateView.as_view(), name='quiz-create'),
     path('quizzes/<int:pk>/', QuizDetailView.as_view(), name='quiz-detail'),
+    path('quizzes/<int:pk>/take/', QuizTakeView.as_view(), name='quiz-take'),
     path('quizzes/<int:pk>/update/', QuizUpdateView.as_view(), name='quiz-update'),
     path('quizzes/<int:pk>/delete/', QuizDeleteView.as_view(), name='quiz-delete'),
     
@@ -36,8 +41,11 @@ urlpatterns = [
     path('choices/<int:pk>/delete/', ChoiceDeleteView.as_view(), name='choice-delete'),
     
     # Submissions
+    path('quizzes/<int:quiz_id>/start/', StartQuizView.as_view(), name='quiz-start'),
+    path('quizzes/<int:quiz_id>/autosave/', AutosaveQuizView.as_view(), name='quiz-autosave'),
     path('quizzes/<int:quiz_id>/submit/', SubmitQuizView.as_view(), name='quiz-submit'),
     path('submissions/', SubmissionListView.as_view(), name='submission-list'),
     path('quizzes/<int:quiz_id>/submissions/', TeacherAssistantSubmissionListView.as_view(), name='quiz-submissions'),
+    path('quizzes/<int:pk>/analytics/', QuizAnalyticsView.as_view(), name='quiz-analytics'),
     path('submissions/<int:submission_id>/grade/', GradeSubmissionView.as_view(), name='grade-submission'),
 ]
\ No newline at end of file
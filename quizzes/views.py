@@ -1,3 +1,5 @@
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -7,20 +9,16 @@ from .serializers import (
     QuizSerializer,
     QuestionSerializer,
     ChoiceSerializer,
-    QuizSubmissionSerializer
+    QuizSubmissionSerializer,
+    QuizAnswersSerializer,
+    StudentQuizSerializer
 )
+from .grading import answer_key, clean_answers, grade_submission, start_attempt
+from . import analytics, autosave
 from accounts.permissions import IsAdmin, IsTeacher, IsAssistant, IsStudent
 from accounts.models import Grade
 from rest_framework.permissions import BasePermission
-from rest_framework.exceptions import PermissionDenied
-
-# Helper function to get current teacher
-def get_current_teacher(user):
-    if user.role == 'teacher':
-        return user.teacher_profile
-    elif user.role == 'assistant':
-        return user.assistant_profile.teacher
-    raise PermissionDenied("Invalid user role")
+from backend.pagination import paginated_response
 
 # Composite Permissions
 class IsTeacherOrAssistant(BasePermission):
@@ -41,17 +39,15 @@ class QuizListView(APIView):
     def get(self, request):
         user = request.user
         if user.role == 'student':
-            student = user.student_profile
+            student = request.tenant.student
             quizzes = Quiz.objects.filter(
                 created_by=student.teacher,
-                grade=student.grade
+                grade_id=student.grade_id
             )
         else:
-            teacher = get_current_teacher(user)
-            quizzes = Quiz.objects.filter(created_by=teacher)
+            quizzes = Quiz.objects.for_teacher(request)
         
-        serializer = QuizSerializer(quizzes, many=True)
-        return Response(serializer.data)
+        return paginated_response(request, quizzes, QuizSerializer)
 
 class QuizDetailView(APIView):
     permission_classes = [IsTeacherOrAssistantOrStudent]
@@ -61,15 +57,14 @@ class QuizDetailView(APIView):
         user = request.user
 
         if user.role == 'student':
-            student = user.student_profile
-            if quiz.created_by != student.teacher or quiz.grade != student.grade:
+            student = request.tenant.student
+            if quiz.created_by_id != student.teacher_id or quiz.grade_id != student.grade_id:
                 return Response(
                     {"detail": "Not found"}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
         else:
-            teacher = get_current_teacher(user)
-            if quiz.created_by != teacher:
+            if quiz.created_by_id != request.tenant.teacher.pk:
                 return Response(
                     {"detail": "Not found"}, 
                     status=status.HTTP_404_NOT_FOUND
@@ -78,16 +73,44 @@ class QuizDetailView(APIView):
         serializer = QuizSerializer(quiz)
         return Response(serializer.data)
 
+class QuizTakeView(APIView):
+    """Whole published quiz with questions and choices, for a student; starts the attempt."""
+    permission_classes = [IsStudent]
+    cache_timeout = 60 * 60
+
+    def get(self, request, pk):
+        student = request.tenant.student
+        quiz = get_object_or_404(
+            Quiz,
+            pk=pk,
+            created_by=student.teacher,
+            grade_id=student.grade_id,
+            is_published=True
+        )
+
+        # The payload is identical for every student, so it is built once
+        # per quiz version and served from the cache afterwards
+        cache_key = f'quiz-take:{quiz.pk}:{quiz.version}'
+        data = cache.get(cache_key)
+        if data is None:
+            prefetch_related_objects([quiz], *StudentQuizSerializer.Meta.prefetch_related)
+            data = StudentQuizSerializer(quiz).data
+            cache.set(cache_key, data, self.cache_timeout)
+
+        # Seeing the questions starts the time limit, whether or not the
+        # client called the start endpoint
+        start_attempt(quiz, student)
+        return Response(data)
+
 class QuizCreateView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def post(self, request):
         serializer = QuizSerializer(data=request.data)
         if serializer.is_valid():
-            teacher = get_current_teacher(request.user)
             grade = get_object_or_404(Grade, pk=request.data.get('grade'))
             
-            serializer.save(created_by=teacher, grade=grade)
+            serializer.save(created_by=request.tenant.teacher, grade=grade)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -95,8 +118,7 @@ class QuizUpdateView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def put(self, request, pk):
-        teacher = get_current_teacher(request.user)
-        quiz = get_object_or_404(Quiz, pk=pk, created_by=teacher)
+        quiz = get_object_or_404(Quiz.objects.for_teacher(request), pk=pk)
         
         serializer = QuizSerializer(quiz, data=request.data)
         if serializer.is_valid():
@@ -108,8 +130,7 @@ class QuizDeleteView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def delete(self, request, pk):
-        teacher = get_current_teacher(request.user)
-        quiz = get_object_or_404(Quiz, pk=pk, created_by=teacher)
+        quiz = get_object_or_404(Quiz.objects.for_teacher(request), pk=pk)
         quiz.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -117,13 +138,12 @@ class QuizDeleteView(APIView):
 class QuestionCreateView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
-    def post(self, request):
-        teacher = get_current_teacher(request.user)
-        quiz = get_object_or_404(Quiz, pk=request.data.get('quiz'), created_by=teacher)
+    def post(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz.objects.for_teacher(request), pk=quiz_id)
         
         serializer = QuestionSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(quiz=quiz)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -131,8 +151,7 @@ class QuestionUpdateView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def put(self, request, pk):
-        teacher = get_current_teacher(request.user)
-        question = get_object_or_404(Question, pk=pk, quiz__created_by=teacher)
+        question = get_object_or_404(Question.objects.for_teacher(request), pk=pk)
         
         serializer = QuestionSerializer(question, data=request.data)
         if serializer.is_valid():
@@ -144,8 +163,7 @@ class QuestionDeleteView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def delete(self, request, pk):
-        teacher = get_current_teacher(request.user)
-        question = get_object_or_404(Question, pk=pk, quiz__created_by=teacher)
+        question = get_object_or_404(Question.objects.for_teacher(request), pk=pk)
         question.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -153,17 +171,12 @@ class QuestionDeleteView(APIView):
 class ChoiceCreateView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
-    def post(self, request):
-        teacher = get_current_teacher(request.user)
-        question = get_object_or_404(
-            Question, 
-            pk=request.data.get('question'), 
-            quiz__created_by=teacher
-        )
+    def post(self, request, question_id):
+        question = get_object_or_404(Question.objects.for_teacher(request), pk=question_id)
         
         serializer = ChoiceSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(question=question)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -171,12 +184,7 @@ class ChoiceUpdateView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def put(self, request, pk):
-        teacher = get_current_teacher(request.user)
-        choice = get_object_or_404(
-            Choice, 
-            pk=pk, 
-            question__quiz__created_by=teacher
-        )
+        choice = get_object_or_404(Choice.objects.for_teacher(request), pk=pk)
         
         serializer = ChoiceSerializer(choice, data=request.data)
         if serializer.is_valid():
@@ -188,12 +196,7 @@ class ChoiceDeleteView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def delete(self, request, pk):
-        teacher = get_current_teacher(request.user)
-        choice = get_object_or_404(
-            Choice, 
-            pk=pk, 
-            question__quiz__created_by=teacher
-        )
+        choice = get_object_or_404(Choice.objects.for_teacher(request), pk=pk)
         choice.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -202,55 +205,112 @@ class SubmitQuizView(APIView):
     permission_classes = [IsStudent]
 
     def post(self, request, quiz_id):
-        student = request.user.student_profile
+        student = request.tenant.student
         quiz = get_object_or_404(
             Quiz, 
             pk=quiz_id,
             created_by=student.teacher,
-            grade=student.grade
+            grade_id=student.grade_id
         )
-        
-        submission, created = QuizSubmission.objects.get_or_create(
-            quiz=quiz,
-            student=student
+
+        serializer = QuizAnswersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Without an answers payload the autosaved progress is graded
+        submission = grade_submission(quiz, student, serializer.validated_data.get('answers'))
+        return Response({
+            "message": "Quiz submitted successfully",
+            "submission": submission.pk,
+            "score": submission.score
+        })
+
+class StartQuizView(APIView):
+    """Start the timed attempt; calling it again returns the running one."""
+    permission_classes = [IsStudent]
+
+    def post(self, request, quiz_id):
+        student = request.tenant.student
+        quiz = get_object_or_404(
+            Quiz,
+            pk=quiz_id,
+            created_by=student.teacher,
+            grade_id=student.grade_id,
+            is_published=True
         )
-        submission.is_completed = True
-        submission.save()
-        return Response({"message": "Quiz submitted successfully"})
+
+        submission, created = start_attempt(quiz, student)
+        if submission.is_completed:
+            return Response({"error": "Quiz already submitted"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "submission": submission.pk,
+            "started_at": submission.started_at,
+            "deadline": submission.deadline
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class AutosaveQuizView(APIView):
+    """Buffer in-progress answers; they reach the database in batches."""
+    permission_classes = [IsStudent]
+
+    def post(self, request, quiz_id):
+        student = request.tenant.student
+        submission = get_object_or_404(
+            QuizSubmission.objects.select_related('quiz'),
+            quiz_id=quiz_id,
+            student=student,
+            started_at__isnull=False
+        )
+        if submission.is_completed:
+            return Response({"error": "Quiz already submitted"}, status=status.HTTP_400_BAD_REQUEST)
+        if submission.is_expired():
+            return Response({"error": "Time limit exceeded"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = QuizAnswersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        answers = clean_answers(
+            answer_key(submission.quiz),
+            serializer.validated_data.get('answers', [])
+        )
+
+        autosave.buffer_answers(submission, answers)
+        return Response({"saved": len(answers), "deadline": submission.deadline})
 
 class SubmissionListView(APIView):
     permission_classes = [IsStudent]
 
     def get(self, request):
-        student = request.user.student_profile
+        student = request.tenant.student
         submissions = QuizSubmission.objects.filter(student=student)
-        serializer = QuizSubmissionSerializer(submissions, many=True)
-        return Response(serializer.data)
+        return paginated_response(request, submissions, QuizSubmissionSerializer)
+
+class QuizAnalyticsView(APIView):
+    """Per-question item analysis over the completed submissions."""
+    permission_classes = [IsTeacherOrAssistant]
+
+    def get(self, request, pk):
+        quiz = get_object_or_404(Quiz.objects.for_teacher(request), pk=pk)
+        return Response(analytics.quiz_analytics(quiz))
 
 class TeacherAssistantSubmissionListView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def get(self, request, quiz_id):
-        teacher = get_current_teacher(request.user)
-        quiz = get_object_or_404(Quiz, pk=quiz_id, created_by=teacher)
+        quiz = get_object_or_404(Quiz.objects.for_teacher(request), pk=quiz_id)
         submissions = QuizSubmission.objects.filter(quiz=quiz)
-        serializer = QuizSubmissionSerializer(submissions, many=True)
-        return Response(serializer.data)
+        return paginated_response(request, submissions, QuizSubmissionSerializer)
 
 class GradeSubmissionView(APIView):
     permission_classes = [IsTeacherOrAssistant]
 
     def post(self, request, submission_id):
-        teacher = get_current_teacher(request.user)
         submission = get_object_or_404(
-            QuizSubmission, 
-            pk=submission_id, 
-            quiz__created_by=teacher
+            QuizSubmission.objects.for_teacher(request),
+            pk=submission_id
         )
         
         score = request.data.get('score')
         if score is not None:
             submission.score = score
             submission.save()
+            analytics.invalidate(submission.quiz_id)
             return Response({"message": "Submission graded successfully"})
         return Response({"error": "Score is required"}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -1,12 +1,15 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from accounts.models import TeacherProfile , Grade  # reference to your existing model
+from accounts.tenancy import TenantQuerySet
 
 class StudyWeek(models.Model):
     teacher = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE, related_name='study_weeks')  # NEW
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
 
+    objects = TenantQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.teacher.full_name})"
 
@@ -28,6 +31,8 @@ class StudyMaterial(models.Model):
     external_url = models.URLField(blank=True)
     grade = models.ForeignKey(Grade, on_delete=models.CASCADE)  # Add this line
 
+    objects = TenantQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.material_type}) - {self.teacher.full_name}"
 
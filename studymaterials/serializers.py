@@ -12,12 +12,9 @@ class StudyMaterialSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         grade = attrs.get('grade')
         
-        if request.user.role == 'teacher':
-            teacher = request.user.teacher_profile
-        elif request.user.role == 'assistant':
-            teacher = request.user.assistant_profile.teacher
-        else:
+        if request.user.role not in ['teacher', 'assistant']:
             raise serializers.ValidationError("Invalid content creator role")
+        teacher = request.tenant.teacher
 
         if not teacher.grades.filter(id=grade.id).exists():
             raise serializers.ValidationError(
@@ -35,7 +32,7 @@ class StudyWeekSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         # If validating grades in StudyWeek
         if 'grade' in attrs:  
-            teacher = self._get_teacher(self.context['request'].user)
+            teacher = self.context['request'].tenant.teacher
             if not teacher.grades.filter(id=attrs['grade'].id).exists():
                 raise serializers.ValidationError("Invalid grade assignment")
         return attrs
\ No newline at end of file
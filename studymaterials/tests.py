@@ -1,3 +1,26 @@
-from django.test import TestCase
+from backend.testing import TenantTestCase
 
-# Create your tests here.
+from .models import StudyWeek, StudyMaterial
+
+
+class StudyMaterialTenantTests(TenantTestCase):
+
+    def test_materials_are_scoped_to_the_teacher_and_grade(self):
+        client, _ = self.login('a1')
+        response = client.post('/api/studymaterials/weeks/', {'title': 'Week 1'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        week = StudyWeek.objects.get(pk=response.json()['id'])
+        self.assertEqual(week.teacher, self.teacher)
+
+        response = client.post('/api/studymaterials/materials/', {
+            'title': 'Notes', 'week': week.pk, 'grade': self.grade.pk,
+            'material_type': 'link', 'external_url': 'https://example.com/notes',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(StudyMaterial.objects.get().teacher, self.teacher)
+
+        student, _ = self.login('s0')
+        self.assertEqual([row['title'] for row in student.get('/api/studymaterials/materials/').json()['results']], ['Notes'])
+        for username in ('x0', 't2'):
+            other, _ = self.login(username)
+            self.assertEqual(other.get('/api/studymaterials/materials/').json()['results'], [])
@@ -1,5 +1,4 @@
 from rest_framework import viewsets, permissions
-from rest_framework.exceptions import PermissionDenied
 from .models import StudyWeek, StudyMaterial
 from .serializers import StudyWeekSerializer, StudyMaterialSerializer
 from accounts.permissions import IsTeacher, IsAssistant
@@ -13,43 +12,29 @@ class StudyWeekViewSet(viewsets.ModelViewSet):
     permission_classes = [IsTeacherOrAssistant]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'teacher':
-            return StudyWeek.objects.filter(teacher=user.teacher_profile)
-        elif user.role == 'assistant':
-            return StudyWeek.objects.filter(teacher=user.assistant_profile.teacher)
-        return StudyWeek.objects.none()
+        return StudyWeek.objects.for_teacher(self.request)
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if user.role == 'teacher':
-            serializer.save(teacher=user.teacher_profile)
-        else:
-            serializer.save(teacher=user.assistant_profile.teacher)
+        serializer.save(teacher=self.request.tenant.teacher)
 
 class StudyMaterialViewSet(viewsets.ModelViewSet):
     serializer_class = StudyMaterialSerializer
 
     def get_queryset(self):
         user = self.request.user
-        if user.role == 'teacher':
-            return StudyMaterial.objects.filter(teacher=user.teacher_profile)
-        elif user.role == 'assistant':
-            return StudyMaterial.objects.filter(teacher=user.assistant_profile.teacher)
+        if user.role in ['teacher', 'assistant']:
+            return StudyMaterial.objects.for_teacher(self.request)
         elif user.role == 'student':
-            student = user.student_profile
+            student = self.request.tenant.student
             return StudyMaterial.objects.filter(
                 teacher=student.teacher,
-                grade=student.grade
+                grade_id=student.grade_id
             )
         return StudyMaterial.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        teacher = user.teacher_profile if user.role == 'teacher' else user.assistant_profile.teacher
-        
         # Validate grade assignment in serializer
-        serializer.save(teacher=teacher)
+        serializer.save(teacher=self.request.tenant.teacher)
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_teacherprofile_grades'),
+        ('test_scores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testscore',
+            index=models.Index(fields=['student', 'date_taken'], name='testscore_student_date_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from accounts.models import User, TeacherProfile, StudentProfile
 from django.utils import timezone
+from accounts.tenancy import TenantQuerySet
 
 class Test(models.Model):
     name = models.CharField(max_length=255)
@@ -8,6 +9,8 @@ class Test(models.Model):
     date = models.DateField(default=timezone.now)
     description = models.TextField()
 
+    objects = TenantQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} - {self.teacher.user.username} - {self.date}"
 
@@ -18,6 +21,14 @@ class TestScore(models.Model):
     score = models.FloatField()
     date_taken = models.DateField(default=timezone.now)
 
+    objects = TenantQuerySet.as_manager()
+    TENANT_FIELD = 'student__teacher'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'date_taken'], name='testscore_student_date_idx'),
+        ]
+
     def __str__(self):
         return f"Test: {self.test.name}, Student: {self.student.full_name}, Score: {self.score}"
 
@@ -1,16 +1,18 @@
 from rest_framework import serializers
+from backend.eager_loading import EagerLoadingMixin
 from .models import Test, TestScore
 from accounts.models import TeacherProfile, StudentProfile
 
-class TestSerializer(serializers.ModelSerializer):
+class TestSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='teacher.full_name', read_only=True)
 
     class Meta:
         model = Test
         fields = ['id', 'name', 'teacher', 'teacher_name', 'date', 'description']
         read_only_fields = ['teacher']
+        select_related = ['teacher']
 
-class TestScoreSerializer(serializers.ModelSerializer):
+class TestScoreSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     test_name = serializers.CharField(source='test.name', read_only=True)
     student_name = serializers.CharField(source='student.full_name', read_only=True)
     student_username = serializers.CharField(source='student.user.username', read_only=True)
@@ -19,3 +21,4 @@ class TestScoreSerializer(serializers.ModelSerializer):
         model = TestScore
         fields = ['id', 'test', 'student', 'test_name', 'student_name', 'student_username', 'score', 'date_taken']
         read_only_fields = ['student', 'test']
+        select_related = ['test', 'student__user']
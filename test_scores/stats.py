@@ -0,0 +1,91 @@
+"""Score statistics for a single test, computed in the database."""
+import math
+
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, StdDev, Value, Window
+from django.db.models.functions import Cast, Least, Rank, RowNumber
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def percentiles(scores, n, points=PERCENTILES):
+    """Linearly interpolated percentiles of ``scores`` (a TestScore queryset).
+
+    Only the rows at the needed offsets of the ordered scores are fetched,
+    in a single query.
+    """
+    if not n:
+        return {p: None for p in points}
+
+    positions = {p: (n - 1) * p / 100 for p in points}
+    # Window row numbers are 1-based
+    needed = {math.floor(pos) + 1 for pos in positions.values()}
+    needed |= {math.ceil(pos) + 1 for pos in positions.values()}
+    at = dict(
+        scores.annotate(row=Window(RowNumber(), order_by=F('score').asc()))
+        .filter(row__in=needed)
+        .values_list('row', 'score')
+    )
+
+    result = {}
+    for p, pos in positions.items():
+        lo, hi = at[math.floor(pos) + 1], at[math.ceil(pos) + 1]
+        result[p] = lo + (hi - lo) * (pos - math.floor(pos))
+    return result
+
+
+def histogram(scores, low, high, bins):
+    """``bins`` equal-width buckets between ``low`` and ``high``, counted with one GROUP BY."""
+    if low is None:
+        return []
+
+    width = (high - low) / bins or 1
+    counts = dict(
+        scores.annotate(
+            bucket=Least(
+                Cast((F('score') - Value(low)) / Value(width), IntegerField()),
+                Value(bins - 1)
+            )
+        ).values('bucket').annotate(n=Count('id')).order_by().values_list('bucket', 'n')
+    )
+    return [
+        {'from': low + i * width, 'to': low + (i + 1) * width, 'count': counts.get(i, 0)}
+        for i in range(bins)
+    ]
+
+
+def rankings(scores):
+    """Every score with its rank in the test, in the student's center and in their grade."""
+    def rank(*partition_by):
+        return Window(Rank(), partition_by=list(partition_by) or None, order_by=F('score').desc())
+
+    return list(
+        scores.annotate(
+            rank=rank(),
+            center_rank=rank(F('student__center_id')),
+            grade_rank=rank(F('student__grade_id')),
+        ).order_by('rank', 'student_id').values(
+            'student', 'score', 'rank', 'center_rank', 'grade_rank',
+            full_name=F('student__full_name'),
+            center=F('student__center_id'),
+            grade=F('student__grade_id'),
+        )
+    )
+
+
+def test_stats(test, scores, bins=10):
+    summary = scores.aggregate(
+        count=Count('id'),
+        mean=Avg('score'),
+        stddev=StdDev('score'),  # population standard deviation
+        min=Min('score'),
+        max=Max('score'),
+    )
+    points = percentiles(scores, summary['count'])
+    return {
+        'test': test.pk,
+        **summary,
+        'median': points[50],
+        'percentiles': points,
+        'histogram': histogram(scores, summary['min'], summary['max'], bins),
+        'rankings': rankings(scores),
+    }
@@ -1,3 +1,117 @@
-from django.test import TestCase
+import csv
+import io
 
-# Create your tests here.
+from accounts.models import Center
+from backend.testing import QueryCountAssertionsMixin, TenantTestCase
+
+from .models import Test, TestScore
+
+
+class TestStatsViewTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.test = Test.objects.create(name='Midterm', teacher=self.teacher, description='')
+        # s3 studies at a second center of the same teacher
+        self.students[3].center = Center.objects.create(name='C1b', teacher=self.teacher)
+        self.students[3].save()
+        for student, score in zip(self.students, [40, 60, 80, 100]):
+            TestScore.objects.create(test=self.test, student=student, score=score)
+        self.url = f'/api/test-scores/tests/{self.test.pk}/stats/'
+
+    def test_statistics_and_rankings(self):
+        client, _ = self.login('t1')
+        response = client.get(self.url, {'bins': 2})
+        self.assertEqual(response.status_code, 200, response.content)
+        stats = response.json()
+
+        self.assertEqual((stats['count'], stats['mean'], stats['min'], stats['max']), (4, 70, 40, 100))
+        self.assertAlmostEqual(stats['stddev'], 500 ** 0.5)
+        self.assertEqual(stats['median'], 70)
+        self.assertEqual(stats['percentiles']['25'], 55)
+        self.assertEqual([bucket['count'] for bucket in stats['histogram']], [2, 2])
+        self.assertEqual(
+            [(row['full_name'], row['rank'], row['center_rank'], row['grade_rank']) for row in stats['rankings']],
+            [('Student 3', 1, 1, 1), ('Student 2', 2, 1, 2), ('Student 1', 3, 2, 3), ('Student 0', 4, 3, 4)]
+        )
+
+    def test_assistants_see_their_teachers_tests_only(self):
+        client, _ = self.login('a1')
+        self.assertEqual(client.get(self.url).status_code, 200)
+        client, _ = self.login('t2')
+        self.assertEqual(client.get(self.url).status_code, 404)
+
+    def test_bins_are_validated(self):
+        client, _ = self.login('t1')
+        for bins in ('0', '101', 'ten'):
+            with self.subTest(bins=bins):
+                self.assertEqual(client.get(self.url, {'bins': bins}).status_code, 400)
+
+
+class TenantScopingTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.test = Test.objects.create(name='Midterm', teacher=self.teacher, description='')
+
+    def test_scores_are_only_given_to_own_students(self):
+        client, _ = self.login('a1')
+        response = client.post('/api/test-scores/create/', {
+            'student': self.students[0].pk, 'test': self.test.pk, 'score': 7,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        response = client.post('/api/test-scores/create/', {
+            'student': self.other_student.pk, 'test': self.test.pk, 'score': 7,
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(TestScore.objects.count(), 1)
+
+    def test_search_is_scoped_to_the_teacher(self):
+        TestScore.objects.create(test=self.test, student=self.students[0], score=7)
+        client, _ = self.login('t1')
+        self.assertEqual(len(client.get('/api/test-scores/search/').json()['results']), 1)
+        other, _ = self.login('t2')
+        self.assertEqual(other.get('/api/test-scores/search/').json()['results'], [])
+        self.assertEqual(other.get(f'/api/test-scores/search/?test={self.test.pk}').status_code, 400)
+
+
+class TestScoreExportTests(TenantTestCase):
+
+    def test_streams_the_search_as_csv(self):
+        test = Test.objects.create(name='Midterm, part 1', teacher=self.teacher, description='')
+        other = Test.objects.create(name='Final', teacher=self.teacher, description='')
+        for i, student in enumerate(self.students):
+            TestScore.objects.create(test=test, student=student, score=i * 10, date_taken=f'2026-01-0{i + 1}')
+            TestScore.objects.create(test=other, student=student, score=100)
+        client, _ = self.login('a1')
+
+        response = client.get(f'/api/test-scores/export/?test={test.pk}&search=Student 1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="test_scores.csv"')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows, [
+            ['Date taken', 'Test', 'Student', 'Username', 'Center', 'Grade', 'Score'],
+            ['2026-01-02', 'Midterm, part 1', 'Student 1', 's1', 'C1', 'Grade 1', '10.0'],
+        ])
+
+
+class TestScoreSearchQueryCountTests(QueryCountAssertionsMixin, TenantTestCase):
+
+    def test_search(self):
+        client, _ = self.login('t1')
+
+        def get():
+            response = client.get('/api/test-scores/search/')
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertTrue(response.json()['results'])
+
+        test = Test.objects.create(name='Quiz 1', teacher=self.teacher, description='')
+        TestScore.objects.create(test=test, student=self.students[0], score=10)
+        self.assertConstantQueries(get, lambda: [
+            TestScore.objects.create(
+                test=Test.objects.create(name=f'Quiz {i}', teacher=self.teacher, description=''),
+                student=student, score=i
+            )
+            for i, student in enumerate(self.students, start=2)
+        ])
@@ -3,7 +3,9 @@ from .views import (
     TestScoreCreateView,
     TestScoreUpdateView,
     TestScoreDeleteView,
-    TestScoreSearchView
+    TestScoreSearchView,
+    TestStatsView,
+    TestScoreExportView
 )
 
 urlpatterns = [
@@ -11,4 +13,6 @@ urlpatterns = [
     path('edit/<int:pk>/', TestScoreUpdateView.as_view(), name='testscore-edit'),  # Edit score
     path('delete/<int:pk>/', TestScoreDeleteView.as_view(), name='testscore-delete'),  # Delete score
     path('search/', TestScoreSearchView.as_view(), name='testscore-search'),  # Search score
+    path('export/', TestScoreExportView.as_view(), name='testscore-export'),  # Download scores as CSV
+    path('tests/<int:pk>/stats/', TestStatsView.as_view(), name='test-stats'),  # Score statistics
 ]
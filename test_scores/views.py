@@ -1,34 +1,31 @@
 from rest_framework import generics, permissions, filters
 from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from .models import Test, TestScore
 from .serializers import TestScoreSerializer
+from .stats import test_stats
 from accounts.models import StudentProfile, Center
 from accounts.permissions import IsTeacher, IsAssistant
-
-def get_current_teacher(user):
-    """Helper to get teacher profile for both teachers and assistants"""
-    if user.role == 'teacher':
-        return user.teacher_profile
-    elif user.role == 'assistant':
-        return user.assistant_profile.teacher
-    raise PermissionDenied("Invalid user role")
+from backend.eager_loading import EagerLoadingFilter
+from backend.exports import stream_csv
 
 class TestScoreCreateView(generics.CreateAPIView):
     serializer_class = TestScoreSerializer
     permission_classes = [permissions.IsAuthenticated & (IsTeacher | IsAssistant)]
 
     def perform_create(self, serializer):
-        teacher = get_current_teacher(self.request.user)
+        teacher = self.request.tenant.teacher
         student = get_object_or_404(StudentProfile, id=self.request.data.get('student'))
         
         # Verify student belongs to teacher
-        if student.teacher != teacher:
+        if student.teacher_id != teacher.pk:
             raise PermissionDenied("You can only assign scores to your own students")
 
         # Validate test belongs to teacher
         test = get_object_or_404(Test, id=self.request.data.get('test'))
-        if test.created_by != teacher:
+        if test.teacher_id != teacher.pk:
             raise PermissionDenied("Invalid test ID")
 
         # Validate center/grade if provided
@@ -37,23 +34,22 @@ class TestScoreCreateView(generics.CreateAPIView):
         if (grade_id := self.request.data.get('grade')) and student.grade_id != grade_id:
             raise ValidationError("Student is not in this grade")
 
-        serializer.save(test=test, student=student, created_by=self.request.user)
+        date_taken = serializer.validated_data.get('date_taken', timezone.localdate())
+        serializer.save(test=test, student=student, date_taken=date_taken)
 
 class TestScoreUpdateView(generics.UpdateAPIView):
     serializer_class = TestScoreSerializer
     permission_classes = [permissions.IsAuthenticated & (IsTeacher | IsAssistant)]
 
     def get_queryset(self):
-        teacher = get_current_teacher(self.request.user)
-        return TestScore.objects.filter(
-            student__teacher=teacher,
-            test__created_by=teacher  # Ensure test also belongs to teacher
+        return TestScore.objects.for_teacher(self.request).filter(
+            test__teacher=self.request.tenant.teacher  # Ensure test also belongs to teacher
         )
 
     def perform_update(self, serializer):
         # Additional validation during updates
         student = serializer.validated_data.get('student')
-        if student and student.teacher != get_current_teacher(self.request.user):
+        if student and student.teacher_id != self.request.tenant.teacher.pk:
             raise PermissionDenied("Cannot change student ownership")
         serializer.save()
 
@@ -62,38 +58,80 @@ class TestScoreDeleteView(generics.DestroyAPIView):
     permission_classes = [permissions.IsAuthenticated & (IsTeacher | IsAssistant)]
 
     def get_queryset(self):
-        teacher = get_current_teacher(self.request.user)
-        return TestScore.objects.filter(
-            student__teacher=teacher,
-            test__created_by=teacher
+        return TestScore.objects.for_teacher(self.request).filter(
+            test__teacher=self.request.tenant.teacher
         )
 
 class TestScoreSearchView(generics.ListAPIView):
     serializer_class = TestScoreSerializer
     permission_classes = [permissions.IsAuthenticated & (IsTeacher | IsAssistant)]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [EagerLoadingFilter, filters.SearchFilter]
     search_fields = ['student__full_name', 'student__user__username']
+    ordering = ('-date_taken', '-id')
 
     def get_queryset(self):
-        teacher = get_current_teacher(self.request.user)
-        queryset = TestScore.objects.filter(
-            student__teacher=teacher,
-            test__created_by=teacher
+        queryset = TestScore.objects.for_teacher(self.request).filter(
+            test__teacher=self.request.tenant.teacher
         )
 
         # Validate test belongs to teacher
         if test_id := self.request.query_params.get('test'):
-            if not Test.objects.filter(id=test_id, created_by=teacher).exists():
+            if not Test.objects.for_teacher(self.request).filter(id=test_id).exists():
                 raise ValidationError("Invalid test ID")
             queryset = queryset.filter(test_id=test_id)
 
         # Validate center belongs to teacher
         if center_id := self.request.query_params.get('center'):
-            if not Center.objects.filter(id=center_id, teacher=teacher).exists():
+            if not Center.objects.for_teacher(self.request).filter(id=center_id).exists():
                 raise ValidationError("Invalid center ID")
             queryset = queryset.filter(student__center_id=center_id)
 
         if grade_id := self.request.query_params.get('grade'):
             queryset = queryset.filter(student__grade_id=grade_id)
 
-        return queryset
\ No newline at end of file
+        if student_id := self.request.query_params.get('student'):
+            queryset = queryset.filter(student_id=student_id)
+
+        if date_from := self.request.query_params.get('date_from'):
+            queryset = queryset.filter(date_taken__gte=date_from)
+
+        if date_to := self.request.query_params.get('date_to'):
+            queryset = queryset.filter(date_taken__lte=date_to)
+
+        return queryset
+
+class TestScoreExportView(TestScoreSearchView):
+    """Score search results as a streamed CSV file; same filters as the search."""
+    filter_backends = [filters.SearchFilter]
+    columns = [
+        ('Date taken', 'date_taken'),
+        ('Test', 'test__name'),
+        ('Student', 'student__full_name'),
+        ('Username', 'student__user__username'),
+        ('Center', 'student__center__name'),
+        ('Grade', 'student__grade__name'),
+        ('Score', 'score'),
+    ]
+
+    def get(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).order_by(*self.ordering)
+        return stream_csv(queryset, self.columns, 'test_scores.csv')
+
+
+class TestStatsView(generics.GenericAPIView):
+    """Summary statistics, histogram and rankings for one test."""
+    permission_classes = [permissions.IsAuthenticated & (IsTeacher | IsAssistant)]
+    max_bins = 100
+
+    def get(self, request, pk):
+        test = get_object_or_404(Test.objects.for_teacher(request), pk=pk)
+
+        try:
+            bins = int(request.query_params.get('bins', 10))
+        except ValueError:
+            raise ValidationError("bins must be an integer")
+        if not 1 <= bins <= self.max_bins:
+            raise ValidationError(f"bins must be between 1 and {self.max_bins}")
+
+        scores = TestScore.objects.for_teacher(request).filter(test=test)
+        return Response(test_stats(test, scores, bins))